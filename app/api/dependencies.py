@@ -1,16 +1,126 @@
+import threading
+from typing import Optional, TYPE_CHECKING
 from app.core.config import settings
-import weaviate
 
-def get_weaviate_client():
+if TYPE_CHECKING:
+    import weaviate
+
+# Application-scoped client: created once in the FastAPI lifespan hook and reused
+# by retrieval and indexing, so every call shares one pooled keep-alive HTTP session.
+_client: Optional["weaviate.Client"] = None
+_client_lock = threading.Lock()
+
+def create_weaviate_client() -> "weaviate.Client":
     """
-    Returns a Weaviate client instance.
+    Builds a new Weaviate client with a pooled HTTP session.
+    The SDK is imported here, so the local backend never loads it.
     """
-    # Note: Weaveite client connection is synchronous, designed for use with FastAPI Depends
-    client = weaviate.Client(
+    import weaviate
+    from weaviate.config import Config, ConnectionConfig
+    return weaviate.Client(
         url=settings.WEAVIATE_URL,
         additional_headers={
             # Removed the problematic "X-OpenAI-Api-Key" header check
             "X-Google-Api-Key": settings.GOOGLE_API_KEY or "" # Pass Google Key if needed by Weaviate module
-        }
+        },
+        additional_config=Config(
+            connection_config=ConnectionConfig(
+                session_pool_connections=settings.WEAVIATE_POOL_CONNECTIONS,
+                session_pool_maxsize=settings.WEAVIATE_POOL_MAXSIZE
+            )
+        )
     )
-    return client
\ No newline at end of file
+
+def init_weaviate_client() -> Optional["weaviate.Client"]:
+    """
+    Called from the lifespan hook. A failed connection is not fatal at startup;
+    `get_weaviate_client` retries lazily on the first request.
+    """
+    try:
+        return get_weaviate_client()
+    except Exception as e:
+        print(f"⚠️ Weaviate not reachable at startup: {e}")
+        return None
+
+def get_weaviate_client() -> "weaviate.Client":
+    """
+    Returns the shared Weaviate client instance, creating it on first use.
+    Tests inject a stand-in with `set_weaviate_client`.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_weaviate_client()
+    return _client
+
+def set_weaviate_client(client: Optional["weaviate.Client"]):
+    """Injects a client (e.g. a local stand-in for tests). Pass None to reset."""
+    global _client
+    with _client_lock:
+        _client = client
+
+def check_weaviate_health() -> bool:
+    """True if the shared client can reach a ready Weaviate node."""
+    try:
+        return bool(get_weaviate_client().is_ready())
+    except Exception:
+        return False
+
+def close_weaviate_client():
+    """Closes the pooled session on shutdown."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            connection = getattr(_client, "_connection", None)
+            if connection is not None and hasattr(connection, "close"):
+                connection.close()
+            _client = None
+
+# --- Vector Store (backend chosen by VECTOR_STORE_BACKEND) ---
+_store = None
+_store_lock = threading.Lock()
+
+def create_vector_store():
+    """Builds the configured backend; imported lazily so each needs only its own deps."""
+    backend = settings.VECTOR_STORE_BACKEND
+    if backend == "local":
+        from app.rag.local_store import LocalVectorStore
+        return LocalVectorStore()
+    if backend == "weaviate":
+        from app.rag.weaviate_store import WeaviateVectorStore
+        return WeaviateVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{backend}' (expected 'weaviate' or 'local')")
+
+def get_vector_store():
+    """
+    Returns the shared VectorStore, creating it on first use.
+    Usable directly or through FastAPI Depends (override it in tests).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_vector_store()
+    return _store
+
+def set_vector_store(store):
+    """Injects a store (e.g. a LocalVectorStore on a temp dir). Pass None to reset."""
+    global _store
+    with _store_lock:
+        _store = store
+
+def check_vector_store_health() -> bool:
+    """True if the configured vector store can serve queries."""
+    try:
+        return get_vector_store().is_ready()
+    except Exception:
+        return False
+
+def close_vector_store():
+    """Flushes / releases the store on shutdown."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,78 @@
+import os
+import shutil
+from pathlib import Path
+from typing import List, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+
+from app.api.dependencies import get_vector_store
+from app.api.schemas import IngestionJobResponse, IngestionJobStatus
+from app.core.concurrency import run_ingest_blocking
+from app.rag.ingestion import file_sha256
+from app.rag.manifest import is_unchanged
+from app.rag.jobs import job_manager
+
+# Ingestion endpoints, kept apart from the query routes so a query-only
+# worker (INGESTION_ENABLED=false) never imports the ingestion stack
+router = APIRouter()
+
+def save_upload(file: UploadFile, job_dir: Path) -> Tuple[Path, str, bool]:
+    """
+    Writes one upload to disk and hashes it: (path, sha256, already
+    indexed in the current store). Blocking file IO; the handler runs it on the ingestion pool.
+    """
+    # Per-job folder: concurrent uploads of the same filename can't clobber each other
+    job_dir.mkdir(parents=True, exist_ok=True)
+    file_path = job_dir / os.path.basename(file.filename)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    sha256 = file_sha256(str(file_path))
+    return file_path, sha256, is_unchanged(file_path.name, sha256, get_vector_store())
+
+@router.post("/ingest", response_model=IngestionJobResponse, status_code=202)
+async def ingest_documents(request: Request, files: List[UploadFile] = File(...)):
+    """
+    PHASE 2: FULL INGESTION PIPELINE (background job)
+    Saves the uploads and returns a job ID immediately; poll GET /ingest/{job_id}.
+    """
+    job_id = job_manager.new_job_id()
+    job_dir = job_manager.upload_dir(job_id)
+    saved_paths = []
+    skipped_files = []
+    fingerprints = {}
+    
+    # 1. Save Files (skip ones whose content was already indexed)
+    for file in files:
+        if not file.filename.lower().endswith(".pdf"):
+            continue
+
+        # Large PDFs must not stall in-flight queries: copy + hash off the event loop
+        file_path, sha256, unchanged = await run_ingest_blocking(save_upload, file, job_dir)
+        if unchanged:
+            print(f"⏭️ Skipping unchanged file: {file_path.name}")
+            skipped_files.append(file_path.name)
+            continue
+        fingerprints[file_path.name] = sha256
+        saved_paths.append(str(file_path))
+    
+    if not saved_paths and not skipped_files:
+        raise HTTPException(status_code=400, detail="No PDF files uploaded")
+
+    # 2. Queue parse -> chunk -> embed -> index on the background workers
+    job = job_manager.create_job(job_id, saved_paths, fingerprints, skipped_files)
+    await job_manager.submit(job)
+
+    return IngestionJobResponse(
+        job_id=job_id,
+        status=job["status"],
+        status_url=str(request.url_for("get_ingestion_job", job_id=job_id)),
+        files_accepted=job["files"],
+        files_skipped=skipped_files
+    )
+
+@router.get("/ingest/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job(job_id: str):
+    """Status, per-stage progress, timings and errors of an ingestion job."""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return IngestionJobStatus(**job)
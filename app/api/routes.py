@@ -1,103 +1,333 @@
-import os
-import shutil
-from typing import List
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+import json
+import time
+from typing import Dict, List, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-from app.api.schemas import IngestionResponse, QueryRequest, QueryResponse, Citation
+from app.api.dependencies import get_vector_store
+from app.api.schemas import (
+    QueryRequest, QueryResponse, Citation, BatchQueryRequest, BatchQueryResult, BatchQueryResponse
+)
 from app.core.config import settings
-from app.rag.ingestion import vision_based_parsing
-from app.rag.chunking import chunk_medical_documents
-from app.rag.vector_store import add_chunks_to_weaviate
+from app.core.concurrency import query_slot, run_blocking
+from app.rag.lab_index import answer_value_lookup
+from app.rag.query_router import YearFilter, year_label
+from app.rag.vector_store import VectorStore
 
 # --- NEW IMPORTS FOR PHASE 3 ---
-from app.rag.retriever import get_relevant_chunks
-from app.rag.generation import generate_answer_with_groq
+from app.rag.retriever import aget_relevant_chunks, aget_relevant_chunks_batch
+from app.rag.embeddings import normalize_query
+from app.rag.generation import agenerate_answer_with_groq, astream_answer_with_groq, pack_context, GENERATION_ERROR_PREFIX
+from app.rag.answer_cache import aget_cached_answer, astore_answer
 
 router = APIRouter()
 
-@router.post("/ingest", response_model=IngestionResponse)
-async def ingest_documents(files: List[UploadFile] = File(...)):
-    """
-    PHASE 2: FULL INGESTION PIPELINE
-    """
-    saved_paths = []
-    
-    # 1. Save Files
-    for file in files:
-        if not file.filename.lower().endswith(".pdf"):
-            continue
-        
-        file_path = settings.RAW_DATA_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        saved_paths.append(str(file_path))
-    
-    if not saved_paths:
-        raise HTTPException(status_code=400, detail="No PDF files uploaded")
+NO_RECORDS_ANSWER = "I couldn't find any medical records matching your query and year filter."
 
-    # 2. Extract (LlamaParse -> Dicts)
-    # Note: raw_docs is now List[Dict]
-    raw_docs = await vision_based_parsing(saved_paths)
-    
-    # 3. Chunk (Pure Python -> Dicts)
-    chunks = chunk_medical_documents(raw_docs)
-    
-    if not chunks:
-        raise HTTPException(status_code=400, detail="No text extracted from documents.")
-
-    # 4. Index (Native Weaviate)
-    try:
-        add_chunks_to_weaviate(chunks)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Indexing Error: {e}")
-    
-    return IngestionResponse(
-        status="Success",
-        message=f"Ingestion complete. {len(chunks)} chunks indexed.",
-        files_processed=[os.path.basename(p) for p in saved_paths],
-        total_pages=len(raw_docs),
-        total_chunks=len(chunks)
-    )
+def build_citations(chunks: List[dict]) -> List[Citation]:
+    citations = []
+    for chunk in chunks:
+        citations.append(Citation(
+            source=chunk.get("source", "Unknown"),
+            page=chunk.get("page", 0),
+            year=chunk.get("year"),
+            chunk_id=chunk.get("chunk_id", "Unknown"), # <--- MAPPING ADDED
+            snippet=chunk.get("content", "")[:200] + "..." # Preview
+        ))
+    return citations
 
 @router.post("/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+async def query_documents(
+    request: QueryRequest,
+    response: Response,
+    store: VectorStore = Depends(get_vector_store)
+):
     """
     PHASE 3: RETRIEVAL & GENERATION (GROQ POWERED)
     """
-    print(f"🔎 Searching for: {request.question} (Year Filter: {request.year_filter})")
-    
-    # 1. Retrieve (Uses your Finetuned Retriever)
-    relevant_chunks = get_relevant_chunks(
-        query=request.question,
-        year=request.year_filter
-    )
-    
-    if not relevant_chunks:
+    years = request.years()
+
+    # 0. Answer Cache (normalized question + year filter + corpus version)
+    cached = await aget_cached_answer(request.question, years)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return QueryResponse(**cached)
+    response.headers["X-Cache"] = "MISS"
+
+    # 0b. Fast path: pure value lookups ("What is the Creatinine level?") come straight
+    # from the structured lab index, with exact citations and no embedding / LLM call
+    lookup = await run_blocking(answer_value_lookup, request.question, years)
+    if lookup is not None:
+        response.headers["X-Answer-Path"] = "lab-index"
         return QueryResponse(
-            answer="I couldn't find any medical records matching your query and year filter.",
-            citations=[]
+            answer=lookup["answer"],
+            citations=build_citations(lookup["chunks"]),
+            confidence_score=1.0
         )
+    response.headers["X-Answer-Path"] = "rag"
 
-    # 2. Generate (Uses Groq / Llama 3)
-    print("🧠 Generating answer with Groq...")
-    answer_text = generate_answer_with_groq(
-        query=request.question, 
-        chunks=relevant_chunks
-    )
+    print(f"🔎 Searching for: {request.question} (Year Filter: {year_label(years)})")
+    
+    # Per-worker concurrency cap (MAX_CONCURRENT_QUERIES)
+    async with query_slot():
+        # 1. Retrieve (Uses your Finetuned Retriever)
+        relevant_chunks = await aget_relevant_chunks(
+            query=request.question,
+            year=years,
+            store=store
+        )
+        
+        if not relevant_chunks:
+            return QueryResponse(
+                answer=NO_RECORDS_ANSWER,
+                citations=[]
+            )
 
-    # 3. Format Citations
-    citations = []
-    for chunk in relevant_chunks:
-        citations.append(Citation(
-            source=chunk.get("source", "Unknown"),
-            page=chunk.get("page", 0),
-            year=chunk.get("year"),
-            chunk_id=chunk.get("chunk_id", "Unknown"), # <--- MAPPING ADDED
-            snippet=chunk.get("content", "")[:200] + "..." # Preview
-        ))
+        # 2. Pack the prompt context (dedupe overlaps, token budget); these are also the citations
+        context_chunks = pack_context(relevant_chunks)
+
+        # 3. Generate (Uses Groq / Llama 3)
+        print("🧠 Generating answer with Groq...")
+        answer_text = await agenerate_answer_with_groq(
+            query=request.question, 
+            chunks=context_chunks
+        )
+
+    # 4. Format Citations ([Source N] = Nth packed chunk)
+    citations = build_citations(context_chunks)
 
-    return QueryResponse(
+    result = QueryResponse(
         answer=answer_text,
         citations=citations,
         confidence_score=1.0
-    )
\ No newline at end of file
+    )
+
+    # 5. Cache successful answers only
+    if not answer_text.startswith(GENERATION_ERROR_PREFIX):
+        await astore_answer(request.question, years, jsonable_encoder(result))
+
+    return result
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    store: VectorStore = Depends(get_vector_store)
+):
+    """
+    Many questions in one call (e.g. a report builder's per-patient question set).
+
+    Identical questions are answered once. Cache hits and lab-value lookups are
+    served directly; the rest share one batched embedding call and concurrent
+    vector searches, then generate with at most BATCH_GENERATION_CONCURRENCY
+    Groq calls in flight. Results keep request order; failures are per item.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    if len(request.queries) > settings.BATCH_QUERY_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many queries ({len(request.queries)} > {settings.BATCH_QUERY_MAX_ITEMS})"
+        )
+
+    started = time.perf_counter()
+
+    # 1. Group identical (normalized question, year) items
+    groups: Dict[Tuple[str, YearFilter], List[int]] = {}
+    for i, item in enumerate(request.queries):
+        groups.setdefault((normalize_query(item.question), item.years()), []).append(i)
+
+    # 2. Cache hits and lab-index lookups need no retrieval or generation
+    answered: Dict[Tuple[str, YearFilter], BatchQueryResult] = {}
+    pending: List[Tuple[str, YearFilter]] = []
+    for key, indexes in groups.items():
+        item = request.queries[indexes[0]]
+        cached = await aget_cached_answer(item.question, item.years())
+        if cached is not None:
+            answered[key] = BatchQueryResult(result=QueryResponse(**cached), answer_path="cache")
+            continue
+        lookup = await run_blocking(answer_value_lookup, item.question, item.years())
+        if lookup is not None:
+            answered[key] = BatchQueryResult(
+                result=QueryResponse(
+                    answer=lookup["answer"],
+                    citations=build_citations(lookup["chunks"]),
+                    confidence_score=1.0
+                ),
+                answer_path="lab-index"
+            )
+            continue
+        pending.append(key)
+
+    # 3. Retrieve for everything else (one embedding batch, concurrent searches)
+    pending_items = [request.queries[groups[key][0]] for key in pending]
+    chunk_lists = await aget_relevant_chunks_batch(
+        [(item.question, item.years()) for item in pending_items],
+        store=store
+    ) if pending else []
+
+    # 4. Generate concurrently, bounded per batch and by the per-worker query cap
+    generation_slots = asyncio.Semaphore(max(1, settings.BATCH_GENERATION_CONCURRENCY))
+
+    async def generate(item: QueryRequest, chunks: List[dict]) -> BatchQueryResult:
+        if not chunks:
+            return BatchQueryResult(result=QueryResponse(answer=NO_RECORDS_ANSWER, citations=[]), answer_path="rag")
+        chunks = pack_context(chunks)
+        try:
+            async with generation_slots, query_slot():
+                answer_text = await agenerate_answer_with_groq(query=item.question, chunks=chunks)
+        except Exception as e:
+            return BatchQueryResult(error=f"{GENERATION_ERROR_PREFIX} {e}", answer_path="rag")
+        if answer_text.startswith(GENERATION_ERROR_PREFIX):
+            return BatchQueryResult(error=answer_text, answer_path="rag")
+
+        result = QueryResponse(answer=answer_text, citations=build_citations(chunks), confidence_score=1.0)
+        await astore_answer(item.question, item.years(), jsonable_encoder(result))
+        return BatchQueryResult(result=result, answer_path="rag")
+
+    if pending:
+        print(f"🧠 Batch: generating {len(pending)} answers ({len(request.queries)} questions)...")
+    generated = await asyncio.gather(*[
+        generate(item, chunks) for item, chunks in zip(pending_items, chunk_lists)
+    ])
+    answered.update(zip(pending, generated))
+
+    # 5. Fan results back out in request order
+    results: List[BatchQueryResult] = [None] * len(request.queries)
+    for key, indexes in groups.items():
+        for i in indexes:
+            results[i] = answered[key]
+
+    return BatchQueryResponse(results=results, total_seconds=round(time.perf_counter() - started, 4))
+
+def _sse(event: str, data) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+# End of an upstream answer stream in the token queue
+_STREAM_END = object()
+
+async def _drain_answer_stream(question: str, chunks: List[dict], tokens: asyncio.Queue, slot: asyncio.Semaphore):
+    """
+    Reads the Groq stream into `tokens` and releases the caller's query slot as
+    soon as generation ends, so a slow SSE client never holds a slot while it
+    reads. An upstream failure is queued as the exception, then _STREAM_END.
+    """
+    try:
+        async for token in astream_answer_with_groq(question, chunks):
+            tokens.put_nowait(token)
+    except Exception as e:
+        tokens.put_nowait(e)
+    finally:
+        slot.release()
+        tokens.put_nowait(_STREAM_END)
+
+@router.post("/query/stream")
+async def query_documents_stream(
+    request: QueryRequest,
+    store: VectorStore = Depends(get_vector_store)
+):
+    """
+    Streaming variant of /query (Server-Sent Events):
+      event: citations -> sent as soon as retrieval finishes
+      event: token     -> answer text deltas from the Groq streaming API
+      event: done      -> timing metadata
+      event: error     -> generation failed mid-stream
+    """
+    years = request.years()
+
+    async def event_stream():
+        started = time.perf_counter()
+
+        cached = await aget_cached_answer(request.question, years)
+        if cached is not None:
+            yield _sse("citations", cached["citations"])
+            yield _sse("token", {"text": cached["answer"]})
+            yield _sse("done", {"cached": True, "total_seconds": round(time.perf_counter() - started, 4)})
+            return
+
+        lookup = await run_blocking(answer_value_lookup, request.question, years)
+        if lookup is not None:
+            yield _sse("citations", build_citations(lookup["chunks"]))
+            yield _sse("token", {"text": lookup["answer"]})
+            yield _sse("done", {
+                "cached": False,
+                "answer_path": "lab-index",
+                "total_seconds": round(time.perf_counter() - started, 4)
+            })
+            return
+
+        # The slot covers retrieval and the upstream generation, not the client's reads
+        slot = query_slot()
+        await slot.acquire()
+        try:
+            relevant_chunks = await aget_relevant_chunks(
+                query=request.question,
+                year=years,
+                store=store
+            )
+        except BaseException:
+            slot.release()
+            raise
+        retrieval_seconds = time.perf_counter() - started
+        context_chunks = pack_context(relevant_chunks)
+        citations = build_citations(context_chunks)
+
+        if not relevant_chunks:
+            slot.release()
+            yield _sse("citations", citations)
+            yield _sse("token", {"text": NO_RECORDS_ANSWER})
+            yield _sse("done", {
+                "cached": False,
+                "retrieval_seconds": round(retrieval_seconds, 4),
+                "total_seconds": round(time.perf_counter() - started, 4)
+            })
+            return
+
+        # Generation starts now and owns the slot; the client reads from the queue
+        tokens: asyncio.Queue = asyncio.Queue()
+        upstream = asyncio.create_task(_drain_answer_stream(request.question, context_chunks, tokens, slot))
+        parts = []
+        first_token_seconds = None
+        try:
+            yield _sse("citations", citations)
+            while True:
+                token = await tokens.get()
+                if token is _STREAM_END:
+                    break
+                if isinstance(token, Exception):
+                    print(f"❌ Groq Streaming Error: {token}")
+                    yield _sse("error", {"detail": f"{GENERATION_ERROR_PREFIX} {token}"})
+                    return
+                if first_token_seconds is None:
+                    first_token_seconds = time.perf_counter() - started
+                parts.append(token)
+                yield _sse("token", {"text": token})
+        finally:
+            # Client gone mid-stream: stop generating (its finally frees the slot)
+            upstream.cancel()
+
+        # Cache complete answers only (an empty stream is not an answer)
+        answer_text = "".join(parts)
+        if answer_text.strip():
+            await astore_answer(request.question, years, jsonable_encoder(QueryResponse(
+                answer=answer_text,
+                citations=citations,
+                confidence_score=1.0
+            )))
+
+        total_seconds = time.perf_counter() - started
+        yield _sse("done", {
+            "cached": False,
+            "retrieval_seconds": round(retrieval_seconds, 4),
+            "time_to_first_token_seconds": round(first_token_seconds, 4) if first_token_seconds else None,
+            "generation_seconds": round(total_seconds - retrieval_seconds, 4),
+            "total_seconds": round(total_seconds, 4)
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
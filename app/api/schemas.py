@@ -1,5 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
+
+class FileParseTiming(BaseModel):
+    filename: str
+    seconds: float
+    pages: int
+    attempts: int
+    cached: bool = False  # Served from the parse cache (no LlamaParse call)
+    error: Optional[str] = None
 
 class IngestionResponse(BaseModel):
     status: str
@@ -7,10 +15,58 @@ class IngestionResponse(BaseModel):
     files_processed: List[str]
     total_pages: int
     total_chunks: int
+    chunks_indexed: int = 0
+    chunks_skipped: int = 0  # No embedding after retries
+    chunks_failed: int = 0   # Rejected by the vector store after retries
+    failed_chunk_ids: List[str] = []
+    files_skipped: List[str] = []  # Unchanged since last ingest (same content hash)
+    parse_timings: List[FileParseTiming] = []
+
+class IngestionProgress(BaseModel):
+    pages_parsed: int = 0
+    chunks_created: int = 0
+    chunks_embedded: int = 0
+    objects_indexed: int = 0
+    chunks_skipped: int = 0
+    objects_failed: int = 0
+    chunks_failed: int = 0  # skipped + failed
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    files_accepted: List[str]
+    files_skipped: List[str] = []
+
+class IngestionJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | succeeded | failed
+    files: List[str]
+    files_skipped: List[str] = []
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: IngestionProgress
+    parse_timings: List[FileParseTiming] = []
+    first_indexed_seconds: Optional[float] = None
+    total_seconds: Optional[float] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[IngestionResponse] = None  # Final summary once succeeded
 
 class QueryRequest(BaseModel):
     question: str
-    year_filter: Optional[int] = None
+    year_filter: Optional[int] = None  # Exact year; takes precedence over the range
+    year_from: Optional[int] = None    # Inclusive range, either end may be open
+    year_to: Optional[int] = None
+
+    def years(self) -> Union[int, Tuple[Optional[int], Optional[int]], None]:
+        """The year filter for retrieval, caching and lab lookups (see query_router.YearFilter)."""
+        if self.year_filter:
+            return self.year_filter
+        if self.year_from or self.year_to:
+            return (self.year_from, self.year_to)
+        return None
 
 class Citation(BaseModel):
     source: str
@@ -22,4 +78,16 @@ class Citation(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     citations: List[Citation]
-    confidence_score: Optional[float] = None
\ No newline at end of file
+    confidence_score: Optional[float] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest]
+
+class BatchQueryResult(BaseModel):
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None        # Set instead of `result` when this item failed
+    answer_path: Optional[str] = None  # cache | lab-index | rag
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]  # Same order as the request
+    total_seconds: float
\ No newline at end of file
@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an optional per-entry TTL.
+    Tracks hit/miss counters so callers can report cache effectiveness.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
+
+class SharedCounters:
+    """
+    Integer counters in a SQLite file, so all worker processes on the host see
+    the same values (e.g. the corpus version bumped by whichever worker ran the
+    ingest). Opened on first use. A read is reused for `ttl_seconds`, so hot
+    paths on the event loop don't hit the file per request; another worker's
+    increment becomes visible within that window, this worker's immediately.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float = 0):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._recent: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None and recent[1] > time.monotonic():
+                return recent[0]
+            row = self._connection().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+            value = row[0] if row else 0
+            self._remember(key, value)
+        return value
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._connection().execute(
+                "INSERT INTO counters (key, value) VALUES (?, 1)"
+                " ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+                (key,)
+            ).fetchone()[0]
+            self._remember(key, value)
+        return value
+
+    def _remember(self, key: str, value: int):
+        if self.ttl_seconds > 0:
+            self._recent[key] = (value, time.monotonic() + self.ttl_seconds)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class InMemoryCacheBackend:
+    """
+    Default answer-cache backend: a per-process LRU of serialized values plus
+    integer counters. With `counters_path` the counters live in a SQLite file
+    shared by the workers of one host (so an ingest in one worker invalidates
+    the others' entries); without it they are per-process. Workers on several
+    hosts need the redis backend.
+    """
+    remote = False
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        counters_path: Optional[Path] = None,
+        counters_ttl: float = 0
+    ):
+        self._lru = LRUCache(max_entries, ttl_seconds)
+        self._shared = SharedCounters(counters_path, counters_ttl) if counters_path else None
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._lru.get(key)
+
+    def set(self, key: str, value: str):
+        self._lru.set(key, value)
+
+    def get_int(self, key: str) -> int:
+        if self._shared is not None:
+            return self._shared.get(key)
+        return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        if self._shared is not None:
+            return self._shared.incr(key)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self) -> Dict[str, float]:
+        return self._lru.stats()
+
+class RedisCacheBackend:
+    """
+    Backend for anything speaking the Redis protocol (GET/SET EX/INCR), so the
+    cache and corpus version are shared by all workers. Pass `client` to use a
+    local stand-in instead of connecting to `url`.
+    """
+    remote = True
+
+    def __init__(self, url: Optional[str] = None, ttl_seconds: Optional[int] = None, client: Any = None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("ANSWER_CACHE_BACKEND=redis requires the 'redis' package.") from e
+            client = redis.Redis.from_url(url)
+        self._redis = client
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._redis.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str):
+        if self.ttl_seconds:
+            self._redis.set(key, value, ex=self.ttl_seconds)
+        else:
+            self._redis.set(key, value)
+
+    def get_int(self, key: str) -> int:
+        value = self._redis.get(key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key: str) -> int:
+        return int(self._redis.incr(key))
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_ingest_executor: Optional[ThreadPoolExecutor] = None
+_query_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool for SDK calls that have no async variant (e.g. Weaviate v3 `do()`).
+    Kept separate from the default loop executor so its size is configurable.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BLOCKING_IO_WORKERS,
+            thread_name_prefix="blocking-io"
+        )
+    return _executor
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a synchronous call on the bounded executor without blocking the event loop.
+    The caller's context variables (e.g. per-request stage timings) carry over, as with `asyncio.to_thread`.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
+
+def get_ingest_executor() -> ThreadPoolExecutor:
+    """
+    Separate pool for ingestion (embedding batches, Weaviate writes, hashing),
+    so large uploads cannot occupy the threads /query depends on.
+    """
+    global _ingest_executor
+    if _ingest_executor is None:
+        _ingest_executor = ThreadPoolExecutor(
+            max_workers=settings.INGEST_IO_WORKERS,
+            thread_name_prefix="ingest-io"
+        )
+    return _ingest_executor
+
+async def run_ingest_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """`run_blocking` for ingestion work, on the ingestion pool."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_ingest_executor(), call)
+
+def query_slot() -> asyncio.Semaphore:
+    """
+    Per-worker cap on in-flight queries (MAX_CONCURRENT_QUERIES).
+    Requests beyond the cap wait here instead of piling onto the upstream APIs.
+    """
+    global _query_semaphore
+    if _query_semaphore is None:
+        _query_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_QUERIES)
+    return _query_semaphore
@@ -1,9 +1,11 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+# Local runs read secrets from .env; deployments (the Space) set real env vars and skip this
+if env_path.exists():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=env_path)
 
 class Settings:
     PROJECT_NAME: str = "VitalSource RAG"
@@ -15,20 +17,115 @@ class Settings:
     
     # Infrastructure
     WEAVIATE_URL: str = os.getenv("WEAVIATE_URL", "http://localhost:8080")
+    WEAVIATE_POOL_CONNECTIONS: int = int(os.getenv("WEAVIATE_POOL_CONNECTIONS", "10"))
+    WEAVIATE_POOL_MAXSIZE: int = int(os.getenv("WEAVIATE_POOL_MAXSIZE", "32"))
+    # Batch indexing: dynamic = batch size adapted to observed server throughput, starting at BATCH_SIZE
+    WEAVIATE_BATCH_SIZE: int = int(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+    WEAVIATE_BATCH_DYNAMIC: bool = os.getenv("WEAVIATE_BATCH_DYNAMIC", "true").lower() == "true"
+    WEAVIATE_BATCH_WORKERS: int = int(os.getenv("WEAVIATE_BATCH_WORKERS", "2"))  # concurrent batch requests
+    WEAVIATE_BATCH_RETRIES: int = int(os.getenv("WEAVIATE_BATCH_RETRIES", "2"))  # re-sends of rejected objects / failed batches
+    WEAVIATE_BATCH_RETRY_BACKOFF_SECONDS: float = float(os.getenv("WEAVIATE_BATCH_RETRY_BACKOFF_SECONDS", "1"))
+
+    # Startup
+    # false = query-only worker: no /ingest routes, no ingestion workers, LlamaParse never imported
+    INGESTION_ENABLED: bool = os.getenv("INGESTION_ENABLED", "true").lower() == "true"
+    # Import the SDKs / build the API clients in the background right after startup
+    # (false = on the first request that needs them)
+    PRELOAD_CLIENTS: bool = os.getenv("PRELOAD_CLIENTS", "true").lower() == "true"
+
+    # Vector Store ("weaviate" or "local" = in-process NumPy index, single node)
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "weaviate").lower()
+    # Local store: score the first N embedding dims, then rescore the best POOL rows exactly
+    # (0 = exact full scan). text-embedding-004 is Matryoshka-trained, so its prefix ranks well.
+    LOCAL_STORE_PREFILTER_DIMS: int = int(os.getenv("LOCAL_STORE_PREFILTER_DIMS", "0"))
+    LOCAL_STORE_PREFILTER_POOL: int = int(os.getenv("LOCAL_STORE_PREFILTER_POOL", "256"))
+
+    # Hybrid Retrieval (BM25 + vector, reciprocal-rank fusion)
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    HYBRID_ALPHA: float = float(os.getenv("HYBRID_ALPHA", "0.5"))  # 1.0 = pure vector, 0.0 = pure BM25
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "50"))  # per-retriever pool before fusion
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    # Section routing: questions about specific tests search only their report sections
+    SECTION_ROUTING_ENABLED: bool = os.getenv("SECTION_ROUTING_ENABLED", "true").lower() == "true"
+    SECTION_ROUTING_MAX_SECTIONS: int = int(os.getenv("SECTION_ROUTING_MAX_SECTIONS", "3"))  # more = unrouted
+    SECTION_ROUTING_MIN_HITS: int = int(os.getenv("SECTION_ROUTING_MIN_HITS", "2"))  # fewer = retry unfiltered
+
+    # Concurrency (per uvicorn worker)
+    MAX_CONCURRENT_QUERIES: int = int(os.getenv("MAX_CONCURRENT_QUERIES", "16"))
+    BATCH_QUERY_MAX_ITEMS: int = int(os.getenv("BATCH_QUERY_MAX_ITEMS", "100"))
+    BATCH_GENERATION_CONCURRENCY: int = int(os.getenv("BATCH_GENERATION_CONCURRENCY", "8"))  # per batch request
+    BLOCKING_IO_WORKERS: int = int(os.getenv("BLOCKING_IO_WORKERS", "16"))
+    INGEST_MAX_CONCURRENT_JOBS: int = int(os.getenv("INGEST_MAX_CONCURRENT_JOBS", "1"))
+    INGEST_IO_WORKERS: int = int(os.getenv("INGEST_IO_WORKERS", "6"))
+    # Finished job records (JOBS_DIR/*.json) older than this are deleted (seconds, 0 = keep forever)
+    INGEST_JOB_RETENTION_SECONDS: int = int(os.getenv("INGEST_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
     
+    # Parsing (LlamaParse)
+    PARSE_MAX_CONCURRENCY: int = int(os.getenv("PARSE_MAX_CONCURRENCY", "4"))
+    PARSE_TIMEOUT_SECONDS: float = float(os.getenv("PARSE_TIMEOUT_SECONDS", "300"))
+    PARSE_MAX_RETRIES: int = int(os.getenv("PARSE_MAX_RETRIES", "3"))
+    PARSE_RETRY_BACKOFF_SECONDS: float = float(os.getenv("PARSE_RETRY_BACKOFF_SECONDS", "2"))
+
+    # Chunking ("chars", or "tokens" = approximate word/punctuation tokens)
+    CHUNK_SIZE_UNIT: str = os.getenv("CHUNK_SIZE_UNIT", "chars").lower()
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1500"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "150"))
+    CHUNK_MAX_SECTION_SIZE: int = int(os.getenv("CHUNK_MAX_SECTION_SIZE", "2000"))  # larger sections are sub-split
+
+    # Streaming ingestion pipeline
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))  # items buffered between stages
+
+    # Prompt context (approximate tokens of retrieved text sent to the LLM; 0 = unlimited)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+    # Embeddings
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))  # Gemini batch limit is 100
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_MAX_RETRIES: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    QUERY_EMBEDDING_CACHE_TTL: int = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))  # seconds
+
+    # Lab-Value Index (structured values from report tables; LLM-free value lookups)
+    LAB_INDEX_ENABLED: bool = os.getenv("LAB_INDEX_ENABLED", "true").lower() == "true"
+
+    # Observability (Prometheus text format at /metrics, Server-Timing + X-Request-ID headers)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Answer Cache ("memory" = per-worker entries, corpus version shared via CACHE_COUNTERS_PATH
+    # by the workers of one host; "redis" = shared by all workers on all hosts)
+    ANSWER_CACHE_BACKEND: str = os.getenv("ANSWER_CACHE_BACKEND", "memory")
+    ANSWER_CACHE_URL: str = os.getenv("ANSWER_CACHE_URL", "redis://localhost:6379/0")
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+    ANSWER_CACHE_TTL: int = int(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+    # How long a worker reuses its last read of the shared corpus version (seconds, 0 = read every time)
+    CACHE_COUNTERS_TTL: float = float(os.getenv("CACHE_COUNTERS_TTL", "1.0"))
+
+    # Retrieval Cache (per-process LRU of search results: quantized query vector + filters + corpus version)
+    RETRIEVAL_CACHE_ENABLED: bool = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048"))
+    RETRIEVAL_CACHE_TTL: int = int(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))  # seconds
+    RETRIEVAL_CACHE_VECTOR_DECIMALS: int = int(os.getenv("RETRIEVAL_CACHE_VECTOR_DECIMALS", "4"))
+
     # Paths
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     DATA_DIR: Path = BASE_DIR / "data"
     RAW_DATA_DIR: Path = DATA_DIR / "raw"
     PROCESSED_DATA_DIR: Path = DATA_DIR / "processed"
+    EMBEDDING_CACHE_PATH: Path = DATA_DIR / "embedding_cache.sqlite3"
+    INGEST_MANIFEST_PATH: Path = DATA_DIR / "ingest_manifest.json"
+    PARSE_CACHE_DIR: Path = PROCESSED_DATA_DIR / "parse_cache"
+    JOBS_DIR: Path = DATA_DIR / "jobs"
+    LAB_INDEX_PATH: Path = DATA_DIR / "lab_index.sqlite3"
+    CACHE_COUNTERS_PATH: Path = DATA_DIR / "cache_counters.sqlite3"  # corpus version shared by local workers
+    LOCAL_STORE_DIR: Path = Path(os.getenv("LOCAL_STORE_DIR", str(DATA_DIR / "vector_store")))
 
     def __init__(self):
-        if not self.LLAMA_CLOUD_API_KEY:
+        if self.INGESTION_ENABLED and not self.LLAMA_CLOUD_API_KEY:
             print("⚠️  WARNING: LLAMA_CLOUD_API_KEY is missing.")
         if not self.GOOGLE_API_KEY:
             print("⚠️  WARNING: GOOGLE_API_KEY is missing.")
-            
-        os.makedirs(self.RAW_DATA_DIR, exist_ok=True)
-        os.makedirs(self.PROCESSED_DATA_DIR, exist_ok=True)
+        # Data directories are created by whatever first writes to them, not at import
 
 settings = Settings()    
\ No newline at end of file
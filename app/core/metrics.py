@@ -0,0 +1,228 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds): sub-millisecond cache/index work up to slow LLM and parse calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter with optional labels (Prometheus `counter`)."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels (Prometheus `histogram`).
+    `observe` is a bisect plus three additions under a lock, cheap enough for the hot path.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last = +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class CallbackGauge:
+    """Gauge computed at scrape time: `callback()` returns {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.callback().items())
+        ]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# --- Process-wide metrics (per uvicorn worker; Prometheus aggregates across workers) ---
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, method and status.",
+    ("method", "route", "status")
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "rag_stage_duration_seconds",
+    "Pipeline stage latency (embed, search, rerank, context_pack, prompt_build, generate, lab_lookup, parse, chunk, embed_documents, index).",
+    ("stage",)
+))
+RETRIEVED_CHUNKS = registry.register(Histogram(
+    "rag_retrieved_chunks", "Chunks returned per retrieval.", (), buckets=COUNT_BUCKETS
+))
+LLM_TOKENS = registry.register(Counter(
+    "rag_llm_tokens_total", "LLM tokens reported by the provider, by kind (prompt or completion).", ("kind",)
+))
+UPSTREAM_ERRORS = registry.register(Counter(
+    "rag_upstream_errors_total", "Failed calls to external services (gemini, groq, llamaparse, vector store).", ("service",)
+))
+SECTION_ROUTING = registry.register(Counter(
+    "rag_section_routing_total",
+    "Retrievals by section routing outcome (routed, fallback = too few routed hits, unrouted).", ("outcome",)
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "rag_cache_requests_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result")
+))
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in list(CACHE_REQUESTS._values.items()):
+        hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+        hits_and_total[1] += value
+        if result == "hit":
+            hits_and_total[0] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+CACHE_HIT_RATIO = registry.register(CallbackGauge(
+    "rag_cache_hit_ratio", "Hits / lookups per cache since process start.", ("cache",), _cache_hit_ratios
+))
+
+# In-process caches report their size at scrape time (see `track_cache_size`)
+_cache_sizes: Dict[str, Callable[[], int]] = {}
+
+def track_cache_size(cache: str, size: Callable[[], int]):
+    """Exposes `size()` as rag_cache_entries{cache=...}; hits and misses come from `record_cache`."""
+    _cache_sizes[cache] = size
+
+CACHE_ENTRIES = registry.register(CallbackGauge(
+    "rag_cache_entries", "Entries currently held per in-process cache.", ("cache",),
+    lambda: {(cache,): size() for cache, size in list(_cache_sizes.items())}
+))
+
+# --- Per-request stage timings (for the Server-Timing response header) ---
+# Set by the HTTP middleware; `run_blocking` copies the context into executor
+# threads, so stages timed there land in the same request's dict.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def start_request_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Times a pipeline stage into `rag_stage_duration_seconds` and the current request's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    if count:
+        CACHE_REQUESTS.inc(cache, "hit" if hit else "miss", amount=count)
+
+def record_upstream_error(service: str, count: int = 1):
+    UPSTREAM_ERRORS.inc(service, amount=count)
+
+def record_llm_usage(usage):
+    """Adds an OpenAI-style `usage` object's prompt/completion token counts (if the provider sent one)."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if prompt:
+        LLM_TOKENS.inc("prompt", amount=prompt)
+    if completion:
+        LLM_TOKENS.inc("completion", amount=completion)
+
+def render_metrics() -> str:
+    return registry.render()
@@ -1,12 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.api.middleware import RequestMetricsMiddleware
 from app.api.routes import router
+from app.api.dependencies import (
+    init_weaviate_client, close_weaviate_client, check_weaviate_health,
+    get_vector_store, close_vector_store, check_vector_store_health
+)
+from app.core.concurrency import run_blocking
 from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.rag.embeddings import get_genai
+from app.rag.generation import get_async_groq_client
+
+def preload_clients():
+    """
+    Imports the Gemini / Groq (and, with ingestion, LlamaParse) SDKs and builds
+    their clients, so the first request doesn't pay for it. Failures are left
+    to surface on first use.
+    """
+    try:
+        get_genai()
+        get_async_groq_client()
+        if settings.INGESTION_ENABLED:
+            import llama_parse  # noqa: F401
+        print("✅ API clients preloaded.")
+    except Exception as e:
+        print(f"⚠️ Client preload failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: one pooled Weaviate client for the whole process (weaviate backend),
+    # or load the on-disk NumPy index into memory (local backend)
+    if settings.VECTOR_STORE_BACKEND == "weaviate":
+        await run_blocking(init_weaviate_client)
+    await run_blocking(get_vector_store)
+    # SDK imports run in the background: requests are served (and health checks pass) meanwhile
+    preload = asyncio.create_task(run_blocking(preload_clients)) if settings.PRELOAD_CLIENTS else None
+    # Background ingestion workers (resumes jobs persisted before a restart)
+    if settings.INGESTION_ENABLED:
+        from app.rag.jobs import job_manager
+        await job_manager.start()
+    yield
+    # Shutdown: stop ingestion workers, release pooled connections
+    if preload is not None and not preload.done():
+        preload.cancel()
+    if settings.INGESTION_ENABLED:
+        await job_manager.stop()
+    close_vector_store()
+    close_weaviate_client()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Verifiable RAG for Medical Documents using LlamaParse and Weaviate.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS (Allow Frontend to talk to Backend)
@@ -18,18 +68,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include API Routes
+# Request IDs, Server-Timing headers and per-route latency histograms
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
+# Include API Routes (a query-only worker skips the ingestion ones)
 app.include_router(router, prefix="/api/v1")
+if settings.INGESTION_ENABLED:
+    from app.api.ingest_routes import router as ingest_router
+    app.include_router(ingest_router, prefix="/api/v1")
 
 @app.get("/")
 def root():
     return {
         "message": "VitalSource API is running", 
         "docs": "/docs",
-        "ingestion_endpoint": "/api/v1/ingest"
+        "ingestion_endpoint": "/api/v1/ingest" if settings.INGESTION_ENABLED else None
     }
 
+@app.get("/health")
+async def health():
+    # Weaviate: probe the pooled client itself; local: the in-process index
+    check = check_weaviate_health if settings.VECTOR_STORE_BACKEND == "weaviate" else check_vector_store_health
+    store_ready = await run_blocking(check)
+    return {
+        "status": "ok" if store_ready else "degraded",
+        "vector_store": settings.VECTOR_STORE_BACKEND,
+        "ready": store_ready
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus scrape endpoint (per-worker counters and histograms)."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     # Use the string import to avoid loop conflicts on Windows
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
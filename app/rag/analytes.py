@@ -0,0 +1,93 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Canonical analyte -> names it appears under in lab reports and questions.
+# Matching is case-insensitive on whole words; longer names win ("ldl cholesterol" over "cholesterol").
+ANALYTE_SYNONYMS: Dict[str, List[str]] = {
+    # Complete Blood Count
+    "hemoglobin": ["hemoglobin", "haemoglobin", "hb", "hgb"],
+    "hematocrit": ["hematocrit", "haematocrit", "hct", "packed cell volume", "pcv"],
+    "rbc": ["rbc", "rbc count", "red blood cells", "red blood cell count", "erythrocytes"],
+    "wbc": ["wbc", "wbc count", "white blood cells", "white blood cell count", "total leukocyte count", "tlc", "leukocytes"],
+    "platelets": ["platelets", "platelet count", "plt"],
+    "mcv": ["mcv", "mean corpuscular volume"],
+    "mch": ["mch", "mean corpuscular hemoglobin"],
+    "mchc": ["mchc", "mean corpuscular hemoglobin concentration"],
+    "neutrophils": ["neutrophils"],
+    "lymphocytes": ["lymphocytes"],
+    # Lipid Profile
+    "total_cholesterol": ["total cholesterol", "cholesterol", "serum cholesterol", "cholesterol total"],
+    "ldl": ["ldl", "ldl cholesterol", "ldl-c", "low density lipoprotein"],
+    "hdl": ["hdl", "hdl cholesterol", "hdl-c", "high density lipoprotein"],
+    "vldl": ["vldl", "vldl cholesterol"],
+    "triglycerides": ["triglycerides", "triglyceride", "tg"],
+    # Glucose / Diabetes
+    "fasting_glucose": ["fasting glucose", "fasting blood glucose", "fasting blood sugar", "fbs", "fbg", "fasting plasma glucose"],
+    "random_glucose": ["random glucose", "random blood sugar", "rbs"],
+    "hba1c": ["hba1c", "hb a1c", "a1c", "glycated hemoglobin", "glycosylated hemoglobin"],
+    # Kidney Function
+    "creatinine": ["creatinine", "serum creatinine", "s. creatinine"],
+    "egfr": ["egfr", "gfr", "estimated gfr", "estimated glomerular filtration rate"],
+    "bun": ["bun", "blood urea nitrogen"],
+    "urea": ["urea", "blood urea", "serum urea"],
+    "uric_acid": ["uric acid", "serum uric acid"],
+    # Liver Function
+    "alt": ["alt", "sgpt", "alt/sgpt", "sgpt/alt", "alanine aminotransferase", "alanine transaminase"],
+    "ast": ["ast", "sgot", "ast/sgot", "sgot/ast", "aspartate aminotransferase", "aspartate transaminase"],
+    "alp": ["alp", "alkaline phosphatase"],
+    "ggt": ["ggt", "gamma gt", "gamma-glutamyl transferase"],
+    "total_bilirubin": ["total bilirubin", "bilirubin", "bilirubin total"],
+    "direct_bilirubin": ["direct bilirubin", "bilirubin direct", "conjugated bilirubin"],
+    "albumin": ["albumin", "serum albumin"],
+    "total_protein": ["total protein", "protein total"],
+    # Electrolytes
+    "sodium": ["sodium", "na", "na+", "serum sodium"],
+    "potassium": ["potassium", "k", "k+", "serum potassium"],
+    "chloride": ["chloride", "cl", "cl-", "serum chloride"],
+    "bicarbonate": ["bicarbonate", "hco3", "hco3-"],
+    "calcium": ["calcium", "ca", "serum calcium"],
+    # Thyroid
+    "tsh": ["tsh", "thyroid stimulating hormone"],
+}
+
+def _normalize_name(name: str) -> str:
+    name = name.replace("**", "").replace("*", "").lower()
+    name = re.sub(r"\([^)]*\)", " ", name)  # "ALT (Liver Enzyme)" -> "alt"
+    return re.sub(r"\s+", " ", name).strip(" :.-")
+
+# Exact lookup for table cells, e.g. "SGPT" -> "alt"
+_SYNONYM_TO_ANALYTE: Dict[str, str] = {
+    synonym: analyte for analyte, synonyms in ANALYTE_SYNONYMS.items() for synonym in synonyms
+}
+
+# Whole-word search inside free text (questions), longest synonym first
+_SYNONYM_PATTERN = re.compile(
+    r"(?<![\w])(" + "|".join(
+        re.escape(s) for s in sorted(_SYNONYM_TO_ANALYTE, key=len, reverse=True)
+    ) + r")(?![\w+-])"
+)
+
+# "Test, Qualifier" / "Test; Qualifier" / "Test - Qualifier" (spaced dash only: "LDL-C" is one name)
+QUALIFIER_SEPARATOR = re.compile(r"\s*[,;]\s*|\s+-\s+")
+
+def normalize_analyte(name: str) -> Optional[str]:
+    """Canonical analyte for a lab-table test name, or None if unknown."""
+    normalized = _normalize_name(name)
+    if normalized in _SYNONYM_TO_ANALYTE:
+        return _SYNONYM_TO_ANALYTE[normalized]
+    # "Creatinine, Serum" / "Glucose - Fasting" / "Glucose (Fasting)": a head plus
+    # qualifiers, tried as "qualifier head" ("fasting glucose"), "head qualifier", then the head alone
+    head, *qualifiers = QUALIFIER_SEPARATOR.split(normalized)
+    qualifiers += re.findall(r"\(([^)]*)\)", name.lower())
+    for qualifier in map(_normalize_name, qualifiers):
+        for candidate in (f"{qualifier} {head}", f"{head} {qualifier}"):
+            if candidate in _SYNONYM_TO_ANALYTE:
+                return _SYNONYM_TO_ANALYTE[candidate]
+    return _SYNONYM_TO_ANALYTE.get(head.strip())
+
+def find_analytes(text: str) -> List[Tuple[str, int, int]]:
+    """(analyte, start, end) of each analyte named in free text (lowercased offsets)."""
+    return [
+        (_SYNONYM_TO_ANALYTE[m.group(1)], m.start(1), m.end(1))
+        for m in _SYNONYM_PATTERN.finditer(text.lower())
+    ]
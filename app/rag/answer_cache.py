@@ -0,0 +1,65 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from app.core.cache import InMemoryCacheBackend, RedisCacheBackend
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.rag.embeddings import normalize_query
+from app.rag.query_router import YearFilter, year_label
+
+CORPUS_VERSION_KEY = "vitalsource:corpus_version"
+ANSWER_KEY_PREFIX = "vitalsource:answer"
+
+_backend = None
+
+def get_cache_backend():
+    """Backend selected by ANSWER_CACHE_BACKEND ("memory" or "redis")."""
+    global _backend
+    if _backend is None:
+        if settings.ANSWER_CACHE_BACKEND == "redis":
+            _backend = RedisCacheBackend(settings.ANSWER_CACHE_URL, settings.ANSWER_CACHE_TTL)
+        else:
+            _backend = InMemoryCacheBackend(
+                settings.ANSWER_CACHE_MAX_ENTRIES, settings.ANSWER_CACHE_TTL,
+                settings.CACHE_COUNTERS_PATH, settings.CACHE_COUNTERS_TTL
+            )
+    return _backend
+
+def set_cache_backend(backend):
+    """Swaps the backend (e.g. a RedisCacheBackend around a local stand-in)."""
+    global _backend
+    _backend = backend
+
+def get_corpus_version() -> int:
+    return get_cache_backend().get_int(CORPUS_VERSION_KEY)
+
+def bump_corpus_version() -> int:
+    """Called after every successful ingest; all cached answers become unreachable."""
+    return get_cache_backend().incr(CORPUS_VERSION_KEY)
+
+def _answer_key(question: str, year_filter: YearFilter, version: int) -> str:
+    digest = hashlib.sha256(normalize_query(question).encode("utf-8")).hexdigest()
+    return f"{ANSWER_KEY_PREFIX}:v{version}:{year_label(year_filter)}:{digest}"
+
+def get_cached_answer(question: str, year_filter: YearFilter) -> Optional[Dict[str, Any]]:
+    backend = get_cache_backend()
+    raw = backend.get(_answer_key(question, year_filter, get_corpus_version()))
+    record_cache("answer", raw is not None)
+    return json.loads(raw) if raw is not None else None
+
+def store_answer(question: str, year_filter: YearFilter, payload: Dict[str, Any]):
+    backend = get_cache_backend()
+    backend.set(_answer_key(question, year_filter, get_corpus_version()), json.dumps(payload))
+
+async def aget_cached_answer(question: str, year_filter: YearFilter) -> Optional[Dict[str, Any]]:
+    # Remote backends do network IO; keep it off the event loop
+    if get_cache_backend().remote:
+        return await run_blocking(get_cached_answer, question, year_filter)
+    return get_cached_answer(question, year_filter)
+
+async def astore_answer(question: str, year_filter: YearFilter, payload: Dict[str, Any]):
+    if get_cache_backend().remote:
+        await run_blocking(store_answer, question, year_filter, payload)
+    else:
+        store_answer(question, year_filter, payload)
@@ -0,0 +1,123 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Alphanumeric runs, so analyte names survive intact: "HbA1c" -> "hba1c", "eGFR" -> "egfr"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by did do does for from had has have how i in is it its me my
+of on or show tell that the this to was were what when which who with you your
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def rrf_fuse(ranked_lists: Sequence[Sequence[str]], weights: Sequence[float], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Weighted reciprocal-rank fusion: score(d) = sum_i w_i / (k + rank_i(d)).
+    Rank-based, so BM25 and cosine scores never need to be on the same scale.
+    """
+    fused: Dict[str, float] = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ranked, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+class BM25Index:
+    """
+    Okapi BM25 over an in-memory inverted index (term -> {doc_id: tf}).
+    Updated incrementally as chunks are upserted / deleted during ingestion.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def add_many(self, docs: Iterable[Tuple[str, str]]):
+        docs = list(docs)
+        self.remove_many(doc_id for doc_id, _ in docs)
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        self.remove_many([doc_id])
+
+    def remove_many(self, doc_ids: Iterable[str]):
+        removed = set()
+        for doc_id in doc_ids:
+            length = self.doc_lengths.pop(doc_id, None)
+            if length is not None:
+                self.total_length -= length
+                removed.add(doc_id)
+        if not removed:
+            return
+        # Postings are only reachable by term, so one scan per call;
+        # deletes are rare (re-ingest of a changed file) and batched per source.
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for doc_id in [d for d in removed if d in docs]:
+                del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 50, allowed: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Top-`limit` (doc_id, score); `allowed` applies metadata filters."""
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if allowed is not None:
+            scores = {doc_id: s for doc_id, s in scores.items() if allowed(doc_id)}
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    # --- Persistence ---
+    def save(self, path: Path):
+        tmp_path = Path(str(path) + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "postings": self.postings, "doc_lengths": self.doc_lengths}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = data["postings"]
+        index.doc_lengths = data["doc_lengths"]
+        index.total_length = sum(index.doc_lengths.values())
+        return index
@@ -1,54 +1,222 @@
-from typing import List, Dict, Any
+from bisect import bisect_left
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import hashlib
 import re
 import uuid
+from app.core.config import settings
+
+# Fixed namespace so chunk IDs are stable across runs and machines
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a3e-8d4b-5e7f-9a0b-1c2d3e4f5a6b")
+_NAMESPACE_BYTES = CHUNK_ID_NAMESPACE.bytes
+
+# --- Precompiled patterns (compiled once at import, not per page) ---
+PATIENT_PATTERN = re.compile(r"PATIENT:\s*(.*?)(\n|$)")
+DATE_PATTERN = re.compile(r"COLL DATE:\s*(.*?)(\n|$)")
+HEADER_PATTERN = re.compile(r"^[^\S\n]*#", re.MULTILINE)   # line starting with '#' (after indentation)
+# Approximate tokens for token-based sizing; long runs count as one token per 20 chars
+TOKEN_PATTERN = re.compile(r"\w{1,20}|[^\w\s]")
+
+SEPARATORS = ("\n\n", "\n", ". ", " ")
+HEADER_MAX_CHARS = 512
+
+# Section classifier: keywords matched against the lowercased header line; first matching row wins
+SECTION_RULES = (
+    ("cbc", ("blood count", "cbc")),
+    ("lipid_profile", ("lipid", "cholesterol")),
+    ("glucose_diabetes", ("diabetes", "glucose", "hba1c")),
+    ("kidney_function", ("kidney", "creatinine")),
+    ("liver_function", ("liver", "sgpt", "sgot")),
+    ("electrolytes", ("electrolyte",)),
+    ("clinical_interpretation", ("interpretation", "diagnosis")),
+)
+# All rules in one alternation (one regex scan per header); rule order breaks ties
+_SECTION_PATTERN = re.compile("|".join(
+    f"(?P<{tag}>{'|'.join(map(re.escape, keywords))})" for tag, keywords in SECTION_RULES
+))
+_SECTION_RANK = {tag: rank for rank, (tag, _) in enumerate(SECTION_RULES)}
+
+def classify_section(header_line: str) -> str:
+    matches = [m.lastgroup for m in _SECTION_PATTERN.finditer(header_line.lower())]
+    if not matches:
+        return "other"
+    return min(matches, key=_SECTION_RANK.__getitem__)
+
+def make_chunk_id(source_hash: str, page: int, offset: int, sub_offset: Optional[int] = None) -> str:
+    """
+    Deterministic chunk ID (UUIDv5) from (source content hash, page, character offset).
+    `sub_offset` distinguishes recursive sub-chunks of one section.
+    Doubles as the Weaviate object UUID, so re-indexing a chunk upserts it in place.
+    """
+    name = f"{source_hash}:{page}:{offset}"
+    if sub_offset is not None:
+        name += f":{sub_offset}"
+    # Same value as str(uuid.uuid5(CHUNK_ID_NAMESPACE, name)), without building UUID objects
+    digest = bytearray(hashlib.sha1(_NAMESPACE_BYTES + name.encode("utf-8")).digest()[:16])
+    digest[6] = (digest[6] & 0x0F) | 0x50  # version 5
+    digest[8] = (digest[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = digest.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+def text_length(text: str, unit: str = "chars") -> int:
+    """Length in sizing units: characters, or approximate tokens (words + punctuation)."""
+    if unit == "tokens":
+        return len(TOKEN_PATTERN.findall(text))
+    return len(text)
 
 # --- Custom Recursive Splitter (No LangChain) ---
-def recursive_split_text(text: str, chunk_size: int = 1500, chunk_overlap: int = 150) -> List[str]:
+def recursive_split_spans(
+    text: str,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 150,
+    unit: str = "chars"
+) -> List[Tuple[int, int]]:
     """
-    Splits text into chunks of a specified size with overlap, 
-    trying to break at logical separators like newlines.
+    Splits `text` into windows of at most `chunk_size` units (chars or tokens)
+    with `chunk_overlap` units of overlap, returning (start, end) character offsets.
+
+    Each window breaks at the best separator (paragraph, line, sentence, word)
+    in its second half, or hard-splits at the limit. Since a split never falls
+    in the first half and the overlap is capped at a quarter window, every step
+    advances by at least chunk_size / 4 units: one pass, linear in len(text).
     """
     if not text:
         return []
-    
-    chunks = []
-    start = 0
+
     text_len = len(text)
-    
-    while start < text_len:
-        end = start + chunk_size
-        if end >= text_len:
-            chunks.append(text[start:])
+    if unit == "tokens":
+        bounds = [m.start() for m in TOKEN_PATTERN.finditer(text)]
+        n_units = len(bounds)
+        to_offset = lambda u: bounds[u] if u < n_units else text_len
+        to_unit = lambda offset: bisect_left(bounds, offset)
+    else:
+        n_units = text_len
+        to_offset = to_unit = lambda x: x
+
+    chunk_size = max(chunk_size, 4)
+    chunk_overlap = min(max(chunk_overlap, 0), chunk_size // 4)
+    min_split = chunk_size // 2
+
+    spans = []
+    start_unit, start = 0, 0
+
+    while True:
+        end_unit = start_unit + chunk_size
+        if end_unit >= n_units:
+            spans.append((start, text_len))
             break
-        
-        # Try to find a separator to split on (newline, period, space)
-        # We search backwards from the 'end' point
-        split_found = False
-        for separator in ["\n\n", "\n", ". ", " "]:
-            split_index = text.rfind(separator, start, end)
+        end = to_offset(end_unit)
+
+        # Try to find a separator to split on (newline, period, space),
+        # searching backwards from 'end' but never into the first half of the window
+        floor = to_offset(start_unit + min_split)
+        for separator in SEPARATORS:
+            split_index = text.rfind(separator, floor, end)
             if split_index != -1:
-                # Found a good split point
-                chunks.append(text[start:split_index])
-                # Move start forward, minus overlap
-                start = split_index + len(separator) - chunk_overlap
-                split_found = True
+                next_unit = to_unit(split_index + len(separator))
                 break
-        
-        if not split_found:
+        else:
             # No separator found, force split at chunk_size
-            chunks.append(text[start:end])
-            start = end - chunk_overlap
+            split_index, next_unit = end, end_unit
+
+        spans.append((start, split_index))
+        # Move start forward, minus overlap (always strictly forward)
+        start_unit = max(next_unit - chunk_overlap, start_unit + 1)
+        start = to_offset(start_unit)
+
+    return spans
+
+def _section_bounds(content: str) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) of each header section in one regex pass over the page.
+    Mimics MarkdownHeaderTextSplitter: a section runs from a '#' line to the
+    newline before the next one; text before the first header is its own section.
+    """
+    starts = [m.start() for m in HEADER_PATTERN.finditer(content)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    for i, start in enumerate(starts):
+        yield start, (starts[i + 1] - 1 if i + 1 < len(starts) else len(content))
+
+def chunk_page(doc: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Splits one parsed page into logical sections (Chunks), yielding each as soon
+    as it is ready so the streaming ingestion pipeline can embed it immediately.
+    """
+    content = doc.get("page_content", "")
+    metadata = doc.get("metadata", {})
+
+    if not content:
+        return
+
+    unit = settings.CHUNK_SIZE_UNIT
+
+    # --- 1. Extract Global Context ---
+    patient_match = PATIENT_PATTERN.search(content)
+    date_match = DATE_PATTERN.search(content)
+
+    patient_context = patient_match.group(1).strip() if patient_match else "Unknown Patient"
+    date_context = date_match.group(1).strip() if date_match else "Unknown Date"
+
+    global_context_str = f"Patient: {patient_context} | Date: {date_context}\n"
+
+    # Stable identity for chunk IDs: content hash of the source PDF if known
+    source_hash = metadata.get("source_hash") or hashlib.sha256(
+        str(metadata.get("source", "")).encode("utf-8")
+    ).hexdigest()
+    page = metadata.get("page", 0)
 
-    return chunks
+    # --- 2. Split by Header ---
+    # Each split keeps its character offset in the page for deterministic IDs
+    for split_offset, split_end in _section_bounds(content):
+        split_content = content[split_offset:split_end]
+
+        # Determine section tag from the header line (bounded: a page without
+        # newlines would otherwise be scanned in full as its own "header")
+        line_end = split_content.find("\n", 0, HEADER_MAX_CHARS)
+        section_tag = classify_section(split_content[:HEADER_MAX_CHARS if line_end == -1 else line_end])
+
+        # --- 3. Filter "Other" / Boilerplate ---
+        if section_tag == "other" and len(split_content) < 500:
+            continue
+
+        # --- 4. Enhance Chunk with Context ---
+        enhanced_content = global_context_str + split_content
+
+        # Create metadata dict copy
+        chunk_metadata = metadata.copy()
+        chunk_metadata["chunk_id"] = make_chunk_id(source_hash, page, split_offset)
+        chunk_metadata["section"] = section_tag
+
+        # --- 5. Recursive Fallback ---
+        if text_length(enhanced_content, unit) > settings.CHUNK_MAX_SECTION_SIZE:
+            # Use our custom recursive splitter
+            spans = recursive_split_spans(
+                enhanced_content,
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+                unit=unit
+            )
+            for start, end in spans:
+                sub_meta = chunk_metadata.copy()
+                sub_meta["chunk_id"] = make_chunk_id(source_hash, page, split_offset, start)
+                yield {
+                    "page_content": enhanced_content[start:end],
+                    "metadata": sub_meta
+                }
+        else:
+            yield {
+                "page_content": enhanced_content,
+                "metadata": chunk_metadata
+            }
 
 def chunk_medical_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Splits medical markdown reports into logical sections (Chunks).
-    
+
     Expected input: List of dicts [{'page_content': str, 'metadata': dict}]
     Returns: List of dicts
     """
-    
+
     if not documents:
         print("⚠️ No documents provided to chunker.")
         return []
@@ -56,82 +224,7 @@ def chunk_medical_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, A
     final_chunks = []
 
     for doc in documents:
-        content = doc.get("page_content", "")
-        metadata = doc.get("metadata", {})
-        
-        if not content:
-            continue
-            
-        # --- 1. Extract Global Context ---
-        patient_match = re.search(r"PATIENT:\s*(.*?)(\n|$)", content)
-        date_match = re.search(r"COLL DATE:\s*(.*?)(\n|$)", content)
-        
-        patient_context = patient_match.group(1).strip() if patient_match else "Unknown Patient"
-        date_context = date_match.group(1).strip() if date_match else "Unknown Date"
-        
-        global_context_str = f"Patient: {patient_context} | Date: {date_context}\n"
-
-        # --- 2. Split by Header (Custom Implementation) ---
-        # We split the text by lines starting with #
-        # This mimics MarkdownHeaderTextSplitter
-        lines = content.split('\n')
-        header_splits = []
-        current_chunk_lines = []
-        
-        for line in lines:
-            # If line starts with #, it's a new section
-            if line.strip().startswith('#'):
-                if current_chunk_lines:
-                    header_splits.append("\n".join(current_chunk_lines))
-                    current_chunk_lines = []
-                current_chunk_lines.append(line)
-            else:
-                current_chunk_lines.append(line)
-        
-        if current_chunk_lines:
-            header_splits.append("\n".join(current_chunk_lines))
-
-        for split_content in header_splits:
-            # Determine section tag
-            header_line = split_content.split("\n")[0].lower()
-            section_tag = "other"
-            
-            if any(x in header_line for x in ["blood count", "cbc"]): section_tag = "cbc"
-            elif any(x in header_line for x in ["lipid", "cholesterol"]): section_tag = "lipid_profile"
-            elif any(x in header_line for x in ["diabetes", "glucose", "hba1c"]): section_tag = "glucose_diabetes"
-            elif any(x in header_line for x in ["kidney", "creatinine"]): section_tag = "kidney_function"
-            elif any(x in header_line for x in ["liver", "sgpt", "sgot"]): section_tag = "liver_function"
-            elif "electrolyte" in header_line: section_tag = "electrolytes"
-            elif any(x in header_line for x in ["interpretation", "diagnosis"]): section_tag = "clinical_interpretation"
-
-            # --- 3. Filter "Other" / Boilerplate ---
-            if section_tag == "other" and len(split_content) < 500:
-                continue
-
-            # --- 4. Enhance Chunk with Context ---
-            enhanced_content = global_context_str + split_content
-
-            # Create metadata dict copy
-            chunk_metadata = metadata.copy()
-            chunk_metadata["chunk_id"] = str(uuid.uuid4())
-            chunk_metadata["section"] = section_tag
-            
-            # --- 5. Recursive Fallback ---
-            if len(enhanced_content) > 2000:
-                # Use our custom recursive splitter
-                sub_texts = recursive_split_text(enhanced_content, chunk_size=1500, chunk_overlap=150)
-                for text in sub_texts:
-                    sub_meta = chunk_metadata.copy()
-                    sub_meta["chunk_id"] = str(uuid.uuid4())
-                    final_chunks.append({
-                        "page_content": text,
-                        "metadata": sub_meta
-                    })
-            else:
-                final_chunks.append({
-                    "page_content": enhanced_content,
-                    "metadata": chunk_metadata
-                })
+        final_chunks.extend(chunk_page(doc))
 
     print(f"✅ Chunking Complete. Created {len(final_chunks)} high-quality chunks.")
-    return final_chunks
\ No newline at end of file
+    return final_chunks
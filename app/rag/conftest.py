@@ -0,0 +1,24 @@
+import pytest
+from app.core.config import settings
+from app.rag import answer_cache, lab_index
+from app.rag.retrieval_cache import clear_retrieval_cache
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Points every on-disk path at a per-test temp directory (never the real data/)."""
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(settings, "RAW_DATA_DIR", tmp_path / "raw")
+    monkeypatch.setattr(settings, "PROCESSED_DATA_DIR", tmp_path / "processed")
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", tmp_path / "embedding_cache.sqlite3")
+    monkeypatch.setattr(settings, "INGEST_MANIFEST_PATH", tmp_path / "ingest_manifest.json")
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", tmp_path / "processed" / "parse_cache")
+    monkeypatch.setattr(settings, "JOBS_DIR", tmp_path / "jobs")
+    monkeypatch.setattr(settings, "LAB_INDEX_PATH", tmp_path / "lab_index.sqlite3")
+    monkeypatch.setattr(settings, "CACHE_COUNTERS_PATH", tmp_path / "cache_counters.sqlite3")
+    monkeypatch.setattr(settings, "CACHE_COUNTERS_TTL", 0)  # cross-worker tests expect immediate reads
+    monkeypatch.setattr(settings, "LOCAL_STORE_DIR", tmp_path / "vector_store")
+    # Process-wide singletons opened on those paths
+    monkeypatch.setattr(lab_index, "_index", None)
+    monkeypatch.setattr(answer_cache, "_backend", None)
+    clear_retrieval_cache()
+    return tmp_path
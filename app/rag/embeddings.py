@@ -1,10 +1,50 @@
-import google.generativeai as genai
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.concurrency import run_blocking
 from app.core.config import settings
-from typing import List
+from app.core.cache import LRUCache
+from app.core.metrics import record_cache, record_upstream_error, stage_timer, track_cache_size
+from typing import List, Optional
+from app.rag.embedding_cache import EmbeddingCache, get_embedding_cache
 
-# Configure SDK
-if settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
+# The Gemini SDK takes about a second to import: it is loaded and configured on
+# first use (or by the startup warm-up), not when the API process boots
+genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """The configured `google.generativeai` module, imported on first use."""
+    global genai
+    if genai is None:
+        with _genai_lock:
+            if genai is None:
+                import google.generativeai as sdk
+                if settings.GOOGLE_API_KEY:
+                    sdk.configure(api_key=settings.GOOGLE_API_KEY)
+                genai = sdk
+    return genai
+
+async def aget_genai():
+    """`get_genai` for coroutines: a first-time import runs on the executor, not the event loop."""
+    if genai is not None:
+        return genai
+    return await run_blocking(get_genai)
+
+# Model: models/text-embedding-004 is the latest stable
+EMBEDDING_MODEL = 'models/text-embedding-004'
+DOCUMENT_TASK_TYPE = "retrieval_document"
+DOCUMENT_TITLE = "Medical Record"
+QUERY_TASK_TYPE = "retrieval_query"
+
+# Hot questions repeat constantly; keep their vectors in memory (no disk, no network)
+_query_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE, settings.QUERY_EMBEDDING_CACHE_TTL)
+track_cache_size("query_embedding", _query_cache.__len__)
+
+def _cache_key(text: str, task_type: str, title: Optional[str]) -> str:
+    return EmbeddingCache.make_key(EMBEDDING_MODEL, task_type, title, text)
 
 def generate_embedding(text: str) -> List[float]:
     """
@@ -12,18 +52,236 @@ def generate_embedding(text: str) -> List[float]:
     """
     if not settings.GOOGLE_API_KEY:
         raise ValueError("GOOGLE_API_KEY missing.")
-        
-    # Model: models/text-embedding-004 is the latest stable
-    model = 'models/text-embedding-004' 
+
+    cache = get_embedding_cache()
+    key = _cache_key(text, DOCUMENT_TASK_TYPE, DOCUMENT_TITLE)
+    if cache is not None:
+        cached = cache.get(key)
+        record_cache("embedding", bool(cached))
+        if cached:
+            return cached
     
     try:
-        result = genai.embed_content(
-            model=model,
-            content=text,
-            task_type="retrieval_document",
-            title="Medical Record"
-        )
+        with stage_timer("embed_documents"):
+            result = get_genai().embed_content(
+                model=EMBEDDING_MODEL,
+                content=text,
+                task_type=DOCUMENT_TASK_TYPE,
+                title=DOCUMENT_TITLE
+            )
+        if cache is not None:
+            cache.put(key, result['embedding'])
         return result['embedding']
     except Exception as e:
+        record_upstream_error("gemini")
         print(f"⚠️ Embedding failed: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as the query-cache key and as the embedded text,
+    so "What is the HbA1c level?" and "what is the  hba1c level" share one vector.
+    """
+    text = re.sub(r"\s+", " ", query).strip().lower()
+    return text.strip(" ?!.,;:")
+
+def generate_query_embedding(query: str) -> List[float]:
+    """
+    Embeds a user question with the retrieval_query task type (asymmetric to the
+    retrieval_document vectors in the index). Served from an in-memory LRU/TTL cache.
+    """
+    if not settings.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY missing.")
+
+    normalized = normalize_query(query)
+    cached = _query_cache.get(normalized)
+    record_cache("query_embedding", cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        with stage_timer("embed"):
+            result = get_genai().embed_content(
+                model=EMBEDDING_MODEL,
+                content=normalized,
+                task_type=QUERY_TASK_TYPE
+            )
+        _query_cache.set(normalized, result['embedding'])
+        return result['embedding']
+    except Exception as e:
+        record_upstream_error("gemini")
+        print(f"⚠️ Query embedding failed: {e}")
+        return []
+
+async def agenerate_query_embedding(query: str) -> List[float]:
+    """Async variant of `generate_query_embedding`, sharing the same cache."""
+    if not settings.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY missing.")
+
+    normalized = normalize_query(query)
+    cached = _query_cache.get(normalized)
+    record_cache("query_embedding", cached is not None)
+    if cached is not None:
+        return cached
+
+    try:
+        sdk = await aget_genai()
+        with stage_timer("embed"):
+            result = await sdk.embed_content_async(
+                model=EMBEDDING_MODEL,
+                content=normalized,
+                task_type=QUERY_TASK_TYPE
+            )
+        _query_cache.set(normalized, result['embedding'])
+        return result['embedding']
+    except Exception as e:
+        record_upstream_error("gemini")
+        print(f"⚠️ Query embedding failed: {e}")
+        return []
+
+async def agenerate_query_embeddings(queries: List[str]) -> List[List[float]]:
+    """
+    Embeds many questions at once: cached and repeated questions are resolved
+    locally, the rest go out in batchEmbedContents requests (EMBEDDING_BATCH_SIZE
+    per call, sent concurrently). Output order matches input order; failures map to [].
+    """
+    if not settings.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY missing.")
+
+    normalized = [normalize_query(q) for q in queries]
+    vectors = {}
+    pending = []
+    for text in dict.fromkeys(normalized):
+        cached = _query_cache.get(text)
+        if cached is not None:
+            vectors[text] = cached
+        else:
+            pending.append(text)
+    record_cache("query_embedding", True, len(vectors))
+    record_cache("query_embedding", False, len(pending))
+
+    async def embed_slice(texts: List[str]):
+        try:
+            sdk = await aget_genai()
+            with stage_timer("embed"):
+                result = await sdk.embed_content_async(
+                    model=EMBEDDING_MODEL,
+                    content=texts,
+                    task_type=QUERY_TASK_TYPE
+                )
+            embeddings = result['embedding']
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            record_upstream_error("gemini")
+            # One bad question must not sink the batch: retry them individually
+            print(f"⚠️ Batch query embedding failed ({e}); retrying individually.")
+            embeddings = await asyncio.gather(*[agenerate_query_embedding(t) for t in texts])
+        for text, vector in zip(texts, embeddings):
+            if vector:
+                _query_cache.set(text, vector)
+                vectors[text] = vector
+
+    step = max(1, settings.EMBEDDING_BATCH_SIZE)
+    await asyncio.gather(*[embed_slice(pending[i:i + step]) for i in range(0, len(pending), step)])
+    return [vectors.get(text, []) for text in normalized]
+
+def _embed_batch_remote(texts: List[str], task_type: str, title: Optional[str]) -> List[List[float]]:
+    """One batchEmbedContents round-trip for up to EMBEDDING_BATCH_SIZE texts."""
+    try:
+        with stage_timer("embed_documents"):
+            result = get_genai().embed_content(
+                model=EMBEDDING_MODEL,
+                content=texts,
+                task_type=task_type,
+                title=title
+            )
+    except Exception:
+        record_upstream_error("gemini")
+        raise
+    vectors = result['embedding']
+    if len(vectors) != len(texts):
+        raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+    return vectors
+
+def _embed_single_with_retry(text: str, task_type: str, title: Optional[str]) -> List[float]:
+    """Retries one text on its own with exponential backoff. Returns [] if it keeps failing."""
+    for attempt in range(settings.EMBEDDING_MAX_RETRIES):
+        try:
+            return _embed_batch_remote([text], task_type, title)[0]
+        except Exception as e:
+            if attempt == settings.EMBEDDING_MAX_RETRIES - 1:
+                print(f"⚠️ Embedding failed after {attempt + 1} attempts: {e}")
+                return []
+            time.sleep(0.5 * 2 ** attempt)
+    return []
+
+def generate_embeddings_batch(
+    texts: List[str],
+    task_type: str = DOCUMENT_TASK_TYPE,
+    title: Optional[str] = DOCUMENT_TITLE,
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[List[float]]:
+    """
+    Generates embeddings for many texts, several per request, with up to
+    `max_concurrency` requests in flight. Output order matches input order.
+
+    If a whole batch request fails, its texts are retried individually so one
+    bad chunk cannot sink its neighbours. Texts that still fail map to [].
+
+    Cached texts (and duplicates within `texts`) are only embedded once.
+    """
+    if not settings.GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY missing.")
+    if not texts:
+        return []
+
+    # Serve what we can from the persistent cache; embed each unique miss once
+    cache = get_embedding_cache()
+    keys = [_cache_key(text, task_type, title) for text in texts]
+    known = cache.get_many(keys) if cache is not None else {}
+    if cache is not None:
+        hits = sum(1 for key in keys if key in known)
+        record_cache("embedding", True, hits)
+        record_cache("embedding", False, len(keys) - hits)
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in known and key not in pending:
+            pending[key] = text
+
+    if pending:
+        pending_keys = list(pending)
+        fresh = _embed_uncached([pending[k] for k in pending_keys], task_type, title, batch_size, max_concurrency)
+        new_vectors = {k: v for k, v in zip(pending_keys, fresh) if v}
+        if cache is not None:
+            cache.put_many(new_vectors)
+        known.update(new_vectors)
+
+    return [known.get(key, []) for key in keys]
+
+def _embed_uncached(
+    texts: List[str],
+    task_type: str,
+    title: Optional[str],
+    batch_size: Optional[int],
+    max_concurrency: Optional[int]
+) -> List[List[float]]:
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def embed(batch: List[str]) -> List[List[float]]:
+        try:
+            return _embed_batch_remote(batch, task_type, title)
+        except Exception as e:
+            print(f"⚠️ Batch of {len(batch)} embeddings failed ({e}). Retrying individually...")
+            return [_embed_single_with_retry(text, task_type, title) for text in batch]
+
+    vectors: List[List[float]] = []
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as pool:
+        # map() yields in submission order, so input order is preserved
+        for batch_vectors in pool.map(embed, batches):
+            vectors.extend(batch_vectors)
+    return vectors
@@ -1,73 +1,298 @@
 import os
-from groq import Groq
-from typing import List, Dict, Any
+import re
+import threading
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from app.core.concurrency import run_blocking
 from app.core.config import settings
+from app.core.metrics import record_llm_usage, record_upstream_error, stage_timer
+from app.rag.chunking import text_length
 
-# Initialize Groq Client
-client = Groq(
-    api_key=settings.GROQ_API_KEY,
-)
+# Groq Clients (sync for scripts, async for the API request path), built on first use
+# so importing this module doesn't pull in the SDK and its HTTP stack
+client = None
+async_client = None
+_client_lock = threading.Lock()
 
-def format_context_for_llm(chunks: List[Dict[str, Any]]) -> str:
-    """Formats retrieved chunks into a structured string for the LLM."""
-    formatted_text = ""
-    for i, chunk in enumerate(chunks):
-        formatted_text += f"""
---- SOURCE {i+1} ---
-Document: {chunk.get('source')}
-Date/Year: {chunk.get('year')}
-Section: {chunk.get('section')}
-Content:
-{chunk.get('content')}
--------------------
-"""
-    return formatted_text
+def get_groq_client():
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from groq import Groq
+                client = Groq(api_key=settings.GROQ_API_KEY)
+    return client
 
-def generate_answer_with_groq(query: str, chunks: List[Dict[str, Any]]) -> str:
-    """
-    Generates a medical answer using Llama 3.3 via Groq.
-    """
-    if not chunks:
-        return "I could not find any relevant medical records to answer your question."
+def get_async_groq_client():
+    global async_client
+    if async_client is None:
+        with _client_lock:
+            if async_client is None:
+                from groq import AsyncGroq
+                async_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+    return async_client
+
+async def aget_async_groq_client():
+    """`get_async_groq_client` for coroutines: a first-time import runs on the executor."""
+    if async_client is not None:
+        return async_client
+    return await run_blocking(get_async_groq_client)
 
-    context = format_context_for_llm(chunks)
-    
-    # System Prompt: Enforces strict "Verifiable RAG" behavior
-    system_prompt = """
+GROQ_MODEL = "openai/gpt-oss-120b"
+GENERATION_ERROR_PREFIX = "Error generating answer:"
+
+# System Prompt: Enforces strict "Verifiable RAG" behavior
+SYSTEM_PROMPT = """
     You are a Clinical AI Assistant. Your goal is to answer questions based ONLY on the provided medical context.
-    
+
     STRICT RULES:
     1. GROUNDING: Answer strictly using the 'Context' provided below. If the answer is not in the text, say "Information not found in the records."
     2. CITATIONS: When you mention a specific value (e.g., "Hemoglobin 14.5"), immediately cite the source ID like this: [Source 1].
     3. ACCURACY: Do not interpret or calculate unless explicitly asked. Copy units exactly (mg/dL, mmol/L).
     4. TONE: Professional, clinical, and direct.
-    
+
     Context:
     {context}
     """
 
-    user_message = f"User Question: {query}"
+# Every section chunk starts with the page's "Patient: ... | Date: ..." line (see chunking.chunk_page)
+CHUNK_HEADER_PATTERN = re.compile(r"\APatient: [^\n]*\| Date: [^\n]*\n")
+# Shortest repeated run treated as split overlap (recursive windows overlap by CHUNK_OVERLAP)
+OVERLAP_PROBE_CHARS = 32
 
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt.format(context=context)
-                },
-                {
-                    "role": "user",
-                    "content": user_message
-                }
-            ],
-            # UPDATED MODEL NAME
-            model="openai/gpt-oss-120b",
-            temperature=0, 
-            max_tokens=500,
+SOURCE_TEMPLATE = """
+--- SOURCE {number} ---
+Document: {source}
+Date/Year: {year}
+Section: {section}
+Content:
+{content}
+-------------------
+"""
+
+def split_chunk_header(content: str) -> Tuple[Optional[str], str]:
+    """('Patient: ... | Date: ...', rest) for a chunk that starts with the page header, else (None, content)."""
+    match = CHUNK_HEADER_PATTERN.match(content)
+    if match is None:
+        return None, content
+    return match.group(0).strip(), content[match.end():]
+
+def _trim_overlap(text: str, previous: str) -> str:
+    """
+    Removes what `text` repeats from `previous`: all of it if contained, else the
+    run shared at the seam of two neighbouring recursive-split windows (either order).
+    """
+    if not text or not previous:
+        return text
+    if text in previous:
+        return ""
+
+    # `text` continues `previous`: its head repeats previous's tail (earliest match = longest overlap)
+    probe = text[:OVERLAP_PROBE_CHARS]
+    if len(probe) == OVERLAP_PROBE_CHARS:
+        start = previous.find(probe)
+        while start != -1:
+            if text.startswith(previous[start:]):
+                return text[len(previous) - start:]
+            start = previous.find(probe, start + 1)
+
+    # `text` precedes `previous`: its tail repeats previous's head
+    probe = text[-OVERLAP_PROBE_CHARS:]
+    if len(probe) == OVERLAP_PROBE_CHARS:
+        end = previous.rfind(probe)
+        while end != -1:
+            head = previous[:end + OVERLAP_PROBE_CHARS]
+            if text.endswith(head):
+                return text[:len(text) - len(head)]
+            end = previous.rfind(probe, 0, end + OVERLAP_PROBE_CHARS - 1)
+    return text
+
+def pack_context(chunks: List[Dict[str, Any]], token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Chooses what goes into the prompt, best score first, within `token_budget`
+    approximate tokens (CONTEXT_TOKEN_BUDGET by default; 0 = unlimited):
+      - the page header is pulled out of each chunk (printed once when chunks share it),
+      - text already present from a neighbouring chunk of the same page/section
+        (recursive-split overlap) is cut, and fully repeated chunks are dropped,
+      - chunks that no longer fit are skipped; the first is truncated if needed.
+
+    Returns copies of the kept chunks with `context_text` / `context_header` set.
+    Number them [Source N] and build the citations from this same list.
+    """
+    with stage_timer("context_pack"):
+        return _pack_context(chunks, settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget)
+
+def _pack_context(chunks: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+    ranked = sorted(chunks, key=lambda c: c.get("score") or 0.0, reverse=True)
+
+    packed: List[Dict[str, Any]] = []
+    seen_text: Dict[Tuple[Any, Any, Any], List[str]] = {}
+    headed = set()  # (source, header) lines already paid for
+    used = 0
+
+    for chunk in ranked:
+        header, text = split_chunk_header(chunk.get("content") or "")
+        key = (chunk.get("source"), chunk.get("page"), chunk.get("section"))
+        body = text
+        for previous in seen_text.get(key, []):
+            body = _trim_overlap(body, previous)
+        body = body.strip()
+        if not body:
+            continue
+
+        block = SOURCE_TEMPLATE.format(
+            number=len(packed) + 1, source=chunk.get("source"), year=chunk.get("year"),
+            section=chunk.get("section"), content=body
         )
+        cost = text_length(block, "tokens")
+        if header and (chunk.get("source"), header) not in headed:
+            cost += text_length(header, "tokens") + 4
+        if budget > 0 and used + cost > budget:
+            if packed:
+                continue
+            # Never send an empty context: cut the best chunk down to the budget
+            body = body[:max(1, len(body) * budget // cost)]
+
+        seen_text.setdefault(key, []).append(text)
+        if header:
+            headed.add((chunk.get("source"), header))
+        packed.append({**chunk, "context_text": body, "context_header": header})
+        used += cost
+    return packed
+
+def format_context_for_llm(chunks: List[Dict[str, Any]]) -> str:
+    """
+    Formats chunks into the prompt context, one numbered block per chunk. A
+    patient/date line shared by several chunks of a document is printed once
+    up front; a document with a single chunk keeps it inline. Chunks from
+    `pack_context` use their trimmed text; raw retrieval hits are shown whole.
+    """
+    entries = []
+    for chunk in chunks:
+        if "context_text" in chunk:
+            entries.append((chunk, chunk.get("context_header"), chunk["context_text"]))
+        else:
+            entries.append((chunk, *split_chunk_header(chunk.get("content") or "")))
+
+    # Hoisting only pays off when the line would otherwise repeat
+    uses: Dict[Tuple[Any, str], int] = {}
+    for chunk, header, _ in entries:
+        if header:
+            uses[(chunk.get("source"), header)] = uses.get((chunk.get("source"), header), 0) + 1
+    headers: Dict[Any, str] = {}
+    for (source, header), count in uses.items():
+        if count > 1:
+            headers.setdefault(source, header)
+
+    blocks = []
+    for i, (chunk, header, text) in enumerate(entries):
+        if header and headers.get(chunk.get("source")) != header:
+            text = f"{header}\n{text}"
+        blocks.append(SOURCE_TEMPLATE.format(
+            number=i + 1, source=chunk.get("source"), year=chunk.get("year"),
+            section=chunk.get("section"), content=text
+        ))
+
+    if not headers:
+        return "".join(blocks)
+    records = "\n".join(f"Document: {source} | {header}" for source, header in headers.items())
+    return f"\n=== PATIENT RECORDS ===\n{records}\n" + "".join(blocks)
+
+def build_messages(query: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Builds the chat messages (system prompt with context + user question)."""
+    with stage_timer("prompt_build"):
+        context = format_context_for_llm(chunks)
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT.format(context=context)
+            },
+            {
+                "role": "user",
+                "content": f"User Question: {query}"
+            }
+        ]
+
+def generate_answer_with_groq(query: str, chunks: List[Dict[str, Any]]) -> str:
+    """
+    Generates a medical answer using Llama 3.3 via Groq.
+    """
+    if not chunks:
+        return "I could not find any relevant medical records to answer your question."
+
+    try:
+        messages = build_messages(query, chunks)
+        with stage_timer("generate"):
+            chat_completion = get_groq_client().chat.completions.create(
+                messages=messages,
+                # UPDATED MODEL NAME
+                model=GROQ_MODEL,
+                temperature=0,
+                max_tokens=500,
+            )
+        record_llm_usage(getattr(chat_completion, "usage", None))
 
         return chat_completion.choices[0].message.content
 
     except Exception as e:
+        record_upstream_error("groq")
         print(f"❌ Groq Generation Error: {e}")
-        return f"Error generating answer: {str(e)}"
\ No newline at end of file
+        return f"{GENERATION_ERROR_PREFIX} {str(e)}"
+
+async def agenerate_answer_with_groq(query: str, chunks: List[Dict[str, Any]]) -> str:
+    """
+    Async variant of `generate_answer_with_groq` using AsyncGroq,
+    so a slow completion does not stall other requests on the worker.
+    """
+    if not chunks:
+        return "I could not find any relevant medical records to answer your question."
+
+    try:
+        messages = build_messages(query, chunks)
+        groq_client = await aget_async_groq_client()
+        with stage_timer("generate"):
+            chat_completion = await groq_client.chat.completions.create(
+                messages=messages,
+                model=GROQ_MODEL,
+                temperature=0,
+                max_tokens=500,
+            )
+        record_llm_usage(getattr(chat_completion, "usage", None))
+
+        return chat_completion.choices[0].message.content
+
+    except Exception as e:
+        record_upstream_error("groq")
+        print(f"❌ Groq Generation Error: {e}")
+        return f"{GENERATION_ERROR_PREFIX} {str(e)}"
+
+async def astream_answer_with_groq(query: str, chunks: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Streams answer tokens from the Groq streaming API as they are generated.
+    Errors propagate to the caller, which reports them to the client.
+    """
+    if not chunks:
+        yield "I could not find any relevant medical records to answer your question."
+        return
+
+    messages = build_messages(query, chunks)
+    # "generate" covers request to last token, as for the non-streaming call
+    groq_client = await aget_async_groq_client()
+    with stage_timer("generate"):
+        try:
+            stream = await groq_client.chat.completions.create(
+                messages=messages,
+                model=GROQ_MODEL,
+                temperature=0,
+                max_tokens=500,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                # Groq reports usage on the final chunk (x_groq.usage)
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    record_llm_usage(getattr(x_groq, "usage", None))
+        except Exception:
+            record_upstream_error("groq")
+            raise
@@ -1,16 +1,39 @@
 import os
-import nest_asyncio
+import asyncio
+import hashlib
 import re
-from typing import List, Dict, Any
-from llama_parse import LlamaParse
+import time
+from typing import List, Dict, Any, AsyncIterator, TYPE_CHECKING
 from app.core.config import settings
+from app.core.concurrency import run_ingest_blocking
+from app.core.metrics import record_cache, record_upstream_error, stage_timer
+from app.rag.parse_cache import cache_key, load_parsed_pages, store_parsed_pages
 
-nest_asyncio.apply()
+if TYPE_CHECKING:
+    from llama_parse import LlamaParse
+
+# Everything that changes LlamaParse output; part of the parse cache key
+PARSER_SETTINGS = {
+    "result_type": "markdown",
+    "language": "en",
+    "user_prompt": (
+        "This is a medical lab report. "
+        "Ensure all numerical values, units, and flags are preserved exactly in the markdown tables."
+    )
+}
 
 def extract_year_from_filename(filename: str) -> str:
     match = re.search(r"202\d", filename)
     return str(match.group(0)) if match else "Unknown"
 
+def file_sha256(path: str) -> str:
+    """Content fingerprint of a source file (streamed, constant memory)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def clean_medical_text(text: str) -> str:
     noise_patterns = [
         "CLINICTECH LABS - COMPREHENSIVE REPORT",
@@ -24,63 +47,146 @@ def clean_medical_text(text: str) -> str:
         cleaned_text = re.sub(pattern, "", cleaned_text, flags=re.IGNORECASE)
     return cleaned_text.strip()
 
-async def vision_based_parsing(file_paths: List[str]) -> List[Dict[str, Any]]:
-    """
-    Ingestion using LlamaParse. Returns List[Dict] (Pure Python).
-    """
-    processed_documents = []
-
-    if not file_paths:
-        return []
-
+def build_parser() -> "LlamaParse":
     if not settings.LLAMA_CLOUD_API_KEY:
         raise ValueError("LLAMA_CLOUD_API_KEY is missing in .env")
 
-    parser = LlamaParse(
+    # Imported here: llama_parse pulls in llama_index (~2s) and is only needed to parse
+    from llama_parse import LlamaParse
+    return LlamaParse(
         api_key=settings.LLAMA_CLOUD_API_KEY,
-        result_type="markdown",
         verbose=True,
-        language="en",
-        user_prompt=(
-            "This is a medical lab report. "
-            "Ensure all numerical values, units, and flags are preserved exactly in the markdown tables."
-        )
+        **PARSER_SETTINGS
     )
 
-    print(f"🚀 Initialized LlamaParse. Processing {len(file_paths)} files...")
+def _to_page_dicts(page_texts: List[str], filename: str, source_hash: str) -> List[Dict[str, Any]]:
+    # Metadata comes from the current filename, so a cached parse reused
+    # under a new name still gets the right source/year
+    year = extract_year_from_filename(filename)
 
-    for pdf_path in file_paths:
-        filename = os.path.basename(pdf_path)
-        print(f"\n📄 Sending to LlamaCloud: {filename}")
+    pages = []
+    for i, text in enumerate(page_texts):
+        page_num = i + 1
+        cleaned_content = clean_medical_text(text)
         
-        try:
-            parsed_docs = await parser.aload_data(pdf_path)
-            year = extract_year_from_filename(filename)
-
-            for i, doc in enumerate(parsed_docs):
-                page_num = i + 1
-                cleaned_content = clean_medical_text(doc.text)
-                
-                # Return Dictionary, not Document object
-                doc_dict = {
-                    "page_content": cleaned_content,
-                    "metadata": {
-                        "source": filename,
-                        "page": page_num,
-                        "year": int(year) if year != "Unknown" else None,
-                        "extraction_method": "llama_parse_ocr_medical"
-                    }
-                }
-                processed_documents.append(doc_dict)
-                
-                # Debug Save
-                debug_path = settings.PROCESSED_DATA_DIR / f"{filename}_p{page_num}.md"
-                with open(debug_path, "w", encoding="utf-8") as f:
-                    f.write(cleaned_content)
-                
-            print(f"   ✅ Successfully parsed {len(parsed_docs)} pages.")
-
-        except Exception as e:
-            print(f"   ❌ Error parsing {filename}: {e}")
-
-    return processed_documents
\ No newline at end of file
+        # Return Dictionary, not Document object
+        doc_dict = {
+            "page_content": cleaned_content,
+            "metadata": {
+                "source": filename,
+                "page": page_num,
+                "year": int(year) if year != "Unknown" else None,
+                "source_hash": source_hash,
+                "extraction_method": "llama_parse_ocr_medical"
+            }
+        }
+        pages.append(doc_dict)
+    return pages
+
+async def parse_file(get_parser, pdf_path: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """
+    Parses one PDF under the shared semaphore, with a per-attempt timeout and
+    exponential backoff between retries. The on-disk parse cache (keyed by the
+    PDF's SHA-256 and PARSER_SETTINGS) is checked first; a hit skips LlamaParse.
+
+    Returns {"filename", "pages", "seconds", "attempts", "cached", "error"}; never raises.
+    """
+    filename = os.path.basename(pdf_path)
+    result = {"filename": filename, "pages": [], "seconds": 0.0, "attempts": 0, "cached": False, "error": None}
+
+    start = time.perf_counter()
+    try:
+        source_hash = await run_ingest_blocking(file_sha256, pdf_path)
+        key = cache_key(source_hash, PARSER_SETTINGS)
+        cached_pages = await run_ingest_blocking(load_parsed_pages, key)
+    except OSError as e:
+        result["error"] = str(e)
+        print(f"   ❌ Error reading {filename}: {e}")
+        return result
+
+    record_cache("parse", cached_pages is not None)
+    if cached_pages is not None:
+        result["pages"] = _to_page_dicts(cached_pages, filename, source_hash)
+        result["cached"] = True
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        print(f"   ⚡ Parse cache hit for {filename} ({len(cached_pages)} pages).")
+        return result
+
+    async with semaphore:
+        print(f"\n📄 Sending to LlamaCloud: {filename}")
+
+        for attempt in range(1, settings.PARSE_MAX_RETRIES + 1):
+            result["attempts"] = attempt
+            try:
+                parser = await get_parser()
+                with stage_timer("parse"):
+                    parsed_docs = await asyncio.wait_for(
+                        parser.aload_data(pdf_path),
+                        timeout=settings.PARSE_TIMEOUT_SECONDS
+                    )
+                page_texts = [doc.text for doc in parsed_docs]
+                await run_ingest_blocking(store_parsed_pages, key, source_hash, filename, PARSER_SETTINGS, page_texts)
+                result["pages"] = _to_page_dicts(page_texts, filename, source_hash)
+                result["error"] = None
+                print(f"   ✅ Successfully parsed {len(parsed_docs)} pages of {filename}.")
+                break
+            except (FileNotFoundError, ValueError) as e:
+                # Not transient: retrying will not help
+                result["error"] = str(e)
+                break
+            except asyncio.TimeoutError:
+                result["error"] = f"Timed out after {settings.PARSE_TIMEOUT_SECONDS}s"
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+
+            record_upstream_error("llamaparse")
+            if attempt < settings.PARSE_MAX_RETRIES:
+                delay = settings.PARSE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                print(f"   ⚠️ Parse attempt {attempt} for {filename} failed ({result['error']}). Retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+
+        result["seconds"] = round(time.perf_counter() - start, 3)
+
+    if result["error"]:
+        print(f"   ❌ Error parsing {filename}: {result['error']}")
+    return result
+
+async def iter_parsed_files(file_paths: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parses files concurrently (at most PARSE_MAX_CONCURRENCY in flight) and
+    yields each file's result as soon as it completes, not in input order.
+    """
+    if not file_paths:
+        return
+
+    # Only build the LlamaParse client if some file misses the cache
+    parser = None
+    parser_lock = asyncio.Lock()
+    async def get_parser() -> "LlamaParse":
+        nonlocal parser
+        async with parser_lock:
+            if parser is None:
+                # The first build imports llama_parse: keep that off the event loop
+                parser = await run_ingest_blocking(build_parser)
+        return parser
+
+    semaphore = asyncio.Semaphore(settings.PARSE_MAX_CONCURRENCY)
+    print(f"🚀 Processing {len(file_paths)} files...")
+
+    tasks = [asyncio.create_task(parse_file(get_parser, path, semaphore)) for path in file_paths]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Consumer stopped early (error / cancellation): don't leave parses running
+        for task in tasks:
+            task.cancel()
+
+async def vision_based_parsing(file_paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Ingestion using LlamaParse. Returns List[Dict] (Pure Python).
+    """
+    processed_documents = []
+    async for result in iter_parsed_files(file_paths):
+        processed_documents.extend(result["pages"])
+    return processed_documents
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.api.dependencies import get_vector_store
+from app.core.concurrency import run_ingest_blocking
+from app.core.config import settings
+from app.rag.answer_cache import bump_corpus_version
+from app.rag.manifest import record_ingested
+from app.rag.pipeline import new_ingest_stats, run_ingestion_pipeline
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+PROGRESS_FIELDS = [
+    "pages_parsed", "chunks_created", "chunks_embedded", "objects_indexed",
+    "chunks_skipped", "objects_failed", "chunks_failed"
+]
+
+def _progress(stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "progress": {field: stats[field] for field in PROGRESS_FIELDS},
+        "parse_timings": list(stats["files"]),
+        "first_indexed_seconds": stats["first_indexed_seconds"],
+        "total_seconds": stats["total_seconds"]
+    }
+
+class IngestionJobManager:
+    """
+    Runs /ingest work in the background.
+
+    Jobs are JSON files under JOBS_DIR, written on every state change and
+    periodically while running, so queued (or interrupted) work survives a
+    restart. At most INGEST_MAX_CONCURRENT_JOBS run at once per process.
+    A job's uploads (RAW_DATA_DIR/<job_id>) are deleted once it succeeds or
+    fails; job records older than INGEST_JOB_RETENTION_SECONDS are pruned.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._live: Dict[str, Dict[str, Any]] = {}  # job_id -> live pipeline stats
+
+    # --- Persistence ---
+    def _path(self, job_id: str):
+        return settings.JOBS_DIR / f"{job_id}.json"
+
+    def _save(self, job: Dict[str, Any]):
+        settings.JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        path = self._path(job["job_id"])
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def upload_dir(job_id: str) -> Path:
+        """Where /ingest saves a job's files (one folder per job)."""
+        return settings.RAW_DATA_DIR / job_id
+
+    def _finish(self, job: Dict[str, Any]):
+        """Final state: the uploads are parsed (or never will be), so drop them."""
+        shutil.rmtree(self.upload_dir(job["job_id"]), ignore_errors=True)
+
+    def prune(self) -> int:
+        """Deletes finished job records past the retention period; returns how many."""
+        retention = settings.INGEST_JOB_RETENTION_SECONDS
+        if retention <= 0 or not settings.JOBS_DIR.exists():
+            return 0
+        cutoff = time.time() - retention
+        pruned = 0
+        for path in settings.JOBS_DIR.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") in (JOB_SUCCEEDED, JOB_FAILED) and (job.get("finished_at") or 0) < cutoff:
+                path.unlink(missing_ok=True)
+                self._finish(job)
+                pruned += 1
+        return pruned
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(job_id)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # --- Public API ---
+    def create_job(self, job_id: str, file_paths: List[str], fingerprints: Dict[str, str], skipped: List[str]) -> Dict[str, Any]:
+        job = {
+            "job_id": job_id,
+            "status": JOB_QUEUED if file_paths else JOB_SUCCEEDED,
+            "file_paths": file_paths,
+            "files": [os.path.basename(p) for p in file_paths],
+            "files_skipped": skipped,
+            "fingerprints": fingerprints,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None if file_paths else time.time(),
+            "progress": {field: 0 for field in PROGRESS_FIELDS},
+            "parse_timings": [],
+            "first_indexed_seconds": None,
+            "total_seconds": None,
+            "error": None,
+            "message": None if file_paths else "No changes detected. All files are already indexed.",
+            "result": None
+        }
+        self._save(job)
+        if job["status"] == JOB_SUCCEEDED:
+            self._finish(job)
+        return job
+
+    async def submit(self, job: Dict[str, Any]):
+        if job["status"] == JOB_QUEUED:
+            await self._queue.put(job["job_id"])
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._load(job_id)
+        if job is not None and job_id in self._live:
+            job.update(_progress(self._live[job_id]))
+        return job
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    # --- Lifecycle ---
+    async def start(self):
+        self._queue = asyncio.Queue()
+        settings.JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        pruned = await run_ingest_blocking(self.prune)
+        if pruned:
+            print(f"🧹 Pruned {pruned} finished ingestion jobs past retention.")
+
+        # Resume work persisted by a previous process (queued, or cut off mid-run)
+        pending = []
+        for path in settings.JOBS_DIR.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") in (JOB_QUEUED, JOB_RUNNING):
+                pending.append(job)
+        for job in sorted(pending, key=lambda j: j["created_at"]):
+            job["status"] = JOB_QUEUED
+            self._save(job)
+            await self._queue.put(job["job_id"])
+        if pending:
+            print(f"♻️ Resuming {len(pending)} ingestion jobs.")
+
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.INGEST_MAX_CONCURRENT_JOBS)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # --- Execution ---
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _flush_progress(self, job: Dict[str, Any], stats: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(2)
+            job.update(_progress(stats))
+            self._save(job)  # small file; written inline so it never races the final save
+
+    async def _run(self, job_id: str):
+        job = self._load(job_id)
+        if job is None or job["status"] != JOB_QUEUED:
+            return
+
+        print(f"🏗️ Starting ingestion job {job_id} ({len(job['files'])} files)")
+        job["status"] = JOB_RUNNING
+        job["started_at"] = time.time()
+        self._save(job)
+
+        stats = new_ingest_stats()
+        self._live[job_id] = stats
+        flusher = asyncio.create_task(self._flush_progress(job, stats))
+        try:
+            store = await run_ingest_blocking(get_vector_store)
+            await run_ingestion_pipeline(job["file_paths"], store, stats)
+
+            if not stats["chunks_created"]:
+                raise ValueError("No text extracted from documents.")
+
+            # Remember fingerprints of files that produced indexed chunks
+            for filename, count in stats["indexed_per_source"].items():
+                if filename in job["fingerprints"]:
+                    record_ingested(filename, job["fingerprints"][filename], count, store.location())
+
+            # Invalidate cached answers (new corpus version)
+            bump_corpus_version()
+
+            job["status"] = JOB_SUCCEEDED
+            job["message"] = (
+                f"Ingestion complete. {stats['objects_indexed']} chunks indexed, "
+                f"{stats['chunks_skipped']} skipped (no embedding), {stats['objects_failed']} failed."
+            )
+            job["result"] = {
+                "status": "Success",
+                "message": job["message"],
+                "files_processed": job["files"],
+                "total_pages": stats["pages_parsed"],
+                "total_chunks": stats["chunks_created"],
+                "chunks_indexed": stats["objects_indexed"],
+                "chunks_skipped": stats["chunks_skipped"],
+                "chunks_failed": stats["objects_failed"],
+                "failed_chunk_ids": stats["failed_chunk_ids"],
+                "files_skipped": job["files_skipped"],
+                "parse_timings": stats["files"]
+            }
+        except asyncio.CancelledError:
+            # Shutdown mid-run: leave it queued so the next process picks it up
+            job["status"] = JOB_QUEUED
+            raise
+        except Exception as e:
+            print(f"❌ Ingestion job {job_id} failed: {e}")
+            job["status"] = JOB_FAILED
+            job["error"] = str(e)
+        finally:
+            flusher.cancel()
+            job.update(_progress(stats))
+            if job["status"] != JOB_QUEUED:
+                job["finished_at"] = time.time()
+            self._save(job)
+            self._live.pop(job_id, None)
+            if job["status"] != JOB_QUEUED:
+                await run_ingest_blocking(self._finish, job)
+                await run_ingest_blocking(self.prune)
+
+job_manager = IngestionJobManager()
@@ -0,0 +1,305 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.rag.analytes import find_analytes, normalize_analyte
+from app.rag.query_router import YearFilter, year_bounds
+
+# --- Markdown lab-table parsing ---
+# Header cell keywords -> column role (LlamaParse keeps the report's own headers)
+COLUMN_ROLES = (
+    ("reference", ("reference", "range", "normal", "ref.", "interval")),
+    ("unit", ("unit",)),
+    ("flag", ("flag", "status", "remark", "h/l")),
+    ("value", ("result", "value", "observed", "reading")),
+    ("name", ("test", "parameter", "analyte", "investigation", "component", "name", "description")),
+)
+SEPARATOR_CELL = re.compile(r":?-{3,}:?")
+VALUE_PATTERN = re.compile(r"^([<>≤≥]=?\s*)?(-?\d+(?:[.,]\d+)?)\s*(.*)$")
+FLAG_PATTERN = re.compile(r"^\(?(h|l|high|low|abnormal|critical|\*+)\)?$", re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"\b(20\d{2})\b")
+
+def _clean_cell(cell: str) -> str:
+    return cell.replace("**", "").replace("__", "").strip()
+
+def _column_roles(cells: List[str]) -> Optional[Dict[str, int]]:
+    """Maps a table header row to column roles; None unless it has a name and a value column."""
+    roles: Dict[str, int] = {}
+    for index, cell in enumerate(cells):
+        cell = cell.lower()
+        for role, keywords in COLUMN_ROLES:
+            if role not in roles and any(k in cell for k in keywords):
+                roles[role] = index
+                break
+    return roles if "name" in roles and "value" in roles else None
+
+def parse_lab_rows(content: str) -> List[Dict[str, Any]]:
+    """
+    Extracts (test, value, unit, reference range, flag) rows from the markdown
+    tables in a chunk. Tables whose header has no test-name/result columns are ignored.
+    """
+    rows = []
+    roles = None          # column roles of the current table; False = not a lab table
+    for line in content.split("\n"):
+        line = line.strip()
+        if not line.startswith("|"):
+            roles = None
+            continue
+        cells = [_clean_cell(c) for c in line.strip("|").split("|")]
+        if all(not c or SEPARATOR_CELL.fullmatch(c) for c in cells):
+            continue
+        if roles is None:
+            roles = _column_roles(cells) or False
+            continue
+        if roles is False:
+            continue
+
+        def cell(role: str) -> str:
+            index = roles.get(role)
+            return cells[index] if index is not None and index < len(cells) else ""
+
+        test_name, raw_value = cell("name"), cell("value")
+        match = VALUE_PATTERN.match(raw_value)
+        if not test_name or not match:
+            continue
+
+        comparator, number, rest = match.group(1) or "", match.group(2).replace(",", "."), match.group(3).strip()
+        unit, flag = cell("unit"), cell("flag")
+        # "7.1 H" / "14.5 g/dL" / "7.1 % (High)" inside the result cell
+        for token in rest.split():
+            if not flag and FLAG_PATTERN.match(token):
+                flag = token.strip("()")
+            elif not unit:
+                unit = token
+        rows.append({
+            "test_name": test_name,
+            "analyte": normalize_analyte(test_name) or test_name.lower(),
+            "value": f"{comparator.strip()}{number}",
+            "value_num": float(number),
+            "unit": unit,
+            "reference_range": cell("reference"),
+            "flag": flag.upper() if flag else "",
+            "row_text": line
+        })
+    return rows
+
+# --- Index ---
+class LabValueIndex:
+    """
+    Structured lab values extracted at ingest time, backed by SQLite.
+
+    One row per (report, page, test) with the analyte normalized through
+    `app.rag.analytes`, so "SGPT" and "ALT" land on the same key and value
+    lookups never need an embedding, a vector search or an LLM call.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lab_values ("
+            " source TEXT NOT NULL,"
+            " source_hash TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " year INTEGER NOT NULL,"
+            " section TEXT,"
+            " analyte TEXT NOT NULL,"
+            " test_name TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " value_num REAL,"
+            " unit TEXT,"
+            " reference_range TEXT,"
+            " flag TEXT,"
+            " chunk_id TEXT NOT NULL,"
+            " row_text TEXT NOT NULL,"
+            # Overlapping sub-chunks repeat table rows; keep the first occurrence
+            " UNIQUE (source_hash, page, test_name, value, unit))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lab_values_analyte ON lab_values(analyte, year)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lab_values_source ON lab_values(source)")
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        records = []
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            year = str(metadata.get("year", ""))
+            for row in parse_lab_rows(chunk.get("page_content", "")):
+                records.append((
+                    metadata.get("source", "Unknown"),
+                    metadata.get("source_hash", ""),
+                    int(metadata.get("page", 0)),
+                    int(year) if year.isdigit() else 0,
+                    metadata.get("section"),
+                    row["analyte"], row["test_name"], row["value"], row["value_num"],
+                    row["unit"], row["reference_range"], row["flag"],
+                    metadata.get("chunk_id", "unknown"),
+                    row["row_text"]
+                ))
+        if not records:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO lab_values (source, source_hash, page, year, section, analyte, test_name,"
+                " value, value_num, unit, reference_range, flag, chunk_id, row_text)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            return self._conn.total_changes - before
+
+    def delete_by_source(self, source: str, keep_hash: Optional[str] = None) -> int:
+        with self._lock:
+            if keep_hash:
+                cursor = self._conn.execute(
+                    "DELETE FROM lab_values WHERE source = ? AND source_hash != ?", (source, keep_hash)
+                )
+            else:
+                cursor = self._conn.execute("DELETE FROM lab_values WHERE source = ?", (source,))
+            return cursor.rowcount
+
+    def lookup(self, analyte: str, year: YearFilter = None, limit: int = 10) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM lab_values WHERE analyte = ?"
+        params: List[Any] = [analyte]
+        bounds = year_bounds(year)
+        if bounds is not None:
+            first, last = bounds
+            if first == last:
+                query += " AND year = ?"
+                params.append(first)
+            else:
+                query += " AND year >= ?"
+                params.append(first or 1)
+                if last is not None:
+                    query += " AND year <= ?"
+                    params.append(last)
+        query += " ORDER BY year DESC, source, page LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params).fetchall()]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows, analytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT analyte) FROM lab_values"
+            ).fetchone()
+        return {"rows": rows, "analytes": analytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_index: Optional[LabValueIndex] = None
+_index_lock = threading.Lock()
+
+def get_lab_index() -> Optional[LabValueIndex]:
+    """Process-wide index instance, or None when LAB_INDEX_ENABLED is false."""
+    global _index
+    if not settings.LAB_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LabValueIndex(settings.LAB_INDEX_PATH)
+    return _index
+
+def index_lab_values(chunks: List[Dict[str, Any]]) -> int:
+    """Ingestion hook: records the lab rows of chunks that were just indexed."""
+    index = get_lab_index()
+    return index.add_chunks(chunks) if index is not None else 0
+
+def delete_stale_lab_values(source: str, current_hash: str) -> int:
+    index = get_lab_index()
+    return index.delete_by_source(source, keep_hash=current_hash) if index is not None else 0
+
+# --- Query fast path ---
+# Words a pure value lookup may contain besides the analyte and a year
+LOOKUP_FILLER = frozenset("""
+what what's whats is was were are the a an my patient patient's patients his her their
+level levels value values result results reading readings count number
+of in for on from at during show me give tell get find check report reported test tested
+serum blood plasma please
+""".split())
+# Words asking for the newest result only ("What is the latest HbA1c?")
+LOOKUP_RECENCY = frozenset("current latest last recent most newest".split())
+QUESTION_TOKEN = re.compile(r"[a-z0-9']+")
+
+def match_value_lookup(question: str) -> Optional[Dict[str, Any]]:
+    """
+    {'analyte', 'year', 'latest'} if the question only asks for one analyte's value
+    ("What is the Creatinine level?", "HbA1c in 2023", "latest HbA1c"), else None.
+    """
+    text = re.sub(r"\([^)]*\)", " ", question.lower())  # "ALT (Liver Enzyme)" -> "alt"
+    found = find_analytes(text)
+    if not found or len({analyte for analyte, _, _ in found}) != 1:
+        return None
+
+    rest = text
+    for _, start, end in reversed(found):
+        rest = rest[:start] + " " + rest[end:]
+
+    year = None
+    latest = False
+    for token in QUESTION_TOKEN.findall(rest):
+        if YEAR_PATTERN.fullmatch(token):
+            year = int(token)
+        elif token in LOOKUP_RECENCY:
+            latest = True
+        elif token not in LOOKUP_FILLER:
+            return None
+    return {"analyte": found[0][0], "year": year, "latest": latest}
+
+def _format_value(row: Dict[str, Any]) -> str:
+    text = f"{row['test_name']}: {row['value']}"
+    if row["unit"]:
+        text += f" {row['unit']}"
+    if row["reference_range"]:
+        text += f" (reference range {row['reference_range']})"
+    if row["flag"]:
+        text += f", flagged {row['flag']}"
+    return text
+
+def answer_value_lookup(question: str, year: YearFilter = None) -> Optional[Dict[str, Any]]:
+    """
+    LLM-free answer for pure value lookups, straight from the lab index.
+    Returns {'answer', 'chunks'} (chunks shaped like retrieval hits, for citations)
+    or None when the question needs the RAG path.
+    """
+    index = get_lab_index()
+    if index is None:
+        return None
+    lookup = match_value_lookup(question)
+    if lookup is None:
+        return None
+
+    with stage_timer("lab_lookup"):
+        # "latest" = the single newest row, not every year's value
+        rows = index.lookup(lookup["analyte"], year or lookup["year"], limit=1 if lookup["latest"] else 10)
+    if not rows:
+        return None
+
+    chunks, lines = [], []
+    for i, row in enumerate(rows):
+        chunks.append({
+            "content": row["row_text"],
+            "source": row["source"],
+            "page": row["page"],
+            "year": row["year"] or None,
+            "section": row["section"],
+            "chunk_id": row["chunk_id"]
+        })
+        lines.append(f"{_format_value(row)} ({row['source']}, page {row['page']}) [Source {i + 1}]")
+
+    if len(lines) == 1:
+        answer = f"{lines[0]}."
+    else:
+        answer = "\n".join(f"- {line}" for line in lines)
+    return {"answer": answer, "chunks": chunks}
@@ -0,0 +1,468 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.rag.answer_cache import get_corpus_version
+from app.rag.bm25 import BM25Index, rrf_fuse
+from app.rag.query_router import YearFilter, year_bounds, year_matches
+from app.rag.vector_store import VectorStore, chunk_properties, upsert_report, DEFAULT_CERTAINTY
+
+# On-disk layout (LOCAL_STORE_DIR):
+#   vectors.f32    row-major float32 matrix, L2-normalized rows (memory-mapped on load)
+#   records.jsonl  one record per row (content + metadata), same order as the matrix
+#   header.json    {"rows", "dim", "generation"} (generation counts flushes, any worker)
+#   bm25.json      inverted index over chunk content (hybrid search)
+#   store.lock     flock: exclusive while a worker writes, shared while one loads
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+HEADER_FILE = "header.json"
+BM25_FILE = "bm25.json"
+LOCK_FILE = "store.lock"
+
+def _hit(record: Dict[str, Any], score: Optional[float]) -> Dict[str, Any]:
+    return {
+        "content": record["content"],
+        "source": record["source"],
+        "page": record["page"],
+        "year": record["year"],
+        "section": record["section"],
+        "chunk_id": record["chunk_id"],
+        "score": score
+    }
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector index for single-node deployments: exact cosine search
+    as one matrix-vector product over a contiguous NumPy array. No network
+    hop, no GraphQL; filters are boolean masks over per-row year / section arrays.
+    A BM25 inverted index is kept next to the matrix for hybrid search.
+
+    The unfiltered scan is memory-bound: 100k x 768 float32 reads 307 MB per
+    query, ~31-35 ms p50 on one core (benchmarks/bench_local_store.py); year +
+    section filters bring it to ~2 ms. With LOCAL_STORE_PREFILTER_DIMS set, a
+    contiguous copy of each row's first N dims is scanned instead and only the
+    best LOCAL_STORE_PREFILTER_POOL rows are rescored at full width
+    (128 dims / 256 rows: ~3.5 ms p50). That is approximate, so it is opt-in.
+
+    Every uvicorn worker holds its own copy. Readers reload from disk when the
+    shared corpus version (bumped after each ingest) moves and the header's
+    generation shows another worker flushed; a flush that finds a newer
+    generation on disk reloads it and replays this worker's pending deletes
+    and upserts before writing, all under an exclusive file lock.
+    """
+
+    name = "local"
+
+    def __init__(self, path: Optional[Path] = None):
+        import numpy as np
+        self._np = np
+        self.path = Path(path or settings.LOCAL_STORE_DIR)
+        self._lock = threading.RLock()
+
+        self._matrix = None        # (capacity, dim) float32, rows [0, _size) in use
+        self._prefix = None        # (capacity, prefix dims) copy for the prefilter pass, or None
+        self._size = 0
+        self._dim = 0
+        self._records: List[Dict[str, Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._years = np.zeros(0, dtype=np.int32)
+        self._sections = np.zeros(0, dtype=np.int16)
+        self._section_codes: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._mapped = False       # matrix is a read-only memmap until the first write
+        self._dirty = False
+        self._bm25 = BM25Index()
+        self._generation = 0       # header generation the in-memory copy was loaded from / flushed as
+        self._version = 0          # corpus version seen when it was loaded
+        self._pending_ids: set = set()                              # upserted since the last flush
+        self._pending_deletes: List[Tuple[str, Optional[str]]] = []  # delete_by_source calls since then
+
+        self._version = get_corpus_version()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._load()
+
+    # --- Persistence ---
+    @contextmanager
+    def _file_lock(self, mode: int):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / LOCK_FILE, "a") as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _disk_generation(self) -> int:
+        header_path = self.path / HEADER_FILE
+        if not header_path.exists():
+            return 0
+        return json.loads(header_path.read_text()).get("generation", 0)
+
+    def _reset(self):
+        np = self._np
+        self._matrix = None
+        self._prefix = None
+        self._size = 0
+        self._dim = 0
+        self._records = []
+        self._ids = {}
+        self._years = np.zeros(0, dtype=np.int32)
+        self._sections = np.zeros(0, dtype=np.int16)
+        self._section_codes = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._mapped = False
+        self._bm25 = BM25Index()
+        self._generation = 0
+        self._pending_ids = set()
+        self._pending_deletes = []
+
+    def _load(self):
+        """Replaces the in-memory copy with the files on disk (caller holds the file lock)."""
+        np = self._np
+        self._reset()
+        header_path = self.path / HEADER_FILE
+        if not header_path.exists():
+            return
+
+        header = json.loads(header_path.read_text())
+        rows, dim = header["rows"], header["dim"]
+        self._generation = header.get("generation", 0)
+        if rows:
+            self._matrix = np.memmap(self.path / VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, dim))
+            self._mapped = True
+        self._dim = dim
+        if rows and self._prefix_dims():
+            self._prefix = np.ascontiguousarray(self._matrix[:, :self._prefix_dims()])
+
+        with open(self.path / RECORDS_FILE, "r", encoding="utf-8") as f:
+            self._records = [json.loads(line) for line in f if line.strip()]
+        self._size = len(self._records)
+        self._ids = {r["chunk_id"]: i for i, r in enumerate(self._records)}
+        self._years = np.array([r.get("year", 0) for r in self._records], dtype=np.int32)
+        self._sections = np.array([self._section_code(r.get("section", "")) for r in self._records], dtype=np.int16)
+        self._alive = np.ones(self._size, dtype=bool)
+
+        bm25_path = self.path / BM25_FILE
+        if bm25_path.exists():
+            self._bm25 = BM25Index.load(bm25_path)
+        if len(self._bm25) != self._size:
+            # Store written before hybrid search existed (or an interrupted flush): rebuild
+            self._bm25 = BM25Index()
+            self._bm25.add_many((r["chunk_id"], r["content"]) for r in self._records)
+        print(f"📂 Loaded local vector store: {self._size} chunks ({dim} dims).")
+
+    def _sync(self):
+        """Picks up another worker's flush once the shared corpus version says there was one."""
+        version = get_corpus_version()
+        if version == self._version:
+            return
+        with self._lock:
+            # Unflushed writes stay in memory; flush() merges them with the newer files
+            if self._dirty or version == self._version:
+                return
+            with self._file_lock(fcntl.LOCK_SH):
+                self._version = version
+                if self._disk_generation() != self._generation:
+                    self._load()
+
+    def _merge_from_disk(self):
+        """Reloads another worker's newer files, then replays our deletes and surviving upserts."""
+        survivors = [
+            (self._records[row], self._matrix[row].copy())
+            for row in (self._ids.get(chunk_id) for chunk_id in self._pending_ids) if row is not None
+        ]
+        deletes = self._pending_deletes
+        self._load()
+        print(f"🔀 Local store changed on disk; replaying {len(deletes)} deletes and {len(survivors)} upserts.")
+        for source, keep_hash in deletes:
+            self._delete(source, keep_hash)
+        if survivors:
+            self._apply_upsert([record for record, _ in survivors], self._np.stack([v for _, v in survivors]))
+
+    def flush(self):
+        """Compacts deleted rows and writes the store atomically (tmp + rename) under the file lock."""
+        with self._lock:
+            if not self._dirty:
+                return
+            with self._file_lock(fcntl.LOCK_EX):
+                if self._disk_generation() != self._generation:
+                    self._merge_from_disk()
+                self._write()
+            self._pending_ids = set()
+            self._pending_deletes = []
+            self._dirty = False
+            print(f"💾 Local vector store saved: {self._size} chunks.")
+
+    def _write(self):
+        np = self._np
+        self._compact()
+        vectors_tmp = self.path / (VECTORS_FILE + ".tmp")
+        records_tmp = self.path / (RECORDS_FILE + ".tmp")
+        header_tmp = self.path / (HEADER_FILE + ".tmp")
+
+        matrix = self._matrix[:self._size] if self._matrix is not None else np.zeros((0, self._dim), np.float32)
+        matrix.tofile(vectors_tmp)
+        with open(records_tmp, "w", encoding="utf-8") as f:
+            for record in self._records:
+                f.write(json.dumps(record) + "\n")
+        self._generation += 1
+        header_tmp.write_text(json.dumps({"rows": self._size, "dim": self._dim, "generation": self._generation}))
+        self._bm25.save(self.path / BM25_FILE)
+
+        os.replace(vectors_tmp, self.path / VECTORS_FILE)
+        os.replace(records_tmp, self.path / RECORDS_FILE)
+        os.replace(header_tmp, self.path / HEADER_FILE)
+
+    def _compact(self):
+        if self._size == 0 or self._alive[:self._size].all():
+            return
+        keep = self._np.flatnonzero(self._alive[:self._size])
+        self._matrix = self._np.ascontiguousarray(self._matrix[keep])
+        if self._prefix is not None:
+            self._prefix = self._prefix[keep]
+        self._mapped = False
+        self._records = [self._records[i] for i in keep]
+        self._years = self._years[keep]
+        self._sections = self._sections[keep]
+        self._size = len(keep)
+        self._alive = self._np.ones(self._size, dtype=bool)
+        self._ids = {r["chunk_id"]: i for i, r in enumerate(self._records)}
+
+    # --- Internal helpers ---
+    def _section_code(self, section: str) -> int:
+        if section not in self._section_codes:
+            self._section_codes[section] = len(self._section_codes)
+        return self._section_codes[section]
+
+    def _prefix_dims(self) -> int:
+        dims = settings.LOCAL_STORE_PREFILTER_DIMS
+        return dims if 0 < dims < self._dim else 0
+
+    def _reserve(self, extra: int):
+        """Grows the arrays (capacity doubling) and detaches from the read-only memmap."""
+        np = self._np
+        needed = self._size + extra
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if needed <= capacity and not self._mapped:
+            return
+
+        new_capacity = max(needed, capacity * 2 if needed > capacity else capacity, 1024)
+        matrix = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        self._mapped = False
+        if self._prefix_dims():
+            prefix = np.zeros((new_capacity, self._prefix_dims()), dtype=np.float32)
+            prefix[:self._size] = self._matrix[:self._size, :self._prefix_dims()]
+            self._prefix = prefix
+
+        for attr, dtype in (("_years", np.int32), ("_sections", np.int16), ("_alive", bool)):
+            old = getattr(self, attr)
+            grown = np.zeros(new_capacity, dtype=dtype)
+            grown[:len(old)] = old[:new_capacity]
+            setattr(self, attr, grown)
+
+    # --- VectorStore API ---
+    def upsert(self, chunks: List[Dict[str, Any]], vectors: List[List[float]]) -> Dict[str, Any]:
+        np = self._np
+        pairs = []
+        for chunk, vector in zip(chunks, vectors):
+            if not vector:
+                print(f"⚠️ Skipping chunk {chunk.get('metadata', {}).get('chunk_id')} (No embedding after retries)")
+                continue
+            pairs.append((chunk_properties(chunk), vector))
+        skipped = len(chunks) - len(pairs)
+        if not pairs:
+            return upsert_report(skipped=skipped)
+
+        block = np.asarray([v for _, v in pairs], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        block /= np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._apply_upsert([record for record, _ in pairs], block)
+            self._pending_ids.update(record["chunk_id"] for record, _ in pairs)
+
+        return upsert_report(indexed=len(pairs), skipped=skipped)
+
+    def _apply_upsert(self, records: List[Dict[str, Any]], block):
+        """Writes normalized rows in memory (caller holds the lock)."""
+        if not self._dim:
+            self._dim = block.shape[1]
+        elif block.shape[1] != self._dim:
+            raise ValueError(f"Embedding dimension {block.shape[1]} != store dimension {self._dim}")
+
+        self._reserve(len(records))
+        for record, vector in zip(records, block):
+            # Same chunk_id -> overwrite in place (upsert, no duplicates)
+            row = self._ids.get(record["chunk_id"])
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._records.append(record)
+                self._ids[record["chunk_id"]] = row
+            else:
+                self._records[row] = record
+            self._matrix[row] = vector
+            if self._prefix is not None:
+                self._prefix[row] = vector[:self._prefix.shape[1]]
+            self._years[row] = record["year"]
+            self._sections[row] = self._section_code(record["section"])
+            self._alive[row] = True
+        self._bm25.add_many((record["chunk_id"], record["content"]) for record in records)
+        self._dirty = True
+
+    def delete_by_source(self, source: str, keep_hash: Optional[str] = None) -> int:
+        with self._lock:
+            self._pending_deletes.append((source, keep_hash))
+            return self._delete(source, keep_hash)
+
+    def _delete(self, source: str, keep_hash: Optional[str]) -> int:
+        deleted = []
+        for chunk_id, row in list(self._ids.items()):
+            record = self._records[row]
+            if record["source"] != source or (keep_hash and record["source_hash"] == keep_hash):
+                continue
+            self._alive[row] = False
+            del self._ids[chunk_id]
+            deleted.append(chunk_id)
+        if deleted:
+            self._bm25.remove_many(deleted)
+            self._dirty = True
+        return len(deleted)
+
+    def search(
+        self,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        certainty: float = DEFAULT_CERTAINTY
+    ) -> List[Dict[str, Any]]:
+        np = self._np
+        self._sync()
+        with self._lock:
+            size = self._size
+            if not size or not vector:
+                return []
+            matrix = self._matrix[:size]
+            prefix = self._prefix[:size] if self._prefix is not None else None
+            mask = self._alive[:size].copy()
+            bounds = year_bounds(year)
+            if bounds is not None:
+                # Year 0 = unknown, never inside a range
+                first, last = bounds
+                years = self._years[:size]
+                mask &= (years > 0) if first is None else (years >= first)
+                if last is not None:
+                    mask &= years <= last
+            if sections:
+                codes = [self._section_codes[s] for s in sections if s in self._section_codes]
+                mask &= np.isin(self._sections[:size], codes)
+            records = self._records
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        # Cosine similarity in one BLAS call; certainty = (1 + cos) / 2.
+        # Selective filters score only the matching rows instead of the whole matrix.
+        query = query / norm
+        rows = None if mask.all() else np.flatnonzero(mask)
+        if rows is not None and not len(rows):
+            return []
+        pool = max(settings.LOCAL_STORE_PREFILTER_POOL, limit)
+        if prefix is not None and (size if rows is None else len(rows)) > pool:
+            # Prefilter: rank by the prefix dims, rescore the best `pool` rows exactly
+            head = query[:prefix.shape[1]]
+            coarse = prefix @ head if rows is None else prefix[rows] @ head
+            best = np.argpartition(-coarse, pool - 1)[:pool]
+            rows = best if rows is None else rows[best]
+            scores = matrix[rows] @ query
+        elif rows is None:
+            scores = matrix @ query
+        else:
+            scores = matrix[rows] @ query if len(rows) < size // 2 else (matrix @ query)[rows]
+        scores[scores < 2 * certainty - 1] = -np.inf
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        hits = []
+        for i in top:
+            if scores[i] == -np.inf:
+                break
+            row = i if rows is None else rows[i]
+            hits.append(_hit(records[row], float((1 + scores[i]) / 2)))
+        return hits
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        alpha: float = 0.5,
+        candidates: int = 50
+    ) -> List[Dict[str, Any]]:
+        self._sync()
+        depth = max(limit, candidates)
+        vector_hits = self.search(vector, limit=depth, year=year, sections=sections) if alpha > 0 else []
+
+        lexical_ids = []
+        if alpha < 1:
+            def allowed(chunk_id: str) -> bool:
+                row = self._ids.get(chunk_id)
+                if row is None:
+                    return False
+                record = self._records[row]
+                return year_matches(record["year"], year) and (not sections or record["section"] in sections)
+
+            # Pure Python (holds the GIL anyway); the lock keeps ids/records consistent with writers
+            with self._lock:
+                lexical_ids = [chunk_id for chunk_id, _ in self._bm25.search(query_text, limit=depth, allowed=allowed)]
+
+        by_id = {hit["chunk_id"]: hit for hit in vector_hits}
+        with stage_timer("rerank"):
+            fused = rrf_fuse(
+                [[hit["chunk_id"] for hit in vector_hits], lexical_ids],
+                [alpha, 1 - alpha],
+                k=settings.RRF_K
+            )
+
+        hits = []
+        with self._lock:
+            for chunk_id, score in fused[:limit]:
+                hit = by_id.get(chunk_id)
+                if hit is None:
+                    row = self._ids.get(chunk_id)
+                    if row is None:
+                        continue
+                    hit = _hit(self._records[row], None)
+                hit["score"] = score
+                hits.append(hit)
+        return hits
+
+    def count(self) -> int:
+        self._sync()
+        return len(self._ids)
+
+    def has_source(self, source: str) -> bool:
+        self._sync()
+        with self._lock:
+            return any(self._records[row]["source"] == source for row in self._ids.values())
+
+    def location(self) -> str:
+        return f"local:{self.path.resolve()}"
+
+    def close(self):
+        self.flush()
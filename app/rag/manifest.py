@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, TYPE_CHECKING
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.rag.vector_store import VectorStore
+
+# Fingerprints of indexed source files, per vector-store location (backend + path / URL
+# + class, see VectorStore.location): {location: {filename: {"sha256", "chunks", "indexed_at"}}}.
+# Lets /ingest skip unchanged uploads and detect replaced ones; switching backends or
+# pointing at another store starts from an empty scope.
+_lock = threading.Lock()
+
+def load_manifest() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    path = settings.INGEST_MANIFEST_PATH
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable ingest manifest: {e}")
+        return {}
+    # Unscoped manifest (filename -> entry): no way to tell which store it describes
+    return {scope: files for scope, files in manifest.items() if "sha256" not in files}
+
+def _save_manifest(manifest: Dict[str, Dict[str, Any]]):
+    path = settings.INGEST_MANIFEST_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)  # atomic swap, never a half-written manifest
+
+def get_fingerprint(filename: str, location: str) -> Optional[str]:
+    entry = load_manifest().get(location, {}).get(filename)
+    return entry.get("sha256") if entry else None
+
+def is_unchanged(filename: str, sha256: str, store: "VectorStore") -> bool:
+    """
+    Same content was indexed into this store and its chunks are still there
+    (the store may have been wiped or rebuilt since).
+    """
+    if get_fingerprint(filename, store.location()) != sha256:
+        return False
+    try:
+        return store.has_source(filename)
+    except Exception as e:
+        print(f"⚠️ Could not check '{filename}' in the vector store, re-ingesting: {e}")
+        return False
+
+def record_ingested(filename: str, sha256: str, chunk_count: int, location: str):
+    with _lock:
+        manifest = load_manifest()
+        manifest.setdefault(location, {})[filename] = {
+            "sha256": sha256,
+            "chunks": chunk_count,
+            "indexed_at": time.time()
+        }
+        _save_manifest(manifest)
+
+def reset_manifest(location: str):
+    """Forget the fingerprints of one store (it was rebuilt from scratch)."""
+    with _lock:
+        manifest = load_manifest()
+        manifest.pop(location, None)
+        _save_manifest(manifest)
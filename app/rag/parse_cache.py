@@ -0,0 +1,133 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+# Bump when the on-disk layout changes; older entries are treated as misses
+CACHE_FORMAT_VERSION = 1
+
+def cache_key(source_hash: str, parser_settings: Dict[str, Any]) -> str:
+    """SHA-256 of the PDF content hash plus the parser settings that shape the output."""
+    payload = source_hash + "\x1f" + json.dumps(parser_settings, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _entry_path(key: str) -> Path:
+    return settings.PARSE_CACHE_DIR / f"{key}.json.gz"
+
+def load_parsed_pages(key: str) -> Optional[List[str]]:
+    """
+    Returns the raw page texts of a previous parse, or None on a miss.
+    A hit refreshes the file mtime, which `prune` uses as last-access time.
+    """
+    path = _entry_path(key)
+    if not path.exists():
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Discarding corrupt parse cache entry {path.name}: {e}")
+        path.unlink(missing_ok=True)
+        return None
+    if entry.get("format") != CACHE_FORMAT_VERSION:
+        return None
+    os.utime(path, None)
+    return entry["pages"]
+
+def store_parsed_pages(key: str, source_hash: str, filename: str, parser_settings: Dict[str, Any], pages: List[str]):
+    """One gzip'd JSON file per document: metadata header plus raw page texts."""
+    settings.PARSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "format": CACHE_FORMAT_VERSION,
+        "key": key,
+        "source_hash": source_hash,
+        "filename": filename,
+        "parser_settings": parser_settings,
+        "created_at": time.time(),
+        "page_count": len(pages),
+        "pages": pages
+    }
+    path = _entry_path(key)
+    tmp_path = path.with_suffix(".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(entry, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def _entries() -> List[Path]:
+    if not settings.PARSE_CACHE_DIR.exists():
+        return []
+    return list(settings.PARSE_CACHE_DIR.glob("*.json.gz"))
+
+def cache_stats() -> Dict[str, Any]:
+    entries = _entries()
+    return {
+        "entries": len(entries),
+        "size_bytes": sum(p.stat().st_size for p in entries),
+        "path": str(settings.PARSE_CACHE_DIR)
+    }
+
+def prune(older_than_days: Optional[float] = None, max_size_mb: Optional[float] = None, dry_run: bool = False) -> List[Path]:
+    """
+    Removes entries not accessed for `older_than_days`, then the least recently
+    used ones until the cache fits in `max_size_mb`. Returns the removed paths.
+    """
+    entries = sorted(_entries(), key=lambda p: p.stat().st_mtime)  # oldest first
+    removed = []
+
+    if older_than_days is not None:
+        cutoff = time.time() - older_than_days * 86400
+        removed.extend(p for p in entries if p.stat().st_mtime < cutoff)
+        entries = [p for p in entries if p not in removed]
+
+    if max_size_mb is not None:
+        budget = max_size_mb * 1024 * 1024
+        total = sum(p.stat().st_size for p in entries)
+        for p in entries:
+            if total <= budget:
+                break
+            total -= p.stat().st_size
+            removed.append(p)
+
+    if not dry_run:
+        for p in removed:
+            p.unlink(missing_ok=True)
+    return removed
+
+def main(argv: Optional[List[str]] = None):
+    cli = argparse.ArgumentParser(description="Manage the LlamaParse result cache.")
+    commands = cli.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Show entry count and size.")
+
+    prune_cmd = commands.add_parser("prune", help="Remove old or excess entries.")
+    prune_cmd.add_argument("--older-than-days", type=float, help="Drop entries not used for N days.")
+    prune_cmd.add_argument("--max-size-mb", type=float, help="Evict least recently used entries above this size.")
+    prune_cmd.add_argument("--all", action="store_true", help="Remove every entry.")
+    prune_cmd.add_argument("--dry-run", action="store_true", help="List what would be removed.")
+
+    args = cli.parse_args(argv)
+
+    if args.command == "stats":
+        stats = cache_stats()
+        print(f"📦 {stats['entries']} entries, {stats['size_bytes'] / 1024 / 1024:.2f} MB in {stats['path']}")
+        return
+
+    if args.all:
+        removed = prune(max_size_mb=0, dry_run=args.dry_run)
+    elif args.older_than_days is None and args.max_size_mb is None:
+        cli.error("prune needs --older-than-days, --max-size-mb or --all")
+    else:
+        removed = prune(args.older_than_days, args.max_size_mb, dry_run=args.dry_run)
+
+    verb = "Would remove" if args.dry_run else "Removed"
+    for p in removed:
+        print(f"   🗑️ {p.name}")
+    print(f"🧹 {verb} {len(removed)} cache entries.")
+
+if __name__ == "__main__":
+    main()
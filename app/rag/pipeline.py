@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from app.core.concurrency import run_ingest_blocking
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.rag.chunking import chunk_page
+from app.rag.embeddings import generate_embeddings_batch
+from app.rag.ingestion import iter_parsed_files
+from app.rag.lab_index import index_lab_values, delete_stale_lab_values
+from app.rag.vector_store import VectorStore, delete_stale_chunks
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+def new_ingest_stats() -> Dict[str, Any]:
+    """Live counters for one ingestion run (mutated in place while it runs)."""
+    return {
+        "files": [],                 # per-file parse results (timings, attempts, errors)
+        "pages_parsed": 0,
+        "chunks_created": 0,
+        "chunks_embedded": 0,
+        "objects_indexed": 0,
+        "chunks_skipped": 0,         # no embedding after retries
+        "objects_failed": 0,         # rejected by the vector store after retries
+        "chunks_failed": 0,          # skipped + failed (not searchable)
+        "failed_chunk_ids": [],
+        "indexed_per_source": {},    # filename -> indexed chunk count
+        "source_hashes": {},         # filename -> content hash of the indexed version
+        "first_indexed_seconds": None,
+        "total_seconds": None
+    }
+
+async def run_ingestion_pipeline(file_paths: List[str], store: VectorStore, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Streaming ingestion: parse -> chunk -> embed -> index.
+
+    Each stage is an asyncio task connected to the next by a bounded queue,
+    so a full downstream stage applies backpressure upstream and memory stays
+    flat regardless of upload size. Pages are chunked and embedded as soon as
+    their file is parsed, and embeddings are micro-batched: a worker takes
+    whatever is already queued (up to EMBEDDING_BATCH_SIZE) instead of waiting
+    for a full batch, so the first chunk is indexed after one page's work.
+    """
+    stats = stats if stats is not None else new_ingest_stats()
+    started = time.perf_counter()
+
+    await run_ingest_blocking(store.prepare)
+
+    embed_workers = max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+    page_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+    index_queue: asyncio.Queue = asyncio.Queue(maxsize=embed_workers * 2)
+
+    async def parse_stage():
+        async for parsed in iter_parsed_files(file_paths):
+            stats["files"].append({
+                "filename": parsed["filename"],
+                "seconds": parsed["seconds"],
+                "pages": len(parsed["pages"]),
+                "attempts": parsed["attempts"],
+                "cached": parsed["cached"],
+                "error": parsed["error"]
+            })
+            for page in parsed["pages"]:
+                await page_queue.put(page)
+                stats["pages_parsed"] += 1
+        await page_queue.put(_DONE)
+
+    async def chunk_stage():
+        while True:
+            page = await page_queue.get()
+            if page is _DONE:
+                break
+            with stage_timer("chunk"):
+                chunks = list(chunk_page(page))
+            for chunk in chunks:
+                await chunk_queue.put(chunk)
+                stats["chunks_created"] += 1
+        for _ in range(embed_workers):
+            await chunk_queue.put(_DONE)
+
+    async def embed_stage():
+        finished = False
+        while not finished:
+            first = await chunk_queue.get()
+            if first is _DONE:
+                break
+            batch = [first]
+            while len(batch) < settings.EMBEDDING_BATCH_SIZE:
+                try:
+                    item = chunk_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            vectors = await run_ingest_blocking(generate_embeddings_batch, [c["page_content"] for c in batch])
+            stats["chunks_embedded"] += sum(1 for v in vectors if v)
+            await index_queue.put((batch, vectors))
+        await index_queue.put(_DONE)
+
+    async def index_stage():
+        running = embed_workers
+        while running:
+            item = await index_queue.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            batch, vectors = item
+            with stage_timer("index"):
+                report = await run_ingest_blocking(store.upsert, batch, vectors)
+            indexed = report["indexed"]
+            failed_ids = set(report["failed_ids"])
+            stored = [c for c, v in zip(batch, vectors) if v and c["metadata"].get("chunk_id") not in failed_ids]
+            # Structured lab rows of the chunks that made it into the store (citable)
+            await run_ingest_blocking(index_lab_values, stored)
+            stats["objects_indexed"] += indexed
+            stats["chunks_skipped"] += report["skipped"]
+            stats["objects_failed"] += report["failed"]
+            stats["chunks_failed"] += report["skipped"] + report["failed"]
+            stats["failed_chunk_ids"].extend(report["failed_ids"])
+            for chunk in stored:
+                metadata = chunk["metadata"]
+                source = metadata.get("source", "Unknown")
+                stats["indexed_per_source"][source] = stats["indexed_per_source"].get(source, 0) + 1
+                if metadata.get("source_hash"):
+                    stats["source_hashes"][source] = metadata["source_hash"]
+            if stats["first_indexed_seconds"] is None and indexed:
+                stats["first_indexed_seconds"] = round(time.perf_counter() - started, 3)
+                print(f"⚡ First chunks indexed after {stats['first_indexed_seconds']}s")
+
+    tasks = [
+        asyncio.create_task(parse_stage()),
+        asyncio.create_task(chunk_stage()),
+        *[asyncio.create_task(embed_stage()) for _ in range(embed_workers)],
+        asyncio.create_task(index_stage())
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One stage failed: stop the others instead of leaving them blocked on a queue
+        for task in tasks:
+            task.cancel()
+        raise
+
+    # Drop chunks left over from previous versions of the files we just indexed
+    for source, source_hash in stats["source_hashes"].items():
+        await run_ingest_blocking(delete_stale_chunks, store, source, source_hash)
+        await run_ingest_blocking(delete_stale_lab_values, source, source_hash)
+    await run_ingest_blocking(store.flush)
+
+    stats["total_seconds"] = round(time.perf_counter() - started, 3)
+    print(
+        f"✅ Pipeline complete: {stats['pages_parsed']} pages, {stats['chunks_created']} chunks, "
+        f"{stats['objects_indexed']} indexed, {stats['chunks_skipped']} skipped, "
+        f"{stats['objects_failed']} failed in {stats['total_seconds']}s."
+    )
+    return stats
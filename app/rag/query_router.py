@@ -0,0 +1,96 @@
+import re
+from typing import Dict, List, Optional, Tuple, Union
+from app.core.config import settings
+from app.rag.analytes import find_analytes
+from app.rag.chunking import SECTION_RULES
+
+# --- Year filters ---
+# One year, or an inclusive (first, last) range with either end open
+YearFilter = Union[int, Tuple[Optional[int], Optional[int]], None]
+
+def year_bounds(year: YearFilter) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """(first, last) for a year filter, or None when it doesn't filter anything."""
+    if not year:
+        return None
+    if isinstance(year, int):
+        return year, year
+    first, last = year
+    if first is None and last is None:
+        return None
+    return first, last
+
+def year_matches(value: Optional[int], year: YearFilter) -> bool:
+    bounds = year_bounds(year)
+    if bounds is None:
+        return True
+    first, last = bounds
+    return bool(value) and (first is None or value >= first) and (last is None or value <= last)
+
+def year_label(year: YearFilter) -> str:
+    """Stable text form for cache keys and logs: 'all', '2023', '2020-2023', '2020-'."""
+    bounds = year_bounds(year)
+    if bounds is None:
+        return "all"
+    first, last = bounds
+    if first == last:
+        return str(first)
+    return f"{first or ''}-{last or ''}"
+
+# --- Section routing ---
+# Section(s) each analyte's table rows are chunked under (see chunking.classify_section);
+# electrolytes are often reported inside the renal panel
+ANALYTE_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    **{a: ("cbc",) for a in (
+        "hemoglobin", "hematocrit", "rbc", "wbc", "platelets", "mcv", "mch", "mchc", "neutrophils", "lymphocytes"
+    )},
+    **{a: ("lipid_profile",) for a in ("total_cholesterol", "ldl", "hdl", "vldl", "triglycerides")},
+    **{a: ("glucose_diabetes",) for a in ("fasting_glucose", "random_glucose", "hba1c")},
+    **{a: ("kidney_function",) for a in ("creatinine", "egfr", "bun", "urea", "uric_acid")},
+    **{a: ("liver_function",) for a in (
+        "alt", "ast", "alp", "ggt", "total_bilirubin", "direct_bilirubin", "albumin", "total_protein"
+    )},
+    **{a: ("electrolytes", "kidney_function") for a in ("sodium", "potassium", "chloride", "bicarbonate", "calcium")},
+}
+
+# Question words naming a section outright: the header keywords plus everyday variants
+SECTION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    tag: keywords + extra for (tag, keywords), extra in zip(SECTION_RULES, (
+        ("blood counts", "hemogram", "anemia", "anaemia"),
+        ("lipids", "triglyceride"),
+        ("diabetic", "blood sugar", "sugar"),
+        ("kidneys", "renal"),
+        ("hepatic", "liver enzymes", "bilirubin", "jaundice"),
+        ("electrolytes",),
+        ("impression", "conclusion", "diagnosed"),
+    ))
+}
+_KEYWORD_PATTERN = re.compile(r"(?<![\w])(" + "|".join(
+    re.escape(k) for k in sorted({k for keywords in SECTION_KEYWORDS.values() for k in keywords}, key=len, reverse=True)
+) + r")(?![\w])")
+_KEYWORD_SECTION = {k: tag for tag, keywords in SECTION_KEYWORDS.items() for k in keywords}
+
+# Questions asking what a value means also want the interpretation section
+INTERPRETATION_CUES = re.compile(
+    r"\b(normal|abnormal|high|low|elevated|raised|concern\w*|risk|why|mean|means|significan\w*|worr\w*)\b"
+)
+INTERPRETATION_SECTION = "clinical_interpretation"
+
+def route_sections(question: str) -> Optional[List[str]]:
+    """
+    The report sections a question is about, from analyte synonyms and section
+    keywords, or None (search everything) when nothing matches or the question
+    spans more than SECTION_ROUTING_MAX_SECTIONS sections.
+    """
+    text = question.lower()
+    sections: List[str] = []
+    for analyte, _, _ in find_analytes(text):
+        sections.extend(ANALYTE_SECTIONS.get(analyte, ()))
+    sections.extend(_KEYWORD_SECTION[m.group(1)] for m in _KEYWORD_PATTERN.finditer(text))
+    sections = list(dict.fromkeys(sections))
+
+    topical = [s for s in sections if s != INTERPRETATION_SECTION]
+    if not sections or len(topical) > settings.SECTION_ROUTING_MAX_SECTIONS:
+        return None
+    if topical and INTERPRETATION_SECTION not in sections and INTERPRETATION_CUES.search(text):
+        sections.append(INTERPRETATION_SECTION)
+    return sections
@@ -0,0 +1,61 @@
+import hashlib
+from array import array
+from typing import Any, Dict, Hashable, List, Optional
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import record_cache, track_cache_size
+from app.rag.answer_cache import get_corpus_version
+from app.rag.bm25 import tokenize
+from app.rag.query_router import YearFilter, year_label
+from app.rag.vector_store import VectorStore, DEFAULT_CERTAINTY
+
+# Search results per (query vector, filters, corpus version). The version is the
+# answer cache's counter, shared by the workers (a SQLite file per host, or redis),
+# so an ingest in any worker makes these entries unreachable; they age out of the LRU.
+_cache = LRUCache(settings.RETRIEVAL_CACHE_MAX_ENTRIES, settings.RETRIEVAL_CACHE_TTL)
+track_cache_size("retrieval", _cache.__len__)
+
+def vector_digest(vector: List[float], decimals: Optional[int] = None) -> str:
+    """
+    Hash of the vector rounded to `decimals` places, so re-embeddings of the
+    same question that differ only in float noise share one cache entry.
+    """
+    scale = 10 ** (settings.RETRIEVAL_CACHE_VECTOR_DECIMALS if decimals is None else decimals)
+    quantized = array("q", (round(x * scale) for x in vector))
+    return hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+
+def retrieval_key(
+    store: VectorStore,
+    query: str,
+    vector: List[float],
+    limit: int,
+    year: YearFilter,
+    sections: Optional[List[str]]
+) -> Optional[Hashable]:
+    """Cache key for one search, or None when the cache is disabled."""
+    if not settings.RETRIEVAL_CACHE_ENABLED:
+        return None
+    if settings.HYBRID_SEARCH_ENABLED:
+        # BM25 ranks by the question's tokens, not just its vector
+        search = ("hybrid", tuple(tokenize(query)), settings.HYBRID_ALPHA, settings.HYBRID_CANDIDATES, settings.RRF_K)
+    else:
+        search = ("vector", DEFAULT_CERTAINTY)
+    return (
+        get_corpus_version(), store.name, vector_digest(vector), limit,
+        year_label(year), tuple(sections or ()), search
+    )
+
+def get_cached_chunks(key: Optional[Hashable]) -> Optional[List[Dict[str, Any]]]:
+    if key is None:
+        return None
+    chunks = _cache.get(key)
+    record_cache("retrieval", chunks is not None)
+    # A new list per caller; the chunk dicts are shared and must not be mutated
+    return list(chunks) if chunks is not None else None
+
+def store_chunks(key: Optional[Hashable], chunks: List[Dict[str, Any]]):
+    if key is not None:
+        _cache.set(key, list(chunks))
+
+def clear_retrieval_cache():
+    _cache.clear()
@@ -1,67 +1,131 @@
-from typing import List, Dict, Any, Optional
-from app.api.dependencies import get_weaviate_client
-from app.rag.embeddings import generate_embedding
-from app.rag.vector_store import WEAVIATE_CLASS_NAME
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from app.api.dependencies import get_vector_store
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.metrics import RETRIEVED_CHUNKS, SECTION_ROUTING, record_upstream_error, stage_timer
+from app.rag.embeddings import generate_query_embedding, agenerate_query_embedding, agenerate_query_embeddings
+from app.rag.query_router import YearFilter, route_sections, year_label
+from app.rag.retrieval_cache import get_cached_chunks, retrieval_key, store_chunks
+from app.rag.vector_store import VectorStore
 
-def get_relevant_chunks(query: str, limit: int = 5, year: Optional[int] = None) -> List[Dict[str, Any]]:
+def _search_filtered(
+    store: VectorStore, query: str, query_vector: List[float], limit: int, year: YearFilter, sections: Optional[List[str]]
+) -> List[Dict[str, Any]]:
+    # Hybrid: vector search finds "concepts", BM25 catches exact analyte tokens
+    # (e.g., "eGFR", "SGPT", "HbA1c"); both lists are fused by reciprocal rank.
+    if settings.HYBRID_SEARCH_ENABLED:
+        return store.hybrid_search(
+            query, query_vector, limit=limit, year=year, sections=sections,
+            alpha=settings.HYBRID_ALPHA, candidates=settings.HYBRID_CANDIDATES
+        )
+    return store.search(query_vector, limit=limit, year=year, sections=sections)
+
+def _search(store: VectorStore, query: str, query_vector: List[float], limit: int, year: YearFilter) -> List[Dict[str, Any]]:
+    # Questions about specific tests only search their report sections; if that
+    # slice comes back (nearly) empty the routing was likely wrong, so search everything
+    sections = route_sections(query) if settings.SECTION_ROUTING_ENABLED else None
+
+    # Same vector + filters + corpus version = same hits: skip the store round-trip
+    cache_key = retrieval_key(store, query, query_vector, limit, year, sections)
+    cached = get_cached_chunks(cache_key)
+    if cached is not None:
+        RETRIEVED_CHUNKS.observe(len(cached))
+        return cached
+
+    with stage_timer("search"):
+        chunks = _search_filtered(store, query, query_vector, limit, year, sections)
+        if sections and len(chunks) < min(limit, settings.SECTION_ROUTING_MIN_HITS):
+            SECTION_ROUTING.inc("fallback")
+            print(f"↩️ Only {len(chunks)} chunks in sections {sections}; retrying unfiltered.")
+            chunks = _search_filtered(store, query, query_vector, limit, year, None)
+        else:
+            SECTION_ROUTING.inc("routed" if sections else "unrouted")
+    store_chunks(cache_key, chunks)
+    RETRIEVED_CHUNKS.observe(len(chunks))
+
+    if not chunks:
+        # Debug log to help if retrieval fails
+        print(f"⚠️ No chunks found for query: '{query}' with year filter: {year_label(year)}")
+    return chunks
+
+def get_relevant_chunks(query: str, limit: int = 5, year: YearFilter = None, store: Optional[VectorStore] = None) -> List[Dict[str, Any]]:
     """
-    Retrieves relevant chunks from Weaviate using Semantic Search + Strict Metadata Filtering.
+    Retrieves relevant chunks using Hybrid (BM25 + Semantic) Search + Strict Metadata Filtering.
     """
-    client = get_weaviate_client()
-    
+    store = store or get_vector_store()
+
     # 1. Embed the User's Query (Using Google Gemini)
-    # This must match the model used during ingestion.
-    query_vector = generate_embedding(query)
-    
+    # Same model as ingestion, but the retrieval_query task type (cached in memory).
+    query_vector = generate_query_embedding(query)
+
     if not query_vector:
         print("⚠️ Failed to generate embedding for query.")
         return []
 
-    # 2. Initialize the Weaviate Query Builder
-    # CRITICAL UPDATE: We now fetch 'chunk_id' alongside other metadata
-    query_builder = (
-        client.query
-        .get(WEAVIATE_CLASS_NAME, ["content", "source", "page", "year", "section", "chunk_id"])
-        .with_near_vector({
-            "vector": query_vector,
-            "certainty": 0.60  # Threshold: Filters out irrelevant noise
-        })
-        .with_limit(limit)
-    )
-
-    # 3. Apply Strict Year Filter (Hard Filtering)
-    # If a year is provided, we force Weaviate to ONLY look at that year.
-    if year:
-        year_filter = {
-            "path": ["year"],
-            "operator": "Equal",
-            "valueInt": year
-        }
-        query_builder = query_builder.with_where(year_filter)
-
-    # 4. Execute Query
+    # 2. Search (If a year or year range is provided, ONLY those years are considered)
     try:
-        result = query_builder.do()
-        
-        # Safe extraction of results from the Weaviate GraphQL response
-        if "data" in result and "Get" in result["data"]:
-            chunks = result["data"]["Get"].get(WEAVIATE_CLASS_NAME, [])
-        else:
-            chunks = []
-        
-        if not chunks:
-            # Debug log to help if retrieval fails
-            print(f"⚠️ No chunks found for query: '{query}' with year filter: {year}")
-            return []
+        return _search(store, query, query_vector, limit, year)
+
+    except Exception as e:
+        record_upstream_error(settings.VECTOR_STORE_BACKEND)
+        print(f"❌ Retrieval Error: {e}")
+        return []
+
+async def aget_relevant_chunks(query: str, limit: int = 5, year: YearFilter = None, store: Optional[VectorStore] = None) -> List[Dict[str, Any]]:
+    """
+    Async variant of `get_relevant_chunks` for the /query path.
+    The embedding uses the async Gemini client; store searches are blocking
+    (Weaviate v3 HTTP, or NumPy + BM25 in-process), so they run on the bounded executor.
+    """
+    store = store or get_vector_store()
 
-        # 5. Optimization: Python-side Re-ranking
-        # Weaviate finds "concepts", but sometimes we want to prioritize chunks 
-        # that explicitly contain the exact keyword (e.g., "Creatinine").
-        query_lower = query.lower()
-        chunks.sort(key=lambda x: query_lower in x.get("content", "").lower(), reverse=True)
-        
-        return chunks
+    query_vector = await agenerate_query_embedding(query)
+
+    if not query_vector:
+        print("⚠️ Failed to generate embedding for query.")
+        return []
+
+    try:
+        return await run_blocking(_search, store, query, query_vector, limit, year)
 
     except Exception as e:
+        record_upstream_error(settings.VECTOR_STORE_BACKEND)
         print(f"❌ Retrieval Error: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def aget_relevant_chunks_batch(
+    queries: List[Tuple[str, YearFilter]],
+    limit: int = 5,
+    store: Optional[VectorStore] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Retrieval for many (question, year) pairs: one batched embedding call,
+    then all searches concurrently on the blocking-IO executor. A chunk hit by
+    several questions is shared (one dict per chunk_id) rather than copied.
+    Failed items map to [].
+    """
+    store = store or get_vector_store()
+
+    query_vectors = await agenerate_query_embeddings([question for question, _ in queries])
+
+    async def search_one(question: str, year: YearFilter, query_vector: List[float]) -> List[Dict[str, Any]]:
+        if not query_vector:
+            print(f"⚠️ Failed to generate embedding for query: '{question}'")
+            return []
+        try:
+            return await run_blocking(_search, store, question, query_vector, limit, year)
+        except Exception as e:
+            record_upstream_error(settings.VECTOR_STORE_BACKEND)
+            print(f"❌ Retrieval Error: {e}")
+            return []
+
+    results = await asyncio.gather(*[
+        search_one(question, year, vector) for (question, year), vector in zip(queries, query_vectors)
+    ])
+
+    shared: Dict[str, Dict[str, Any]] = {}
+    return [
+        [shared.setdefault(chunk.get("chunk_id") or id(chunk), chunk) for chunk in chunks]
+        for chunks in results
+    ]
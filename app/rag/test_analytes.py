@@ -0,0 +1,22 @@
+import pytest
+from app.rag.analytes import find_analytes, normalize_analyte
+
+@pytest.mark.parametrize("name, analyte", [
+    ("HbA1c", "hba1c"),
+    ("**SGPT**", "alt"),
+    ("ALT (Liver Enzyme)", "alt"),
+    ("Creatinine, Serum", "creatinine"),
+    ("Glucose - Fasting", "fasting_glucose"),
+    ("Glucose (Fasting)", "fasting_glucose"),
+    ("Glucose; Random", "random_glucose"),
+    ("Bilirubin - Total", "total_bilirubin"),
+    ("Cholesterol, HDL", "hdl"),
+    ("LDL-C", "ldl"),
+    ("Glucose", None),
+    ("Vitamin D", None),
+])
+def test_normalize_analyte(name, analyte):
+    assert normalize_analyte(name) == analyte
+
+def test_find_analytes_prefers_longest_synonym():
+    assert [a for a, _, _ in find_analytes("Is my LDL cholesterol or total cholesterol high?")] == ["ldl", "total_cholesterol"]
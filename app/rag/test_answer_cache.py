@@ -0,0 +1,62 @@
+import pytest
+from app.core.cache import InMemoryCacheBackend, LRUCache, SharedCounters
+from app.core.config import settings
+from app.rag.answer_cache import (
+    CORPUS_VERSION_KEY, bump_corpus_version, get_cached_answer, get_corpus_version, store_answer
+)
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+def test_shared_counters_are_seen_by_other_processes(tmp_path):
+    # Two instances on one file stand in for two uvicorn workers
+    worker_a = SharedCounters(tmp_path / "counters.sqlite3")
+    worker_b = SharedCounters(tmp_path / "counters.sqlite3")
+
+    assert worker_b.get("version") == 0
+    assert worker_a.incr("version") == 1
+    assert worker_a.incr("version") == 2
+    assert worker_b.get("version") == 2
+
+def test_shared_counter_reads_are_reused_for_the_ttl(tmp_path):
+    worker_a = SharedCounters(tmp_path / "counters.sqlite3", ttl_seconds=60)
+    worker_b = SharedCounters(tmp_path / "counters.sqlite3")
+
+    assert worker_a.get("version") == 0
+    worker_b.incr("version")
+    assert worker_a.get("version") == 0  # within the TTL
+
+    worker_a._recent.clear()
+    assert worker_a.get("version") == 1
+    assert worker_a.incr("version") == 2
+    worker_b.incr("version")
+    assert worker_a.get("version") == 2  # own increment, remembered
+
+def test_ingest_in_another_worker_invalidates_cached_answers():
+    store_answer("What is the HbA1c?", None, {"answer": "7.1 %"})
+    assert get_cached_answer("what is the hba1c", None) == {"answer": "7.1 %"}
+
+    other_worker = InMemoryCacheBackend(16, None, settings.CACHE_COUNTERS_PATH)
+    other_worker.incr(CORPUS_VERSION_KEY)
+
+    assert get_corpus_version() == 1
+    assert get_cached_answer("What is the HbA1c?", None) is None
+
+@pytest.mark.parametrize("year", [2023, (2020, 2023)])
+def test_answers_are_keyed_by_year_filter(year):
+    store_answer("HbA1c", year, {"answer": "x"})
+
+    assert get_cached_answer("HbA1c", year) == {"answer": "x"}
+    assert get_cached_answer("HbA1c", None) is None
+    assert get_cached_answer("HbA1c", (2020, None)) is None
+
+def test_bump_returns_new_version():
+    assert bump_corpus_version() == 1
+    assert bump_corpus_version() == 2
@@ -0,0 +1,51 @@
+from app.rag.bm25 import BM25Index, rrf_fuse, tokenize
+
+def index():
+    bm25 = BM25Index()
+    bm25.add_many([
+        ("a", "Hemoglobin 13.5 g/dL, normal range"),
+        ("b", "LDL cholesterol 160 mg/dL, high"),
+        ("c", "HDL cholesterol 45 mg/dL"),
+    ])
+    return bm25
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("What is the LDL?") == ["ldl"]
+
+def test_search_ranks_by_term_match():
+    assert [doc_id for doc_id, _ in index().search("ldl cholesterol")][:2] == ["b", "c"]
+    assert index().search("ferritin") == []
+
+def test_search_applies_allowed_filter():
+    assert [doc_id for doc_id, _ in index().search("cholesterol", allowed=lambda d: d != "b")] == ["c"]
+
+def test_readd_replaces_and_remove_drops_postings():
+    bm25 = index()
+    bm25.add("b", "Triglycerides 140 mg/dL")
+    assert "b" not in dict(bm25.search("ldl"))
+    assert bm25.total_length == sum(bm25.doc_lengths.values())
+
+    bm25.remove_many(["b", "c", "missing"])
+    assert len(bm25) == 1
+    assert "cholesterol" not in bm25.postings
+    assert bm25.total_length == bm25.doc_lengths["a"]
+
+def test_save_load_round_trip(tmp_path):
+    bm25 = index()
+    bm25.remove("c")
+    bm25.save(tmp_path / "bm25.json")
+
+    loaded = BM25Index.load(tmp_path / "bm25.json")
+
+    assert len(loaded) == 2
+    assert loaded.total_length == bm25.total_length
+    assert loaded.search("cholesterol") == bm25.search("cholesterol")
+
+def test_rrf_fuse_weights_ranks():
+    fused = rrf_fuse([["a", "b"], ["b", "c"]], [0.5, 0.5], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "c"]
+    assert fused[0][1] == 0.5 / 62 + 0.5 / 61
+
+def test_rrf_fuse_skips_zero_weight_lists():
+    assert rrf_fuse([["a"], ["b"]], [1.0, 0.0]) == [("a", 1.0 / 61)]
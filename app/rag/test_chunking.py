@@ -0,0 +1,59 @@
+import uuid
+import pytest
+from app.core.config import settings
+from app.rag.chunking import CHUNK_ID_NAMESPACE, chunk_page, make_chunk_id, recursive_split_spans, text_length
+
+PAGE = {
+    "page_content": "PATIENT: Jane Doe\nCOLL DATE: 2023-04-01\n# Complete Blood Count\nHemoglobin 13.5 g/dL\n"
+                    "# Lipid Profile\nLDL 120 mg/dL",
+    "metadata": {"source": "report.pdf", "source_hash": "abc", "page": 2, "year": 2023}
+}
+
+def test_chunk_id_is_uuid5_of_source_page_offset():
+    assert make_chunk_id("abc", 2, 40) == str(uuid.uuid5(CHUNK_ID_NAMESPACE, "abc:2:40"))
+    assert make_chunk_id("abc", 2, 40, 7) == str(uuid.uuid5(CHUNK_ID_NAMESPACE, "abc:2:40:7"))
+    assert make_chunk_id("abc", 2, 40) != make_chunk_id("abd", 2, 40)
+
+def test_chunk_ids_are_stable_across_runs():
+    first = [c["metadata"]["chunk_id"] for c in chunk_page(PAGE)]
+    second = [c["metadata"]["chunk_id"] for c in chunk_page(PAGE)]
+
+    assert first == second
+    assert len(set(first)) == len(first) == 2
+    assert [c["metadata"]["section"] for c in chunk_page(PAGE)] == ["cbc", "lipid_profile"]
+
+def test_oversized_section_gets_sub_chunk_ids(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_SIZE_UNIT", "chars")
+    monkeypatch.setattr(settings, "CHUNK_MAX_SECTION_SIZE", 100)
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 80)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 10)
+    page = {"page_content": "# Complete Blood Count\n" + "Hemoglobin 13.5 g/dL. " * 20, "metadata": PAGE["metadata"]}
+
+    chunks = list(chunk_page(page))
+    ids = [c["metadata"]["chunk_id"] for c in chunks]
+
+    assert len(chunks) > 1
+    assert len(set(ids)) == len(ids)
+    assert ids == [c["metadata"]["chunk_id"] for c in chunk_page(page)]
+
+@pytest.mark.parametrize("unit", ["chars", "tokens"])
+def test_spans_cover_text_within_size(unit):
+    text = "\n\n".join(f"Line {i}. " + "word " * (i % 13) for i in range(200))
+    spans = recursive_split_spans(text, chunk_size=60, chunk_overlap=10, unit=unit)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(text_length(text[start:end], unit) <= 60 for start, end in spans)
+    # Contiguous or overlapping: nothing between two spans is dropped
+    assert all(b_start <= a_end for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+    assert all(b_start > a_start for (a_start, _), (b_start, _) in zip(spans, spans[1:]))
+
+def test_overlap_is_capped_at_a_quarter_window():
+    text = "x" * 1000
+    spans = recursive_split_spans(text, chunk_size=100, chunk_overlap=90)
+
+    # Hard splits every 100 chars; overlap clamps to 25, so each window starts 75 later
+    assert [start for start, _ in spans[:4]] == [0, 75, 150, 225]
+    assert all(end - start <= 100 for start, end in spans)
+
+def test_empty_text_has_no_spans():
+    assert recursive_split_spans("") == []
@@ -0,0 +1,40 @@
+from app.rag.embedding_cache import EmbeddingCache
+
+def rows(cache):
+    return cache._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+def test_round_trip_and_hit_counters(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", 10)
+    cache.put("a", [0.5, 0.25])
+
+    assert cache.get("a") == [0.5, 0.25]
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_evicts_least_recently_used_in_batches(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", 10)
+    cache.put_many({f"k{i}": [float(i)] for i in range(10)})
+    cache.get("k0")  # recently used: survives
+
+    cache.put("k10", [10.0])
+
+    assert rows(cache) == 9
+    assert cache.get("k0") == [0.0] and cache.get("k10") == [10.0]
+    assert len(cache.get_many(f"k{i}" for i in range(1, 10))) == 7
+
+def test_puts_below_the_limit_do_not_count_rows(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", 100)
+    def evict():
+        raise AssertionError("counted rows below the limit")
+    monkeypatch.setattr(cache, "_evict", evict)
+
+    for i in range(50):
+        cache.put(f"k{i}", [1.0])
+
+def test_row_count_survives_reopen(tmp_path):
+    EmbeddingCache(tmp_path / "cache.sqlite3", 10).put_many({f"k{i}": [1.0] for i in range(8)})
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", 10)
+    cache.put_many({"x": [1.0], "y": [1.0], "z": [1.0]})
+
+    assert rows(cache) == 9
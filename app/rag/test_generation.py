@@ -0,0 +1,60 @@
+from app.rag.chunking import text_length
+from app.rag.generation import _trim_overlap, format_context_for_llm, pack_context
+
+HEADER = "Patient: Jane Doe | Date: 12/03/2023"
+
+def chunk(content, source="a.pdf", page=1, section="cbc", score=0.9, chunk_id=None):
+    return {
+        "content": content, "source": source, "page": page, "year": 2023,
+        "section": section, "score": score, "chunk_id": chunk_id or content[-12:]
+    }
+
+def test_header_of_a_single_chunk_stays_inline():
+    context = format_context_for_llm(pack_context([chunk(f"{HEADER}\n# CBC\nHemoglobin 13.5 g/dL")]))
+
+    assert "PATIENT RECORDS" not in context
+    assert context.count(HEADER) == 1
+    assert context.index(HEADER) > context.index("--- SOURCE 1 ---")
+
+def test_shared_header_is_hoisted_once():
+    chunks = [
+        chunk(f"{HEADER}\n# CBC\nHemoglobin 13.5 g/dL", score=0.9),
+        chunk(f"{HEADER}\n# Lipid Profile\nLDL 130 mg/dL", section="lipid_profile", score=0.8),
+    ]
+    context = format_context_for_llm(pack_context(chunks))
+
+    assert context.count(HEADER) == 1
+    assert context.startswith("\n=== PATIENT RECORDS ===\nDocument: a.pdf | " + HEADER)
+
+def test_different_headers_of_one_document_are_all_kept():
+    other = "Patient: Jane Doe | Date: 01/01/2024"
+    chunks = [
+        chunk(f"{HEADER}\n# CBC\nHemoglobin 13.5 g/dL", page=1),
+        chunk(f"{other}\n# CBC\nHemoglobin 12.1 g/dL", page=2, score=0.8),
+    ]
+    context = format_context_for_llm(pack_context(chunks))
+
+    assert HEADER in context and other in context
+
+def test_packed_single_chunk_is_not_larger_than_raw():
+    raw = [chunk(f"{HEADER}\n# CBC\nHemoglobin 13.5 g/dL", source=f"r{i}.pdf") for i in range(3)]
+    packed = format_context_for_llm(pack_context(raw))
+
+    assert text_length(packed, "tokens") <= text_length(format_context_for_llm(raw), "tokens")
+
+def test_trim_overlap_cuts_repeated_seam_and_contained_text():
+    previous = "A" * 40 + "shared overlap text that is long enough"
+    following = "shared overlap text that is long enough" + " and then new content"
+
+    assert _trim_overlap(following, previous) == " and then new content"
+    assert _trim_overlap("overlap text", previous) == ""
+    assert _trim_overlap("unrelated", previous) == "unrelated"
+
+def test_pack_context_drops_repeats_and_respects_budget():
+    body = "\n".join(f"Row {i} value {i}.0 mg/dL" for i in range(40))
+    duplicate = [chunk(f"{HEADER}\n{body}", chunk_id="x1"), chunk(f"{HEADER}\n{body}", chunk_id="x2", score=0.5)]
+
+    assert len(pack_context(duplicate, token_budget=0)) == 1
+
+    packed = pack_context(duplicate, token_budget=50)
+    assert len(packed) == 1 and len(packed[0]["context_text"]) < len(body)
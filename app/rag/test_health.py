@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.api.dependencies import set_weaviate_client
+from app.core.config import settings
+from app.main import app
+
+class StandInClient:
+    def __init__(self, ready):
+        self.ready = ready
+
+    def is_ready(self):
+        if isinstance(self.ready, Exception):
+            raise self.ready
+        return self.ready
+
+@pytest.fixture
+def weaviate_backend(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "weaviate")
+    yield
+    set_weaviate_client(None)
+
+@pytest.mark.parametrize("ready, status", [
+    (True, "ok"), (False, "degraded"), (ConnectionError("refused"), "degraded")
+])
+def test_health_probes_the_pooled_weaviate_client(weaviate_backend, ready, status):
+    set_weaviate_client(StandInClient(ready))
+
+    # No context manager: the lifespan (which would connect for real) doesn't run
+    body = TestClient(app).get("/health").json()
+
+    assert body["status"] == status
+    assert body["vector_store"] == "weaviate"
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.rag import jobs
+from app.rag.jobs import IngestionJobManager, JOB_FAILED, JOB_QUEUED, JOB_SUCCEEDED
+
+def upload(manager, job_id):
+    folder = manager.upload_dir(job_id)
+    folder.mkdir(parents=True)
+    (folder / "report.pdf").write_bytes(b"%PDF")
+    return str(folder / "report.pdf")
+
+def test_failed_job_removes_its_uploads(monkeypatch):
+    async def failing_pipeline(file_paths, store, stats):
+        raise RuntimeError("parse failed")
+    monkeypatch.setattr(jobs, "run_ingestion_pipeline", failing_pipeline)
+    monkeypatch.setattr(jobs, "get_vector_store", lambda: None)
+    manager = IngestionJobManager()
+    job = manager.create_job("j1", [upload(manager, "j1")], {"report.pdf": "abc"}, [])
+
+    asyncio.run(manager._run(job["job_id"]))
+
+    assert manager.get_job("j1")["status"] == JOB_FAILED
+    assert not manager.upload_dir("j1").exists()
+
+def test_job_with_only_skipped_files_removes_its_uploads():
+    manager = IngestionJobManager()
+    upload(manager, "j2")
+
+    job = manager.create_job("j2", [], {}, ["report.pdf"])
+
+    assert job["status"] == JOB_SUCCEEDED
+    assert not manager.upload_dir("j2").exists()
+
+def test_prune_keeps_recent_and_unfinished_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_JOB_RETENTION_SECONDS", 3600)
+    manager = IngestionJobManager()
+    manager.create_job("old", [], {}, [])
+    manager.create_job("recent", [], {}, [])
+    manager.create_job("queued", [upload(manager, "queued")], {}, [])
+    old = manager.get_job("old")
+    old["finished_at"] = time.time() - 7200
+    manager._save(old)
+
+    assert manager.prune() == 1
+    assert manager.get_job("old") is None
+    assert manager.get_job("recent") is not None
+    assert manager.get_job("queued")["status"] == JOB_QUEUED
+    assert manager.upload_dir("queued").exists()
+
+def test_zero_retention_keeps_everything(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_JOB_RETENTION_SECONDS", 0)
+    manager = IngestionJobManager()
+    manager.create_job("old", [], {}, [])
+    old = manager.get_job("old")
+    old["finished_at"] = 0
+    manager._save(old)
+
+    assert manager.prune() == 0
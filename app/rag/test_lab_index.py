@@ -0,0 +1,65 @@
+from app.rag.lab_index import answer_value_lookup, get_lab_index, match_value_lookup, parse_lab_rows
+
+TABLE = """# Diabetes Screening
+| Test | Result | Unit | Reference Range |
+|---|---|---|---|
+| HbA1c | {hba1c} H | % | 4.0 - 5.6 |
+| Fasting Glucose | {glucose} | mg/dL | 70 - 100 |
+"""
+
+def report_chunk(year, hba1c, glucose="92"):
+    return {
+        "page_content": TABLE.format(hba1c=hba1c, glucose=glucose),
+        "metadata": {
+            "source": f"lab_report_{year}.pdf", "source_hash": f"h{year}", "page": 1,
+            "year": year, "section": "glucose_diabetes", "chunk_id": f"c{year}"
+        }
+    }
+
+def test_parse_lab_rows_reads_value_unit_flag_and_range():
+    rows = parse_lab_rows(TABLE.format(hba1c="7.1", glucose="< 70"))
+
+    assert [(r["analyte"], r["value"], r["unit"], r["flag"], r["reference_range"]) for r in rows] == [
+        ("hba1c", "7.1", "%", "H", "4.0 - 5.6"),
+        ("fasting_glucose", "<70", "mg/dL", "", "70 - 100"),
+    ]
+
+def test_match_value_lookup():
+    assert match_value_lookup("What is the HbA1c level?") == {"analyte": "hba1c", "year": None, "latest": False}
+    assert match_value_lookup("HbA1c in 2023") == {"analyte": "hba1c", "year": 2023, "latest": False}
+    assert match_value_lookup("What is the latest HbA1c?")["latest"] is True
+    assert match_value_lookup("Was the HbA1c abnormal?") is None
+    assert match_value_lookup("Compare HbA1c and LDL") is None
+
+def test_latest_returns_only_the_newest_row():
+    get_lab_index().add_chunks([report_chunk(2021, "6.1"), report_chunk(2023, "7.1"), report_chunk(2022, "6.5")])
+
+    everything = answer_value_lookup("What is the HbA1c level?")
+    latest = answer_value_lookup("What is the latest HbA1c?")
+
+    assert [c["year"] for c in everything["chunks"]] == [2023, 2022, 2021]
+    assert [c["year"] for c in latest["chunks"]] == [2023]
+    assert "7.1" in latest["answer"]
+
+def test_lookup_year_filters():
+    get_lab_index().add_chunks([report_chunk(2021, "6.1"), report_chunk(2023, "7.1"), report_chunk(2022, "6.5")])
+
+    assert [c["year"] for c in answer_value_lookup("HbA1c", 2022)["chunks"]] == [2022]
+    assert [c["year"] for c in answer_value_lookup("HbA1c", (2021, 2022))["chunks"]] == [2022, 2021]
+    assert [c["year"] for c in answer_value_lookup("HbA1c", (None, 2021))["chunks"]] == [2021]
+    assert answer_value_lookup("HbA1c", 2019) is None
+
+def test_delete_by_source_keeps_current_version_and_other_files():
+    index = get_lab_index()
+    index.add_chunks([report_chunk(2023, "7.1"), report_chunk(2022, "6.5")])
+
+    assert index.delete_by_source("lab_report_2023.pdf", keep_hash="h2023") == 0
+    assert index.delete_by_source("lab_report_2023.pdf", keep_hash="new") == 2
+    assert [r["year"] for r in index.lookup("hba1c")] == [2022]
+
+def test_qualified_test_names_reach_their_analyte():
+    chunk = report_chunk(2023, "7.1")
+    chunk["page_content"] = chunk["page_content"].replace("| Fasting Glucose |", "| Glucose - Fasting |")
+    get_lab_index().add_chunks([chunk])
+
+    assert "Glucose - Fasting: 92" in answer_value_lookup("What is the fasting glucose?")["answer"]
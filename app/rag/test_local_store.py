@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.rag.answer_cache import bump_corpus_version
+from app.rag.local_store import LocalVectorStore
+
+def chunk(chunk_id, year=2023, section="cbc", source=None, source_hash="h1", text=None):
+    return {
+        "page_content": text or f"chunk {chunk_id}",
+        "metadata": {"chunk_id": chunk_id, "source": source or f"{chunk_id}.pdf", "source_hash": source_hash,
+                     "page": 1, "year": year, "section": section}
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(
+        [chunk("y2019", 2019, text="hemoglobin 12.1"), chunk("y2021", 2021, text="hemoglobin 13.0"),
+         chunk("y2023", 2023, "lipid_profile", text="ldl 120"), chunk("unknown", 0, text="hemoglobin 14.0")],
+        [[1.0, 0.0], [0.9, 0.1], [0.8, 0.2], [0.95, 0.05]]
+    )
+    return store
+
+def ids(hits):
+    return sorted(hit["chunk_id"] for hit in hits)
+
+@pytest.mark.parametrize("year, expected", [
+    (None, ["unknown", "y2019", "y2021", "y2023"]),
+    (2021, ["y2021"]),
+    ((2020, 2023), ["y2021", "y2023"]),
+    ((2021, None), ["y2021", "y2023"]),
+    ((None, 2021), ["y2019", "y2021"]),
+])
+def test_search_year_filters(store, year, expected):
+    assert ids(store.search([1.0, 0.0], limit=10, year=year, certainty=0.0)) == expected
+    assert ids(store.hybrid_search("hemoglobin ldl", [1.0, 0.0], limit=10, year=year)) == expected
+
+def test_search_section_filter(store):
+    assert ids(store.search([1.0, 0.0], limit=10, sections=["lipid_profile"], certainty=0.0)) == ["y2023"]
+    assert store.search([1.0, 0.0], sections=["liver_function"]) == []
+
+def test_upsert_same_chunk_id_overwrites(store):
+    store.upsert([chunk("y2019", 2019, text="hemoglobin 12.4")], [[0.0, 1.0]])
+
+    assert store.count() == 4
+    assert store.search([0.0, 1.0], limit=1)[0]["content"] == "hemoglobin 12.4"
+
+def test_delete_by_source_matches_only_that_file(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(
+        [chunk("old", source="report.pdf", source_hash="h1"), chunk("new", source="report.pdf", source_hash="h2"),
+         chunk("other", source="report.pdf.bak", source_hash="h1"), chunk("prefix", source="my_report.pdf")],
+        [[1.0, 0.0]] * 4
+    )
+
+    assert store.delete_by_source("report.pdf", keep_hash="h2") == 1
+    assert ids(store.search([1.0, 0.0], limit=10)) == ["new", "other", "prefix"]
+    assert store.hybrid_search("old", [0.0, 1.0], limit=10, alpha=0.0) == []
+
+    store.flush()
+    assert ids(LocalVectorStore(tmp_path).search([1.0, 0.0], limit=10)) == ["new", "other", "prefix"]
+
+def random_store(path, n=400, dim=32):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    store = LocalVectorStore(path)
+    store.upsert([chunk(f"c{i}", year=2018 + i % 6) for i in range(n)], vectors.tolist())
+    return store, rng
+
+@pytest.mark.parametrize("year", [None, 2021])
+def test_prefilter_with_full_pool_matches_exact_search(tmp_path, monkeypatch, year):
+    exact, rng = random_store(tmp_path / "exact")
+    queries = rng.standard_normal((10, 32), dtype=np.float32).tolist()
+    expected = [[h["chunk_id"] for h in exact.search(q, limit=5, year=year, certainty=0.0)] for q in queries]
+
+    monkeypatch.setattr(settings, "LOCAL_STORE_PREFILTER_DIMS", 8)
+    monkeypatch.setattr(settings, "LOCAL_STORE_PREFILTER_POOL", 399)
+    store, _ = random_store(tmp_path / "prefiltered")
+    found = [[h["chunk_id"] for h in store.search(q, limit=5, year=year, certainty=0.0)] for q in queries]
+
+    assert found == expected
+
+def test_prefilter_survives_flush_reload_and_delete(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_STORE_PREFILTER_DIMS", 2)
+    monkeypatch.setattr(settings, "LOCAL_STORE_PREFILTER_POOL", 1)
+    store = LocalVectorStore(tmp_path)
+    store.upsert([chunk("a"), chunk("b", source="b.pdf")], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    store.delete_by_source("a.pdf")
+    store.flush()
+
+    reloaded = LocalVectorStore(tmp_path)
+
+    assert [h["chunk_id"] for h in reloaded.search([0.0, 1.0, 0.0], limit=1)] == ["b"]
+    reloaded.upsert([chunk("c", source="c.pdf")], [[0.8, 0.0, 0.6]])
+    assert [h["chunk_id"] for h in reloaded.search([1.0, 0.0, 0.0], limit=1)] == ["c"]
+
+def test_other_worker_sees_an_ingest_after_the_version_bump(tmp_path):
+    # Two instances on one directory stand in for two uvicorn workers
+    writer, reader = LocalVectorStore(tmp_path), LocalVectorStore(tmp_path)
+    writer.upsert([chunk("a")], [[1.0, 0.0]])
+    writer.flush()
+    assert reader.count() == 0  # corpus version unchanged: no disk check
+
+    bump_corpus_version()
+
+    assert ids(reader.search([1.0, 0.0], limit=5)) == ["a"]
+    assert writer.count() == 1
+
+def test_concurrent_flushes_merge_instead_of_overwriting(tmp_path):
+    worker_a, worker_b = LocalVectorStore(tmp_path), LocalVectorStore(tmp_path)
+    worker_a.upsert([chunk("old", source="report.pdf", source_hash="h1")], [[1.0, 0.0]])
+    worker_a.flush()
+
+    # B ingests without having seen A's flush: its delete and upsert replay on top of it
+    worker_b.upsert([chunk("b")], [[0.0, 1.0]])
+    worker_b.upsert([chunk("new", source="report.pdf", source_hash="h2")], [[1.0, 0.0]])
+    worker_b.delete_by_source("report.pdf", keep_hash="h2")
+    worker_b.flush()
+
+    assert ids(worker_b.search([1.0, 1.0], limit=5)) == ["b", "new"]
+    assert ids(LocalVectorStore(tmp_path).search([1.0, 1.0], limit=5)) == ["b", "new"]
+    assert LocalVectorStore(tmp_path)._generation == 2
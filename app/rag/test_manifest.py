@@ -0,0 +1,42 @@
+import json
+from app.core.config import settings
+from app.rag.local_store import LocalVectorStore
+from app.rag.manifest import is_unchanged, load_manifest, record_ingested
+
+def chunk(source, source_hash):
+    return {
+        "page_content": "Hemoglobin 13.5 g/dL",
+        "metadata": {"chunk_id": f"{source}-1", "source": source, "source_hash": source_hash,
+                     "page": 1, "year": 2023, "section": "cbc"}
+    }
+
+def ingested_store(path):
+    store = LocalVectorStore(path)
+    store.upsert([chunk("report.pdf", "abc")], [[1.0, 0.0]])
+    store.flush()
+    record_ingested("report.pdf", "abc", 1, store.location())
+    return store
+
+def test_same_content_in_the_same_store_is_unchanged(tmp_path):
+    store = ingested_store(tmp_path / "store")
+
+    assert is_unchanged("report.pdf", "abc", store)
+    assert not is_unchanged("report.pdf", "def", store)
+    assert not is_unchanged("other.pdf", "abc", store)
+
+def test_another_store_has_its_own_fingerprints(tmp_path):
+    ingested_store(tmp_path / "store")
+
+    assert not is_unchanged("report.pdf", "abc", LocalVectorStore(tmp_path / "elsewhere"))
+
+def test_wiped_store_is_not_trusted(tmp_path):
+    store = ingested_store(tmp_path / "store")
+    store.delete_by_source("report.pdf")
+    store.flush()
+
+    assert not is_unchanged("report.pdf", "abc", store)
+
+def test_unscoped_manifest_is_ignored():
+    settings.INGEST_MANIFEST_PATH.write_text(json.dumps({"report.pdf": {"sha256": "abc", "chunks": 1}}))
+
+    assert load_manifest() == {}
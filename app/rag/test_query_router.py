@@ -0,0 +1,35 @@
+import pytest
+from app.core.config import settings
+from app.rag.query_router import route_sections, year_bounds, year_label, year_matches
+
+@pytest.mark.parametrize("year, bounds, label", [
+    (None, None, "all"),
+    ((None, None), None, "all"),
+    (2023, (2023, 2023), "2023"),
+    ((2020, 2023), (2020, 2023), "2020-2023"),
+    ((2020, None), (2020, None), "2020-"),
+    ((None, 2021), (None, 2021), "-2021"),
+])
+def test_year_bounds_and_label(year, bounds, label):
+    assert year_bounds(year) == bounds
+    assert year_label(year) == label
+
+def test_year_matches_inclusive_range_and_unknown_year():
+    assert year_matches(2020, (2020, 2023)) and year_matches(2023, (2020, 2023))
+    assert not year_matches(2019, (2020, 2023))
+    assert not year_matches(0, (2020, None))
+    assert year_matches(0, None)
+
+@pytest.mark.parametrize("question, sections", [
+    ("What was my hemoglobin?", ["cbc"]),
+    ("Show my LDL and HDL", ["lipid_profile"]),
+    ("Is my potassium high?", ["electrolytes", "kidney_function", "clinical_interpretation"]),
+    ("How are my kidneys doing?", ["kidney_function"]),
+    ("Summarize my report", None),
+])
+def test_route_sections(question, sections):
+    assert route_sections(question) == sections
+
+def test_route_sections_falls_back_when_too_broad(monkeypatch):
+    monkeypatch.setattr(settings, "SECTION_ROUTING_MAX_SECTIONS", 2)
+    assert route_sections("hemoglobin, ldl and creatinine") is None
@@ -0,0 +1,67 @@
+import pytest
+from app.core.cache import InMemoryCacheBackend
+from app.core.config import settings
+from app.rag.answer_cache import CORPUS_VERSION_KEY
+from app.rag.local_store import LocalVectorStore
+from app.rag.retrieval_cache import retrieval_key, vector_digest
+from app.rag.retriever import _search
+
+VECTOR = [0.6, 0.8, 0.0]
+
+def chunk(chunk_id, text, year=2023, section="cbc"):
+    return {
+        "page_content": text,
+        "metadata": {"chunk_id": chunk_id, "source": f"{chunk_id}.pdf", "source_hash": chunk_id,
+                     "page": 1, "year": year, "section": section}
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalVectorStore(tmp_path / "store")
+    store.upsert([chunk("a", "Hemoglobin 13.5 g/dL")], [VECTOR])
+    return store
+
+def test_vector_digest_ignores_float_noise_only():
+    assert vector_digest(VECTOR) == vector_digest([x + 1e-7 for x in VECTOR])
+    assert vector_digest(VECTOR) != vector_digest([x + 1e-3 for x in VECTOR])
+
+def test_key_covers_filters_and_query_tokens(store):
+    key = retrieval_key(store, "hemoglobin?", VECTOR, 5, 2023, ["cbc"])
+
+    assert key == retrieval_key(store, "Hemoglobin", VECTOR, 5, 2023, ["cbc"])
+    assert key != retrieval_key(store, "hemoglobin", VECTOR, 5, (2020, 2023), ["cbc"])
+    assert key != retrieval_key(store, "hemoglobin", VECTOR, 5, 2023, None)
+    assert key != retrieval_key(store, "hemoglobin", VECTOR, 3, 2023, ["cbc"])
+    assert key != retrieval_key(store, "hemoglobin level", VECTOR, 5, 2023, ["cbc"])
+
+def test_hot_query_skips_the_store(store, monkeypatch):
+    first = _search(store, "hemoglobin", VECTOR, 5, None)
+    monkeypatch.setattr(store, "hybrid_search", lambda *a, **k: pytest.fail("store was queried"))
+
+    assert _search(store, "hemoglobin", VECTOR, 5, None) == first
+
+def test_ingest_in_another_worker_invalidates_results(store):
+    assert [c["chunk_id"] for c in _search(store, "hemoglobin", VECTOR, 5, None)] == ["a"]
+
+    store.upsert([chunk("b", "Hemoglobin 12.9 g/dL")], [VECTOR])
+    # Still the cached list until the corpus version moves...
+    assert len(_search(store, "hemoglobin", VECTOR, 5, None)) == 1
+
+    # ...which any worker may do (shared counter file)
+    InMemoryCacheBackend(16, None, settings.CACHE_COUNTERS_PATH).incr(CORPUS_VERSION_KEY)
+    assert sorted(c["chunk_id"] for c in _search(store, "hemoglobin", VECTOR, 5, None)) == ["a", "b"]
+
+def test_disabled_cache_has_no_key(store, monkeypatch):
+    monkeypatch.setattr(settings, "RETRIEVAL_CACHE_ENABLED", False)
+    assert retrieval_key(store, "hemoglobin", VECTOR, 5, None, None) is None
+
+def test_hits_misses_and_size_are_on_metrics(store):
+    from app.core.metrics import render_metrics
+
+    _search(store, "hemoglobin", VECTOR, 5, None)
+    _search(store, "hemoglobin", VECTOR, 5, None)
+    text = render_metrics()
+
+    assert 'rag_cache_entries{cache="retrieval"} 1' in text
+    assert 'rag_cache_requests_total{cache="retrieval",result="hit"}' in text
+    assert 'rag_cache_requests_total{cache="retrieval",result="miss"}' in text
@@ -0,0 +1,48 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.main import app
+from app.rag.answer_cache import get_cached_answer
+
+CHUNK = {"content": "Hemoglobin 13.5 g/dL", "source": "report.pdf", "page": 1, "year": 2023,
+         "section": "cbc", "chunk_id": "c1", "score": 0.9}
+
+def stream_tokens(*tokens):
+    async def astream(question, chunks):
+        for token in tokens:
+            yield token
+    return astream
+
+def query_stream(monkeypatch, *tokens):
+    async def retrieve(**kwargs):
+        return [dict(CHUNK)]
+    monkeypatch.setattr(routes, "aget_relevant_chunks", retrieve)
+    monkeypatch.setattr(routes, "astream_answer_with_groq", stream_tokens(*tokens))
+    return TestClient(app).post("/api/v1/query/stream", json={"question": "Why is my hemoglobin low?"}).text
+
+def test_streamed_answer_is_cached(monkeypatch):
+    body = query_stream(monkeypatch, "Within ", "range.")
+
+    assert "event: done" in body
+    assert get_cached_answer("Why is my hemoglobin low?", None)["answer"] == "Within range."
+
+def test_empty_stream_is_not_cached(monkeypatch):
+    body = query_stream(monkeypatch)
+
+    assert "event: done" in body
+    assert get_cached_answer("Why is my hemoglobin low?", None) is None
+
+def test_slot_is_released_when_generation_ends_not_when_the_client_reads(monkeypatch):
+    monkeypatch.setattr(routes, "astream_answer_with_groq", stream_tokens("a", "b"))
+
+    async def scenario():
+        slot = asyncio.Semaphore(1)
+        await slot.acquire()
+        tokens = asyncio.Queue()
+        await routes._drain_answer_stream("q", [], tokens, slot)
+        # Nobody has read a token yet, but the slot is free again
+        assert not slot.locked()
+        return [tokens.get_nowait() for _ in range(tokens.qsize())]
+
+    queued = asyncio.run(scenario())
+    assert queued[:2] == ["a", "b"] and queued[2] is routes._STREAM_END
@@ -0,0 +1,133 @@
+import pytest
+from app.core.config import settings
+from app.rag.manifest import load_manifest, record_ingested
+from app.rag.weaviate_store import (
+    FIELD_TOKENIZED_PROPERTIES, WEAVIATE_CLASS_NAME, WeaviateVectorStore, create_schema_if_not_exists,
+    weaviate_location
+)
+
+class FakeSchema:
+    def __init__(self, classes):
+        self.classes = classes
+        self.deleted = []
+        self.created = []
+
+    def get(self):
+        return {"classes": self.classes}
+
+    def delete_class(self, name):
+        self.deleted.append(name)
+
+    def create_class(self, class_obj):
+        self.created.append(class_obj)
+
+class FakeBatch:
+    def __init__(self):
+        self.deletes = []
+
+    def delete_objects(self, class_name, where):
+        self.deletes.append(where)
+        return {"results": {"successful": 3}}
+
+class FakeClient:
+    def __init__(self, classes=()):
+        self.schema = FakeSchema(list(classes))
+        self.batch = FakeBatch()
+
+def legacy_class(tokenization="word"):
+    return {
+        "class": WEAVIATE_CLASS_NAME,
+        "properties": [
+            {"name": name, "dataType": ["text"], "tokenization": tokenization}
+            for name in ("content", "source", "source_hash", "section", "chunk_id")
+        ]
+    }
+
+def test_new_class_uses_field_tokenization_for_id_properties():
+    client = FakeClient()
+    create_schema_if_not_exists(client)
+
+    properties = {p["name"]: p for p in client.schema.created[0]["properties"]}
+    for name in FIELD_TOKENIZED_PROPERTIES:
+        assert properties[name]["tokenization"] == "field"
+    assert "tokenization" not in properties["content"]
+
+def test_word_tokenized_class_is_rebuilt_and_manifest_reset():
+    record_ingested("report.pdf", "abc", 4, weaviate_location())
+    record_ingested("report.pdf", "abc", 4, "local:/srv/store")
+    client = FakeClient([legacy_class("word")])
+
+    create_schema_if_not_exists(client)
+
+    assert client.schema.deleted == [WEAVIATE_CLASS_NAME]
+    assert len(client.schema.created) == 1
+    assert list(load_manifest()) == ["local:/srv/store"]
+
+def test_current_class_is_kept():
+    record_ingested("report.pdf", "abc", 4, weaviate_location())
+    client = FakeClient([legacy_class("field")])
+
+    create_schema_if_not_exists(client)
+
+    assert client.schema.deleted == [] and client.schema.created == []
+    assert "report.pdf" in load_manifest()[weaviate_location()]
+
+def test_delete_by_source_matches_whole_source_except_current_hash():
+    client = FakeClient()
+    store = WeaviateVectorStore(client)
+
+    assert store.delete_by_source("report.pdf", keep_hash="h2") == 3
+    assert client.batch.deletes == [{
+        "operator": "And",
+        "operands": [
+            {"path": ["source"], "operator": "Equal", "valueText": "report.pdf"},
+            {"path": ["source_hash"], "operator": "NotEqual", "valueText": "h2"}
+        ]
+    }]
+
+def weaviate_chunk(i):
+    return {"page_content": f"chunk {i}", "metadata": {"chunk_id": f"id-{i}", "source": "report.pdf",
+                                                      "source_hash": "h1", "page": 1, "year": 2023, "section": "cbc"}}
+
+@pytest.fixture
+def flaky_store(monkeypatch):
+    """A store whose batch writes fail according to `store.failures` (callables run per call)."""
+    monkeypatch.setattr(settings, "WEAVIATE_BATCH_RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(settings, "WEAVIATE_BATCH_RETRIES", 2)
+    store = WeaviateVectorStore(FakeClient())
+    store.calls = []
+    store.failures = []
+
+    def write_batch(objects):
+        store.calls.append(sorted(objects))
+        fail = store.failures.pop(0) if store.failures else None
+        return fail(objects) if fail else {}
+    monkeypatch.setattr(store, "_write_batch", write_batch)
+    return store
+
+def connection_reset(objects):
+    raise ConnectionError("connection reset")
+
+def test_failed_batch_is_retried_in_halves(flaky_store):
+    flaky_store.failures = [connection_reset]
+
+    report = flaky_store.upsert([weaviate_chunk(i) for i in range(4)], [[1.0]] * 4)
+
+    assert report["indexed"] == 4 and report["failed"] == 0
+    assert flaky_store.calls == [
+        ["id-0", "id-1", "id-2", "id-3"], ["id-0", "id-1"], ["id-2", "id-3"]
+    ]
+
+def test_rejected_objects_are_resent_alone(flaky_store):
+    flaky_store.failures = [lambda objects: {"id-1": "timeout"}, lambda objects: {"id-1": "timeout"}]
+
+    report = flaky_store.upsert([weaviate_chunk(i) for i in range(3)], [[1.0]] * 3)
+
+    assert report["indexed"] == 3
+    assert flaky_store.calls[1:] == [["id-1"], ["id-1"]]
+
+def test_batch_failing_past_the_retries_fails_the_ingest(flaky_store):
+    flaky_store.failures = [connection_reset] * 10
+
+    with pytest.raises(ConnectionError):
+        flaky_store.upsert([weaviate_chunk(i) for i in range(2)], [[1.0]] * 2)
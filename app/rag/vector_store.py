@@ -1,99 +1,111 @@
-import weaviate
-import time
-from typing import List, Dict, Any
-from app.api.dependencies import get_weaviate_client
-from app.rag.embeddings import generate_embedding  # Or generate_embeddings_batch if you added it
-
-WEAVIATE_CLASS_NAME = "MedicalRecord"
-
-def wait_for_weaviate(client: weaviate.Client, timeout=30):
-    print("⏳ Waiting for Weaviate to be ready...")
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            if client.is_ready(): 
-                return True
-        except: 
-            pass
-        time.sleep(1)
-    return False
-
-def create_schema_if_not_exists(client: weaviate.Client):
-    try:
-        schema = client.schema.get()
-        classes = [c["class"] for c in schema.get("classes", [])]
-        
-        if WEAVIATE_CLASS_NAME in classes:
-            client.schema.delete_class(WEAVIATE_CLASS_NAME)
-            print(f"🧹 Deleted existing schema '{WEAVIATE_CLASS_NAME}'.")
-
-        print(f"💾 Creating Schema '{WEAVIATE_CLASS_NAME}'...")
-        
-        class_obj = {
-            "class": WEAVIATE_CLASS_NAME,
-            "description": "Medical Report Chunks",
-            "vectorizer": "none", 
-            "properties": [
-                {"name": "content", "dataType": ["text"]},
-                {"name": "source", "dataType": ["text"]},
-                {"name": "page", "dataType": ["int"]},
-                {"name": "year", "dataType": ["int"]},
-                {"name": "section", "dataType": ["text"]},
-                {"name": "chunk_id", "dataType": ["text"]}
-            ]
-        }
-        
-        client.schema.create_class(class_obj)
-        print("✅ Schema created.")
-    except Exception as e:
-        print(f"❌ Schema creation failed: {e}")
-        raise e
-
-def add_chunks_to_weaviate(chunks: List[Dict[str, Any]]):
-    client = get_weaviate_client()
-    
-    if not wait_for_weaviate(client):
-        raise ConnectionError("Weaviate unreachable")
-        
-    create_schema_if_not_exists(client)
-    
-    print(f"🚀 Generating embeddings & Indexing {len(chunks)} chunks...")
-    
-    with client.batch as batch:
-        batch.batch_size = 100
-        
-        for chunk in chunks:
-            # --- FIX STARTS HERE ---
-            # 1. Handle structure: {'page_content': '...', 'metadata': {...}}
-            text_content = chunk.get("page_content")
-            metadata = chunk.get("metadata", {})
-            
-            if not text_content:
-                print(f"⚠️ Skipping invalid chunk structure: {chunk.keys()}")
-                continue
-
-            # 2. Generate Vector
-            vector = generate_embedding(text_content)
-            
-            if not vector:
-                print(f"⚠️ Skipping chunk (No embedding)")
-                continue
-            
-            # 3. Flatten metadata for Weaviate
-            properties = {
-                "content": text_content,
-                "source": metadata.get("source", "Unknown"),
-                "page": int(metadata.get("page", 0)),
-                "year": int(metadata.get("year", 0)) if metadata.get("year") else 0,
-                "section": metadata.get("section", "General"),
-                "chunk_id": metadata.get("chunk_id", "unknown")
-            }
-            # --- FIX ENDS HERE ---
-            
-            batch.add_data_object(
-                data_object=properties,
-                class_name=WEAVIATE_CLASS_NAME,
-                vector=vector 
-            )
-            
-    print(f"✅ Successfully indexed {len(chunks)} chunks.")
\ No newline at end of file
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+from app.rag.query_router import YearFilter
+
+# Certainty = (1 + cosine) / 2 (Weaviate scale); 0.60 == cosine similarity 0.20
+DEFAULT_CERTAINTY = 0.60
+
+def chunk_properties(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Flattens a chunk ({'page_content', 'metadata'}) into the stored record."""
+    metadata = chunk.get("metadata", {})
+    return {
+        "content": chunk["page_content"],
+        "source": metadata.get("source", "Unknown"),
+        "page": int(metadata.get("page", 0)),
+        "year": int(metadata.get("year", 0)) if metadata.get("year") else 0,
+        "section": metadata.get("section", "General"),
+        "source_hash": metadata.get("source_hash", ""),
+        "chunk_id": metadata.get("chunk_id", "unknown")
+    }
+
+def upsert_report(indexed: int = 0, skipped: int = 0, failed_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    What `VectorStore.upsert` returns: objects written, chunks skipped (no
+    vector) and the chunk_ids the store still rejected after retries.
+    """
+    failed_ids = list(failed_ids or [])
+    return {"indexed": indexed, "skipped": skipped, "failed": len(failed_ids), "failed_ids": failed_ids}
+
+class VectorStore(ABC):
+    """
+    Storage backend for embedded chunks, selected by VECTOR_STORE_BACKEND
+    ("weaviate" or "local"); see `app.api.dependencies.get_vector_store`.
+
+    `search` returns dicts with content, source, page, year, section,
+    chunk_id and `score` (certainty scale, higher is more similar). `year`
+    is one year or an inclusive (first, last) range (see query_router.YearFilter).
+    """
+
+    name = "base"
+
+    def prepare(self):
+        """Called once before an ingest (connectivity, schema)."""
+
+    @abstractmethod
+    def upsert(self, chunks: List[Dict[str, Any]], vectors: List[List[float]]) -> Dict[str, Any]:
+        """
+        Inserts or replaces chunks by chunk_id; chunks without a vector are skipped.
+        Returns an `upsert_report` (indexed / skipped / failed counts).
+        """
+
+    @abstractmethod
+    def delete_by_source(self, source: str, keep_hash: Optional[str] = None) -> int:
+        """Deletes the chunks of `source`, except those whose source_hash is `keep_hash`."""
+
+    @abstractmethod
+    def search(
+        self,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        certainty: float = DEFAULT_CERTAINTY
+    ) -> List[Dict[str, Any]]:
+        """Top-`limit` chunks by cosine similarity, optionally filtered by year / sections."""
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        alpha: float = 0.5,
+        candidates: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 + vector search fused by rank (`alpha` weights the vector side).
+        Backends without a lexical index fall back to vector search.
+        """
+        return self.search(vector, limit=limit, year=year, sections=sections)
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks."""
+
+    @abstractmethod
+    def has_source(self, source: str) -> bool:
+        """True if any chunk of `source` is stored."""
+
+    @abstractmethod
+    def location(self) -> str:
+        """Which index this is (backend + path or URL / class); scopes the ingest manifest."""
+
+    def flush(self):
+        """Persists pending writes; called at the end of an ingest."""
+
+    def is_ready(self) -> bool:
+        return True
+
+    def close(self):
+        """Releases resources on shutdown."""
+
+def delete_stale_chunks(store: VectorStore, source: str, current_hash: str) -> int:
+    """
+    Removes chunks of `source` that came from an older version of the file.
+    Returns the number of deleted objects.
+    """
+    deleted = store.delete_by_source(source, keep_hash=current_hash)
+    if deleted:
+        print(f"🧹 Removed {deleted} stale chunks of '{source}'.")
+    return deleted
@@ -0,0 +1,347 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import weaviate
+from weaviate.gql.get import HybridFusion
+from app.core.config import settings
+from app.core.metrics import record_upstream_error
+from app.rag.manifest import reset_manifest
+from app.rag.query_router import YearFilter, year_bounds
+from app.rag.vector_store import VectorStore, chunk_properties, upsert_report, DEFAULT_CERTAINTY
+
+WEAVIATE_CLASS_NAME = "MedicalRecord"
+RETURN_PROPERTIES = ["content", "source", "page", "year", "section", "chunk_id"]
+
+def weaviate_location() -> str:
+    return f"weaviate:{settings.WEAVIATE_URL}/{WEAVIATE_CLASS_NAME}"
+
+def wait_for_weaviate(client: weaviate.Client, timeout=30):
+    print("⏳ Waiting for Weaviate to be ready...")
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            if client.is_ready():
+                return True
+        except:
+            pass
+        time.sleep(1)
+    return False
+
+# ID-like properties matched with Equal / NotEqual must compare whole values:
+# word tokenization would make "report.pdf" match "report_final.pdf"
+FIELD_TOKENIZED_PROPERTIES = ("source", "source_hash", "section", "chunk_id")
+
+def is_current_schema(class_schema: Dict[str, Any]) -> bool:
+    """False for legacy classes: no `source_hash` (random chunk IDs) or word-tokenized ID properties."""
+    properties = {p["name"]: p for p in class_schema.get("properties", [])}
+    if "source_hash" not in properties:
+        return False
+    return all(
+        properties.get(name, {}).get("tokenization") == "field" for name in FIELD_TOKENIZED_PROPERTIES
+    )
+
+def create_schema_if_not_exists(client: weaviate.Client):
+    """
+    Creates the class on first use. Existing data is kept (ingestion is incremental);
+    only a legacy class (see `is_current_schema`) is rebuilt once, after which
+    every report has to be ingested again.
+    """
+    try:
+        schema = client.schema.get()
+        classes = {c["class"]: c for c in schema.get("classes", [])}
+
+        if WEAVIATE_CLASS_NAME in classes:
+            if is_current_schema(classes[WEAVIATE_CLASS_NAME]):
+                return
+            client.schema.delete_class(WEAVIATE_CLASS_NAME)
+            print(f"🧹 Deleted legacy schema '{WEAVIATE_CLASS_NAME}' (random IDs or word-tokenized ID fields).")
+
+        print(f"💾 Creating Schema '{WEAVIATE_CLASS_NAME}'...")
+
+        class_obj = {
+            "class": WEAVIATE_CLASS_NAME,
+            "description": "Medical Report Chunks",
+            "vectorizer": "none",
+            "properties": [
+                {"name": "content", "dataType": ["text"]},
+                {"name": "source", "dataType": ["text"], "tokenization": "field"},
+                {"name": "source_hash", "dataType": ["text"], "tokenization": "field"},
+                {"name": "page", "dataType": ["int"]},
+                {"name": "year", "dataType": ["int"]},
+                {"name": "section", "dataType": ["text"], "tokenization": "field"},
+                {"name": "chunk_id", "dataType": ["text"], "tokenization": "field"}
+            ]
+        }
+
+        client.schema.create_class(class_obj)
+        # Fresh class: nothing is indexed, so no stored fingerprint is valid anymore
+        reset_manifest(weaviate_location())
+        print("✅ Schema created.")
+    except Exception as e:
+        print(f"❌ Schema creation failed: {e}")
+        raise e
+
+def build_where_filter(year: YearFilter = None, sections: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    operands = []
+    # Strict Year Filter (Hard Filtering): one year, or a range (year 0 = unknown is never in it)
+    bounds = year_bounds(year)
+    if bounds is not None:
+        first, last = bounds
+        if first == last:
+            operands.append({"path": ["year"], "operator": "Equal", "valueInt": first})
+        else:
+            operands.append({"path": ["year"], "operator": "GreaterThanEqual", "valueInt": first or 1})
+            if last is not None:
+                operands.append({"path": ["year"], "operator": "LessThanEqual", "valueInt": last})
+    if sections:
+        operands.append({
+            "operator": "Or",
+            "operands": [{"path": ["section"], "operator": "Equal", "valueText": s} for s in sections]
+        } if len(sections) > 1 else {"path": ["section"], "operator": "Equal", "valueText": sections[0]})
+
+    if not operands:
+        return None
+    return operands[0] if len(operands) == 1 else {"operator": "And", "operands": operands}
+
+def batch_errors(results: Optional[List[Dict[str, Any]]]) -> Dict[str, str]:
+    """{object UUID: error message} for the objects a batch response rejected."""
+    errors = {}
+    for item in results or []:
+        error = ((item.get("result") or {}).get("errors") or {}).get("error")
+        if error:
+            errors[item.get("id")] = "; ".join(e.get("message", "") for e in error)
+    return errors
+
+class WeaviateVectorStore(VectorStore):
+    """Weaviate v3 backend (GraphQL near_vector / hybrid search, batch upserts by chunk UUID)."""
+
+    name = "weaviate"
+
+    def __init__(self, client: Optional[weaviate.Client] = None):
+        # None -> the application-scoped pooled client
+        self._client = client
+        # client.batch is one buffer per client: writers take turns, and the
+        # callback of the current upsert collects the per-object errors
+        self._batch_lock = threading.Lock()
+        self._batch_client = None
+        self._rejected: Dict[str, str] = {}
+
+    @property
+    def client(self) -> weaviate.Client:
+        if self._client is not None:
+            return self._client
+        from app.api.dependencies import get_weaviate_client
+        return get_weaviate_client()
+
+    def prepare(self):
+        if not wait_for_weaviate(self.client):
+            raise ConnectionError("Weaviate unreachable")
+
+        create_schema_if_not_exists(self.client)
+
+    def _configure_batch(self, client: weaviate.Client):
+        """
+        Dynamic batching (once per client, so the learned batch size carries
+        over between upserts): the SDK resizes batches from the observed
+        objects/s (or the server's queue stats) and sends them on several workers.
+        """
+        if self._batch_client is client:
+            return
+        client.batch.configure(
+            batch_size=settings.WEAVIATE_BATCH_SIZE,
+            dynamic=settings.WEAVIATE_BATCH_DYNAMIC,
+            num_workers=max(1, settings.WEAVIATE_BATCH_WORKERS),
+            callback=lambda results: self._rejected.update(batch_errors(results))
+        )
+        self._batch_client = client
+
+    def _write_batch(self, objects: Dict[str, Tuple[Dict[str, Any], List[float]]]) -> Dict[str, str]:
+        """Sends the objects through the batch API; returns {uuid: error} for the ones rejected."""
+        client = self.client
+        with self._batch_lock:
+            self._configure_batch(client)
+            self._rejected = {}
+            try:
+                with client.batch as batch:
+                    for uuid, (properties, vector) in objects.items():
+                        # Deterministic chunk_id as object UUID -> upsert instead of duplicate
+                        batch.add_data_object(
+                            data_object=properties,
+                            class_name=WEAVIATE_CLASS_NAME,
+                            vector=vector,
+                            uuid=uuid
+                        )
+            except Exception:
+                # Don't let the unsent remainder ride along with the next write
+                client.batch.empty_objects()
+                raise
+            return dict(self._rejected)
+
+    def _write_with_retries(
+        self, objects: Dict[str, Tuple[Dict[str, Any], List[float]]], attempt: int = 0
+    ) -> Dict[str, str]:
+        """
+        Sends the objects; re-sends the ones the server rejected, and after a
+        whole-batch failure (timeout, connection reset) sends the batch again
+        in two halves. Backoff doubles per attempt. Returns {uuid: error} for
+        objects still rejected after WEAVIATE_BATCH_RETRIES; a batch that still
+        fails as a whole raises (the ingestion job fails).
+        """
+        retries = settings.WEAVIATE_BATCH_RETRIES
+        if attempt:
+            time.sleep(settings.WEAVIATE_BATCH_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        try:
+            rejected = {uuid: error for uuid, error in self._write_batch(objects).items() if uuid in objects}
+        except Exception as e:
+            record_upstream_error("weaviate")
+            if attempt >= retries:
+                raise
+            items = list(objects.items())
+            halves = [dict(items[:len(items) // 2]), dict(items[len(items) // 2:])] if len(items) > 1 else [objects]
+            print(f"🔁 Weaviate batch of {len(objects)} objects failed ({e}); retrying in {len(halves)} part(s) (attempt {attempt + 2})...")
+            failed: Dict[str, str] = {}
+            for half in halves:
+                failed.update(self._write_with_retries(half, attempt + 1))
+            return failed
+
+        if not rejected or attempt >= retries:
+            return rejected
+        record_upstream_error("weaviate", len(rejected))
+        print(f"🔁 Retrying {len(rejected)} rejected objects (attempt {attempt + 2})...")
+        return self._write_with_retries({uuid: objects[uuid] for uuid in rejected}, attempt + 1)
+
+    def upsert(self, chunks: List[Dict[str, Any]], vectors: List[List[float]]) -> Dict[str, Any]:
+        pending: Dict[str, Tuple[Dict[str, Any], List[float]]] = {}
+        skipped = 0
+        for chunk, vector in zip(chunks, vectors):
+            metadata = chunk.get("metadata", {})
+            if not vector:
+                print(f"⚠️ Skipping chunk {metadata.get('chunk_id')} (No embedding after retries)")
+                skipped += 1
+                continue
+            pending[metadata.get("chunk_id")] = (chunk_properties(chunk), vector)
+        if not pending:
+            return upsert_report(skipped=skipped)
+
+        # Rejected objects and failed batches are retried; objects still rejected are reported
+        rejected = self._write_with_retries(pending)
+        for uuid, error in rejected.items():
+            print(f"❌ Weaviate rejected chunk {uuid}: {error}")
+        return upsert_report(indexed=len(pending) - len(rejected), skipped=skipped, failed_ids=list(rejected))
+
+    def delete_by_source(self, source: str, keep_hash: Optional[str] = None) -> int:
+        where = {"path": ["source"], "operator": "Equal", "valueText": source}
+        if keep_hash:
+            where = {
+                "operator": "And",
+                "operands": [
+                    where,
+                    {"path": ["source_hash"], "operator": "NotEqual", "valueText": keep_hash}
+                ]
+            }
+        result = self.client.batch.delete_objects(class_name=WEAVIATE_CLASS_NAME, where=where)
+        return result.get("results", {}).get("successful", 0) if result else 0
+
+    def search(
+        self,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        certainty: float = DEFAULT_CERTAINTY
+    ) -> List[Dict[str, Any]]:
+        query_builder = (
+            self.client.query
+            .get(WEAVIATE_CLASS_NAME, RETURN_PROPERTIES)
+            .with_near_vector({
+                "vector": vector,
+                "certainty": certainty  # Threshold: Filters out irrelevant noise
+            })
+            .with_additional(["certainty"])
+            .with_limit(limit)
+        )
+        where = build_where_filter(year, sections)
+        if where:
+            query_builder = query_builder.with_where(where)
+
+        result = query_builder.do()
+        if "errors" in result:
+            raise RuntimeError(result["errors"])
+
+        # Safe extraction of results from the Weaviate GraphQL response
+        if "data" in result and "Get" in result["data"]:
+            hits = result["data"]["Get"].get(WEAVIATE_CLASS_NAME) or []
+        else:
+            hits = []
+
+        for hit in hits:
+            hit["score"] = (hit.pop("_additional", None) or {}).get("certainty")
+        return hits
+
+    def hybrid_search(
+        self,
+        query_text: str,
+        vector: List[float],
+        limit: int = 5,
+        year: YearFilter = None,
+        sections: Optional[List[str]] = None,
+        alpha: float = 0.5,
+        candidates: int = 50
+    ) -> List[Dict[str, Any]]:
+        # Weaviate keeps its own BM25 inverted index on `content` (updated on every write)
+        # and fuses by rank. Asking for `candidates` objects deepens both retriever pools;
+        # the fused list is cut to `limit` here.
+        query_builder = (
+            self.client.query
+            .get(WEAVIATE_CLASS_NAME, RETURN_PROPERTIES)
+            .with_hybrid(
+                query=query_text,
+                alpha=alpha,
+                vector=vector,
+                properties=["content"],
+                fusion_type=HybridFusion.RANKED
+            )
+            .with_additional(["score"])
+            .with_limit(max(limit, candidates))
+        )
+        where = build_where_filter(year, sections)
+        if where:
+            query_builder = query_builder.with_where(where)
+
+        result = query_builder.do()
+        if "errors" in result:
+            raise RuntimeError(result["errors"])
+
+        hits = (result.get("data") or {}).get("Get", {}).get(WEAVIATE_CLASS_NAME) or []
+        for hit in hits:
+            score = (hit.pop("_additional", None) or {}).get("score")
+            hit["score"] = float(score) if score is not None else None
+        return hits[:limit]
+
+    def count(self) -> int:
+        result = self.client.query.aggregate(WEAVIATE_CLASS_NAME).with_meta_count().do()
+        try:
+            return result["data"]["Aggregate"][WEAVIATE_CLASS_NAME][0]["meta"]["count"]
+        except (KeyError, IndexError, TypeError):
+            return 0
+
+    def has_source(self, source: str) -> bool:
+        result = (
+            self.client.query.aggregate(WEAVIATE_CLASS_NAME)
+            .with_where({"path": ["source"], "operator": "Equal", "valueText": source})
+            .with_meta_count()
+            .do()
+        )
+        try:
+            return result["data"]["Aggregate"][WEAVIATE_CLASS_NAME][0]["meta"]["count"] > 0
+        except (KeyError, IndexError, TypeError):
+            return False
+
+    def location(self) -> str:
+        return weaviate_location()
+
+    def is_ready(self) -> bool:
+        try:
+            return bool(self.client.is_ready())
+        except Exception:
+            return False
@@ -0,0 +1,61 @@
+"""
+Chunker throughput (MB/s) on synthetic multi-megabyte lab reports.
+
+    python benchmarks/bench_chunker.py --megabytes 8 --repeat 3
+
+Three corpora: typical markdown lab reports (short sections), reports with
+oversized sections (exercises the recursive splitter), and a pathological
+page with no separators at all. Each is chunked by characters and by tokens.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import lab_page
+from app.core.config import settings
+from app.rag.chunking import chunk_page
+
+def build_corpus(kind: str, megabytes: float):
+    rng = random.Random(0)
+    target = int(megabytes * 1024 * 1024)
+    pages, size = [], 0
+    while size < target:
+        if kind == "pathological":
+            content = "x" * min(1024 * 1024, target - size)
+        else:
+            content = lab_page(rng, rows_per_section=1 if kind == "typical" else 40)
+        pages.append({
+            "page_content": content,
+            "metadata": {"source": "synthetic.pdf", "source_hash": "bench", "page": len(pages) + 1, "year": 2021}
+        })
+        size += len(content.encode("utf-8"))
+    return pages, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for kind in ("typical", "large_sections", "pathological"):
+        pages, size = build_corpus(kind, args.megabytes)
+        for unit, chunk_size, overlap, max_section in (("chars", 1500, 150, 2000), ("tokens", 384, 38, 512)):
+            settings.CHUNK_SIZE_UNIT = unit
+            settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, settings.CHUNK_MAX_SECTION_SIZE = chunk_size, overlap, max_section
+
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                chunks = sum(1 for page in pages for _ in chunk_page(page))
+                best = min(best, time.perf_counter() - started)
+            print(
+                f"📊 {kind:<15} {unit:<6} {size / 1e6:6.1f} MB  {chunks:>7} chunks  "
+                f"{best:6.2f}s  {size / 1e6 / best:7.1f} MB/s"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Top-k latency of the in-process NumPy vector store on synthetic chunks.
+
+    python benchmarks/bench_local_store.py --chunks 100000 --dim 768 --queries 200
+    python benchmarks/bench_local_store.py --prefilter-dims 128 --prefilter-pool 256
+
+No API keys or Weaviate needed; vectors are random, so this measures search
+cost only. With --prefilter-dims the exact scan runs first and the prefiltered
+search also reports recall@k against it; random vectors carry no more signal
+in their first dims than in the rest, so that recall is a floor, not what
+Matryoshka embeddings get.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.core.config import settings
+from app.rag.local_store import LocalVectorStore
+
+SECTIONS = ["cbc", "lipid_profile", "glucose_diabetes", "kidney_function", "liver_function", "electrolytes"]
+
+def fake_chunks(n: int):
+    for i in range(n):
+        yield {
+            "page_content": f"synthetic chunk {i}",
+            "metadata": {
+                "source": f"report_{i // 50}.pdf",
+                "source_hash": f"hash_{i // 50}",
+                "page": i % 10,
+                "year": 2018 + i % 7,
+                "section": SECTIONS[i % len(SECTIONS)],
+                "chunk_id": f"chunk-{i}"
+            }
+        }
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--prefilter-dims", type=int, default=0, help="also run with LOCAL_STORE_PREFILTER_DIMS")
+    parser.add_argument("--prefilter-pool", type=int, default=settings.LOCAL_STORE_PREFILTER_POOL)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        # The store checks the shared corpus version; keep that file out of data/
+        settings.CACHE_COUNTERS_PATH = Path(tmp) / "cache_counters.sqlite3"
+        store = LocalVectorStore(tmp)
+
+        started = time.perf_counter()
+        batch = 5000
+        chunks = list(fake_chunks(args.chunks))
+        for i in range(0, args.chunks, batch):
+            vectors = rng.standard_normal((len(chunks[i:i + batch]), args.dim), dtype=np.float32)
+            store.upsert(chunks[i:i + batch], vectors.tolist())
+        print(f"📥 Upserted {store.count()} chunks in {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        store.flush()
+        print(f"💾 Flush: {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        store = LocalVectorStore(tmp)
+        print(f"📂 Reload (memmap): {time.perf_counter() - started:.3f}s")
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+        cases = [("unfiltered", {}), ("year filter", {"year": 2021}), ("year + section", {"year": 2021, "sections": ["cbc"]})]
+        exact = run_queries(store, queries, cases, args.limit, "exact")
+
+        if args.prefilter_dims:
+            settings.LOCAL_STORE_PREFILTER_DIMS = args.prefilter_dims
+            settings.LOCAL_STORE_PREFILTER_POOL = args.prefilter_pool
+            store = LocalVectorStore(tmp)
+            run_queries(store, queries, cases, args.limit, f"prefilter {args.prefilter_dims}d/{args.prefilter_pool}", exact)
+
+def run_queries(store, queries, cases, limit, mode, exact=None):
+    """Times every case; returns the hit ids per (case, query) for recall checks."""
+    results = {}
+    for label, kwargs in cases:
+        timings, found = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            hits = store.search(query, limit=limit, certainty=0.0, **kwargs)
+            timings.append((time.perf_counter() - t0) * 1000)
+            found.append({hit["chunk_id"] for hit in hits})
+        results[label] = found
+        recall = ""
+        if exact is not None:
+            recall = f" recall@{limit}={statistics.mean(len(a & b) / max(len(b), 1) for a, b in zip(found, exact[label])):.2f}"
+        print(
+            f"🔎 top-{limit} {mode:<20} {label:<15} p50={percentile(timings, 50):.2f}ms "
+            f"p95={percentile(timings, 95):.2f}ms mean={statistics.mean(timings):.2f}ms{recall}"
+        )
+    return results
+
+if __name__ == "__main__":
+    main()
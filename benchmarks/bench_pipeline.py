@@ -0,0 +1,258 @@
+"""
+Offline per-stage and end-to-end benchmarks for the RAG pipeline.
+
+    python benchmarks/bench_pipeline.py --reports 20 --pages 4 --queries 200 \\
+        --output benchmarks/results/pipeline.json [--compare old.json]
+
+Runs entirely in-process: Gemini, LlamaParse and Groq are replaced by the
+deterministic fakes in `benchmarks/fakes.py` (optionally with simulated
+latency) and chunks go to the local NumPy vector store in a temp directory.
+No API keys, Weaviate or network needed.
+
+Stages: clean_medical_text, chunk_medical_documents, index (store upsert),
+retrieve (get_relevant_chunks; also run without section routing as
+retrieve_unrouted, both reporting the share of off-topic hits; and replayed
+against a warm retrieval cache as retrieve_cached), pack_context (also reports context tokens
+per prompt against the old unpacked format), format_context_for_llm, plus
+end-to-end ingestion (run_ingestion_pipeline) and query (retrieve + generate).
+Each reports p50/p95/p99 latency per operation and throughput; --output
+writes them as JSON and --compare diffs against an earlier run.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import fake_embedding, install_fakes, synthetic_questions, write_synthetic_reports, PAGE_BREAK
+from benchmarks.results import compare_results, format_summary, latency_summary, run_metadata, write_results
+from app.core.config import settings
+from app.rag.chunking import chunk_medical_documents, text_length
+from app.rag.generation import agenerate_answer_with_groq, format_context_for_llm, pack_context
+from app.rag.ingestion import clean_medical_text, extract_year_from_filename
+from app.rag.local_store import LocalVectorStore
+from app.rag.pipeline import run_ingestion_pipeline
+from app.rag.retrieval_cache import clear_retrieval_cache
+from app.rag.retriever import aget_relevant_chunks, get_relevant_chunks
+
+STAGES = ("clean", "chunk", "index", "retrieve", "retrieve_unrouted", "retrieve_cached", "context_pack", "format_context", "e2e_ingest", "e2e_query")
+
+def legacy_format_context(chunks: List[Dict[str, Any]]) -> str:
+    """The context format before packing (every chunk whole, headers and overlaps repeated), for comparison."""
+    return "".join(
+        f"\n--- SOURCE {i + 1} ---\nDocument: {c.get('source')}\nDate/Year: {c.get('year')}\n"
+        f"Section: {c.get('section')}\nContent:\n{c.get('content')}\n-------------------\n"
+        for i, c in enumerate(chunks)
+    )
+
+@contextlib.contextmanager
+def quiet():
+    """Swallows the pipeline's progress prints so they don't skew timings."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def timed(func: Callable, inputs: List[Any]) -> List[float]:
+    timings = []
+    with quiet():
+        for item in inputs:
+            started = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+def load_reports(paths: List[str]) -> List[List[Dict[str, Any]]]:
+    """Raw page dicts per report, shaped like the parser output before cleaning."""
+    reports = []
+    for path in paths:
+        filename = os.path.basename(path)
+        year = extract_year_from_filename(filename)
+        text = Path(path).read_text(encoding="utf-8")
+        reports.append([
+            {
+                "page_content": page,
+                "metadata": {"source": filename, "page": i + 1, "year": int(year), "source_hash": f"bench-{filename}"}
+            }
+            for i, page in enumerate(text.split(PAGE_BREAK))
+        ])
+    return reports
+
+def run_stages(args, workdir: Path, stages: List[str]) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def record(name: str, summary: Dict[str, Any]):
+        results[name] = summary
+        print(format_summary(name, summary))
+
+    paths = write_synthetic_reports(workdir / "reports", args.reports, args.pages, args.rows)
+    reports = load_reports(paths)
+    pages = [page for report in reports for page in report]
+    corpus_mb = sum(len(p["page_content"].encode("utf-8")) for p in pages) / 1e6
+    questions = synthetic_questions(args.queries)
+    print(f"📄 Corpus: {args.reports} reports, {len(pages)} pages, {corpus_mb:.2f} MB; {len(questions)} questions\n")
+
+    # 1. clean_medical_text (per page)
+    for page in pages:
+        page["page_content"] = clean_medical_text(page["page_content"])
+    if "clean" in stages:
+        raw = [Path(p).read_text(encoding="utf-8").split(PAGE_BREAK) for p in paths]
+        timings = []
+        for _ in range(args.repeat):
+            timings += timed(clean_medical_text, [text for report in raw for text in report])
+        record("clean", latency_summary(timings, items=corpus_mb * args.repeat, unit="MB"))
+
+    # 2. chunk_medical_documents (per report)
+    with quiet():
+        chunks = chunk_medical_documents(pages)
+    if "chunk" in stages:
+        timings = []
+        for _ in range(args.repeat):
+            timings += timed(chunk_medical_documents, reports)
+        record("chunk", latency_summary(timings, items=corpus_mb * args.repeat, unit="MB"))
+
+    # 3. Vector-store upserts (per EMBEDDING_BATCH_SIZE batch; vectors precomputed, not timed)
+    vectors = [fake_embedding(c["page_content"]) for c in chunks]
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    batches = [(chunks[i:i + batch_size], vectors[i:i + batch_size]) for i in range(0, len(chunks), batch_size)]
+    store = LocalVectorStore(workdir / "bench_store")
+    if "index" in stages:
+        timings = []
+        for _ in range(args.repeat):
+            timings += timed(lambda batch: store.upsert(*batch), batches)
+        record("index", latency_summary(timings, items=len(chunks) * args.repeat, unit="chunks"))
+        started = time.perf_counter()
+        with quiet():
+            store.flush()
+        record("index_flush", latency_summary([time.perf_counter() - started]))
+    else:
+        for batch in batches:
+            store.upsert(*batch)
+
+    # 4. Retrieval (query embedding via the fake + hybrid/vector search), routed
+    # to the question's report sections and, for comparison, over everything
+    # (retrieval cache off, so every stage below measures real searches)
+    settings.RETRIEVAL_CACHE_ENABLED = False
+
+    def off_topic(results: List[List[Dict[str, Any]]]) -> float:
+        """Share of hits outside the section that answers the question (interpretation counts as on-topic)."""
+        hits = [(item["section"], hit["section"]) for item, found in zip(questions, results) for hit in found]
+        wrong = sum(1 for want, got in hits if got not in (want, "clinical_interpretation"))
+        return round(wrong / len(hits), 3) if hits else 0.0
+
+    routing = settings.SECTION_ROUTING_ENABLED
+    for name, routed in (("retrieve_unrouted", False), ("retrieve", True)):
+        settings.SECTION_ROUTING_ENABLED = routed
+        found_chunks = []
+        timings = timed(lambda item: found_chunks.append(
+            get_relevant_chunks(item["question"], limit=args.limit, year=item["year"], store=store)
+        ), questions)
+        if name in stages:
+            summary = latency_summary(timings, unit="queries")
+            summary["off_topic_share"] = off_topic(found_chunks)
+            record(name, summary)
+            print(f"   off-topic hits: {summary['off_topic_share']:.1%}")
+    settings.SECTION_ROUTING_ENABLED = routing
+    retrieved = found_chunks
+
+    # Hot questions: the same retrievals served from the retrieval cache (first pass fills it)
+    if "retrieve_cached" in stages:
+        settings.RETRIEVAL_CACHE_ENABLED = True
+        retrieve_once = lambda item: get_relevant_chunks(item["question"], limit=args.limit, year=item["year"], store=store)
+        timed(retrieve_once, questions)
+        record("retrieve_cached", latency_summary(timed(retrieve_once, questions), unit="queries"))
+        settings.RETRIEVAL_CACHE_ENABLED = False
+        clear_retrieval_cache()
+
+    # 5. Context packing (dedupe + token budget), and prompt size before/after
+    packed = [pack_context(chunks) for chunks in retrieved]
+    if "context_pack" in stages:
+        timings = []
+        for _ in range(args.repeat):
+            timings += timed(pack_context, retrieved)
+        summary = latency_summary(timings, unit="prompts")
+        legacy = sum(text_length(legacy_format_context(chunks), "tokens") for chunks in retrieved)
+        current = sum(text_length(format_context_for_llm(chunks), "tokens") for chunks in packed)
+        summary["context_tokens_legacy"] = round(legacy / len(retrieved), 1)
+        summary["context_tokens_packed"] = round(current / len(retrieved), 1)
+        record("context_pack", summary)
+        print(f"   context tokens/prompt: {summary['context_tokens_legacy']} -> {summary['context_tokens_packed']} "
+              f"({(current - legacy) / legacy:+.1%})")
+
+    # 6. Context formatting for the LLM prompt
+    if "format_context" in stages:
+        timings = []
+        for _ in range(args.repeat):
+            timings += timed(format_context_for_llm, packed)
+        record("format_context", latency_summary(timings, unit="prompts"))
+
+    # 7. End-to-end ingestion: fake parse -> chunk -> fake embed -> index -> flush
+    if "e2e_ingest" in stages:
+        timings = []
+        for run in range(args.repeat):
+            shutil.rmtree(settings.PARSE_CACHE_DIR, ignore_errors=True)
+            run_store = LocalVectorStore(workdir / f"e2e_store_{run}")
+            with quiet():
+                started = time.perf_counter()
+                asyncio.run(run_ingestion_pipeline(paths, run_store))
+                timings.append(time.perf_counter() - started)
+        record("e2e_ingest", latency_summary(timings, items=len(pages) * args.repeat, unit="pages"))
+
+    # 8. End-to-end query: retrieve + pack + generate (fake Groq)
+    if "e2e_query" in stages:
+        async def answer_all() -> List[float]:
+            timings = []
+            for item in questions:
+                started = time.perf_counter()
+                found = await aget_relevant_chunks(item["question"], limit=args.limit, year=item["year"], store=store)
+                await agenerate_answer_with_groq(item["question"], pack_context(found))
+                timings.append(time.perf_counter() - started)
+            return timings
+        with quiet():
+            timings = asyncio.run(answer_all())
+        record("e2e_query", latency_summary(timings, unit="queries"))
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=20, help="synthetic PDFs in the corpus")
+    parser.add_argument("--pages", type=int, default=4, help="pages per report")
+    parser.add_argument("--rows", type=int, default=1, help="table rows per analyte (larger = oversized sections)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5, help="top-k chunks per query")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="simulated seconds per embedding call")
+    parser.add_argument("--parse-latency", type=float, default=0.0, help="simulated seconds per parsed file")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per completion")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent for --compare")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        install_fakes(Path(tmp), args.embed_latency, args.parse_latency, args.llm_latency)
+        results = run_stages(args, Path(tmp), stages)
+
+    if args.output:
+        write_results(args.output, run_metadata(vars(args)), results)
+    if args.compare:
+        regressions = compare_results(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metrics regressed by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
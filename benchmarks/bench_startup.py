@@ -0,0 +1,131 @@
+"""
+Cold-start cost of the API process: import time of `app.main` (per module)
+and time until the lifespan startup completes, in full and query-only mode.
+
+    python benchmarks/bench_startup.py --repeat 5 \\
+        --output benchmarks/results/startup.json [--compare old.json]
+
+Every run is a fresh interpreter (`python -X importtime`), so nothing is
+cached in-process between runs. Startup uses the local vector store on an
+empty temp directory and the offline fakes, so no keys, Weaviate or network
+are needed; background client preloading is not part of "ready".
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.results import compare_results, format_summary, latency_summary, run_metadata, write_results
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = {"full": {"INGESTION_ENABLED": "true"}, "query_only": {"INGESTION_ENABLED": "false"}}
+# Third-party SDKs that should only load when (and if) they are used
+HEAVY_MODULES = ("llama_parse", "llama_index", "google.generativeai", "groq", "weaviate", "numpy", "redis")
+
+IMPORTED_MARKER = "--- app.main imported ---"
+
+# Runs in the child: time the import, then the lifespan startup (fakes installed after the import)
+CHILD = """
+import sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+sys.stderr.write({marker!r} + "\\n")
+
+import asyncio, json, tempfile
+from pathlib import Path
+loaded = sorted(m for m in {heavy!r} if m in sys.modules)
+from benchmarks.fakes import install_fakes
+install_fakes(Path(tempfile.mkdtemp()))
+
+async def startup():
+    began = time.perf_counter()
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter() - began
+
+lifespan = asyncio.run(startup())
+print(json.dumps({{"import": imported - started, "ready": imported - started + lifespan, "loaded": loaded}}))
+"""
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative import time (ms) per module imported by `app.main`, from `-X importtime` output."""
+    modules = {}
+    for line in stderr.split(IMPORTED_MARKER)[0].splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+def run_once(mode: str) -> Dict[str, Any]:
+    env = {**os.environ, **MODES[mode], "PRELOAD_CLIENTS": "false"}
+    for key in ("GOOGLE_API_KEY", "GROQ_API_KEY", "LLAMA_CLOUD_API_KEY"):
+        env.setdefault(key, "offline-benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(heavy=HEAVY_MODULES, marker=IMPORTED_MARKER)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup run failed ({mode}):\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["modules"] = parse_importtime(proc.stderr)
+    return result
+
+def module_breakdown(runs: List[Dict[str, Any]], top: int) -> Dict[str, Dict[str, float]]:
+    """Median cumulative ms of the slowest app modules and third-party packages."""
+    names = set().union(*(run["modules"] for run in runs))
+    medians = {name: statistics.median(run["modules"].get(name, 0.0) for run in runs) for name in names}
+    stdlib = getattr(sys, "stdlib_module_names", ())
+    app = {n: t for n, t in medians.items() if n.startswith("app.")}
+    third_party = {n: t for n, t in medians.items() if "." not in n and n != "app" and n not in stdlib}
+    pick = lambda group: dict(sorted(group.items(), key=lambda item: -item[1])[:top])
+    return {"app": pick(app), "third_party": pick(third_party)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {', '.join(MODES)}")
+    parser.add_argument("--top", type=int, default=8, help="modules listed per group")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent for --compare")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    breakdowns = {}
+    for mode in modes:
+        runs = [run_once(mode) for _ in range(args.repeat)]
+        for stage in ("import", "ready"):
+            name = f"{stage}[{mode}]"
+            results[name] = latency_summary([run[stage] for run in runs], unit="starts")
+            print(format_summary(name, results[name]))
+        breakdowns[mode] = module_breakdown(runs, args.top)
+        print(f"   heavy SDKs loaded at import: {', '.join(runs[0]['loaded']) or 'none'}")
+        for group, modules in breakdowns[mode].items():
+            print(f"   {group}: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in modules.items()))
+        print()
+
+    if args.output:
+        meta = run_metadata(vars(args))
+        meta["modules"] = breakdowns
+        write_results(args.output, meta, results)
+    if args.compare:
+        regressions = compare_results(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metrics regressed by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
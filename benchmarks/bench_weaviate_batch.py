@@ -0,0 +1,221 @@
+"""
+Bulk indexing throughput of WeaviateVectorStore.upsert against a local
+stand-in Weaviate server: fixed-size single-worker batches (the old
+behaviour) vs dynamic batch sizing on several workers, with per-object
+rejection and retry.
+
+    python benchmarks/bench_weaviate_batch.py --chunks 5000 --reject-rate 0.01 \\
+        --output benchmarks/results/weaviate_batch.json [--compare old.json]
+
+The stand-in implements just enough of the REST API for the v3 client
+(readiness, meta, nodes, POST /v1/batch/objects). Each batch request costs
+--base-latency plus --object-latency per object, at most --server-slots
+requests are processed at once, and --reject-rate of the objects fail on
+their first attempt with a per-object error (as a Weaviate module timeout
+would). No Weaviate, keys or network needed.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _key in ("GOOGLE_API_KEY", "GROQ_API_KEY", "LLAMA_CLOUD_API_KEY"):
+    os.environ.setdefault(_key, "offline-benchmark")
+
+from benchmarks.results import compare_results, format_summary, latency_summary, run_metadata, write_results
+from app.api.dependencies import create_weaviate_client
+from app.core.config import settings
+from app.rag.weaviate_store import WeaviateVectorStore
+
+# name -> (dynamic, workers, retries)
+CONFIGS = {
+    "fixed_1_worker": (False, 1, 0),
+    "dynamic_1_worker": (True, 1, 2),
+    "dynamic_workers": (True, None, 2),
+}
+
+class StandInWeaviate:
+    """Threaded HTTP server answering the few endpoints the batch path uses."""
+
+    def __init__(self, base_latency: float, object_latency: float, slots: int, reject_rate: float, seed: int = 0):
+        self.base_latency = base_latency
+        self.object_latency = object_latency
+        self.reject_rate = reject_rate
+        self._slots = threading.Semaphore(slots)
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.reset()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: Any):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/v1/.well-known/ready"):
+                    return self._send(200, {})
+                if self.path == "/v1/meta":
+                    return self._send(200, {"version": "1.24.0", "modules": {}})
+                if self.path.startswith("/v1/nodes"):
+                    # No batchStats: the client sizes batches from the observed objects/s
+                    return self._send(200, {"nodes": [{"name": "stand-in", "status": "HEALTHY"}]})
+                self._send(404, {})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path != "/v1/batch/objects":
+                    return self._send(404, {})
+                self._send(200, stand_in.write(body.get("objects", [])))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.stored = set()
+        self.attempts: Dict[str, int] = {}
+        self.batch_sizes: List[int] = []
+
+    def write(self, objects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._slots:
+            time.sleep(self.base_latency + self.object_latency * len(objects))
+        results = []
+        with self._lock:
+            self.batch_sizes.append(len(objects))
+            for obj in objects:
+                object_id = obj["id"]
+                self.attempts[object_id] = self.attempts.get(object_id, 0) + 1
+                result = {}
+                if self.attempts[object_id] == 1 and self._rng.random() < self.reject_rate:
+                    result = {"errors": {"error": [{"message": "stand-in: vectorization timeout"}]}}
+                else:
+                    self.stored.add(object_id)
+                results.append({"class": obj["class"], "id": object_id, "result": result})
+        return results
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def synthetic_chunks(count: int, dim: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks, vectors = [], []
+    for i in range(count):
+        chunks.append({
+            "page_content": f"Hemoglobin {rng.uniform(9, 17):.1f} g/dL synthetic chunk {i}",
+            "metadata": {
+                "chunk_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "source": f"lab_report_{i // 40:04d}_2024.pdf",
+                "source_hash": f"bench-{i // 40}",
+                "page": i % 4 + 1,
+                "year": 2024,
+                "section": "cbc"
+            }
+        })
+        vectors.append([rng.uniform(-1, 1) for _ in range(dim)])
+    return chunks, vectors
+
+def run_config(name: str, stand_in: StandInWeaviate, chunks, vectors, args) -> Dict[str, Any]:
+    dynamic, workers, retries = CONFIGS[name]
+    settings.WEAVIATE_BATCH_SIZE = args.batch_size
+    settings.WEAVIATE_BATCH_DYNAMIC = dynamic
+    settings.WEAVIATE_BATCH_WORKERS = workers or args.workers
+    settings.WEAVIATE_BATCH_RETRIES = retries
+    settings.WEAVIATE_BATCH_RETRY_BACKOFF_SECONDS = args.retry_backoff
+
+    stand_in.reset()
+    client = create_weaviate_client()
+    store = WeaviateVectorStore(client)
+    timings, indexed, failed = [], 0, 0
+    started = time.perf_counter()
+    for i in range(0, len(chunks), args.upsert_size):
+        call_started = time.perf_counter()
+        report = store.upsert(chunks[i:i + args.upsert_size], vectors[i:i + args.upsert_size])
+        timings.append(time.perf_counter() - call_started)
+        indexed += report["indexed"]
+        failed += report["failed"]
+    total = time.perf_counter() - started
+    client.batch.shutdown()
+
+    summary = latency_summary(timings, items=len(chunks), unit="objects", total_seconds=total)
+    sizes = stand_in.batch_sizes
+    summary.update({
+        "indexed": indexed,
+        "failed": failed,
+        "stored": len(stand_in.stored),
+        "requests": len(sizes),
+        "mean_batch_size": round(sum(sizes) / len(sizes), 1) if sizes else 0,
+        "max_batch_size": max(sizes, default=0)
+    })
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=128, help="vector size (768 = real; JSON cost then dominates on small machines)")
+    parser.add_argument("--upsert-size", type=int, default=1000, help="chunks per store.upsert call")
+    parser.add_argument("--batch-size", type=int, default=100, help="fixed size / initial dynamic size")
+    parser.add_argument("--workers", type=int, default=settings.WEAVIATE_BATCH_WORKERS, help="workers for dynamic_workers")
+    parser.add_argument("--base-latency", type=float, default=0.05, help="server seconds per batch request")
+    parser.add_argument("--object-latency", type=float, default=0.0005, help="server seconds per object")
+    parser.add_argument("--server-slots", type=int, default=4, help="batch requests the server processes at once")
+    parser.add_argument("--reject-rate", type=float, default=0.01, help="objects rejected on their first attempt")
+    parser.add_argument("--retry-backoff", type=float, default=0.05)
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"comma-separated subset of {', '.join(CONFIGS)}")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent for --compare")
+    args = parser.parse_args()
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    unknown = set(configs) - set(CONFIGS)
+    if unknown:
+        parser.error(f"unknown configs: {', '.join(sorted(unknown))}")
+
+    stand_in = StandInWeaviate(args.base_latency, args.object_latency, args.server_slots, args.reject_rate)
+    settings.WEAVIATE_URL = stand_in.url
+    chunks, vectors = synthetic_chunks(args.chunks, args.dim)
+    print(f"📄 {args.chunks} chunks ({args.dim} dims), upserts of {args.upsert_size}, stand-in at {stand_in.url}\n")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for name in configs:
+            results[name] = run_config(name, stand_in, chunks, vectors, args)
+            summary = results[name]
+            print(format_summary(name, summary))
+            print(
+                f"   requests={summary['requests']} mean_batch={summary['mean_batch_size']} "
+                f"max_batch={summary['max_batch_size']} indexed={summary['indexed']} "
+                f"failed={summary['failed']} stored={summary['stored']}"
+            )
+    finally:
+        stand_in.close()
+
+    if args.output:
+        write_results(args.output, run_metadata(vars(args)), results)
+    if args.compare:
+        regressions = compare_results(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metrics regressed by more than {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
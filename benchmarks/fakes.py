@@ -0,0 +1,257 @@
+"""
+Deterministic offline stand-ins for the external services, plus synthetic corpora.
+
+    from benchmarks.fakes import install_fakes
+    install_fakes(workdir)          # before running any pipeline/query code
+
+Replaces Gemini embeddings (hashed bag-of-words vectors, so similar texts
+retrieve each other), LlamaParse (reads the synthetic "PDF" text files written
+by `write_synthetic_reports`) and Groq (quotes the best-matching context line), and
+points every on-disk path and the vector store at `workdir`. Optional latencies
+simulate network round-trips. Nothing here talks to the network.
+"""
+import asyncio
+import os
+import random
+import re
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+# Settings read the keys at import time and the Groq clients refuse to build without one
+for _key in ("GOOGLE_API_KEY", "GROQ_API_KEY", "LLAMA_CLOUD_API_KEY"):
+    os.environ.setdefault(_key, "offline-benchmark")
+
+import numpy as np
+from app.core.config import settings
+from app.rag.bm25 import tokenize
+from app.rag.chunking import classify_section
+
+EMBEDDING_DIM = 768
+PAGE_BREAK = "\f"
+
+# --- Synthetic lab reports ---
+SECTIONS = [
+    ("# Complete Blood Count (CBC)", ["Hemoglobin", "WBC", "Platelets", "RBC", "Hematocrit", "MCV"]),
+    ("# Lipid Profile", ["Total Cholesterol", "HDL", "LDL", "Triglycerides"]),
+    ("# Diabetes Screening", ["Fasting Glucose", "HbA1c"]),
+    ("# Kidney Function Test", ["Creatinine", "eGFR", "BUN", "Uric Acid"]),
+    ("# Liver Function Test", ["SGPT (ALT)", "SGOT (AST)", "Bilirubin", "Albumin"]),
+    ("# Serum Electrolytes", ["Sodium", "Potassium", "Chloride"]),
+    ("# Clinical Interpretation", []),
+]
+ANALYTES = [analyte for _, analytes in SECTIONS for analyte in analytes]
+
+def lab_page(rng: random.Random, rows_per_section: int = 1, page: Optional[int] = None) -> str:
+    """
+    One markdown lab-report page as LlamaParse returns it. With `page` set, the
+    letterhead/footer noise that `clean_medical_text` strips is included too.
+    """
+    lines = []
+    if page is not None:
+        lines += ["CLINICTECH LABS - COMPREHENSIVE REPORT", "123 Innovation Drive", ""]
+    lines += [
+        f"PATIENT: Patient {rng.randint(1, 999)}",
+        f"COLL DATE: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2024)}",
+        ""
+    ]
+    for header, analytes in SECTIONS:
+        lines.append(header)
+        lines.append("| Test | Result | Unit | Reference Range |")
+        lines.append("|---|---|---|---|")
+        for _ in range(rows_per_section):
+            for analyte in analytes:
+                lines.append(f"| {analyte} | {rng.uniform(0.1, 300):.1f} | mg/dL | {rng.randint(1, 50)} - {rng.randint(51, 400)} |")
+        if not analytes:
+            lines.append("Findings are within normal limits. " * rows_per_section)
+        lines.append("")
+    if page is not None:
+        lines.append(f"--- PAGE {page} ---")
+    return "\n".join(lines)
+
+def write_synthetic_reports(directory: Path, reports: int, pages_per_report: int, rows_per_section: int = 1, seed: int = 0) -> List[str]:
+    """Writes `reports` fake PDFs (page texts separated by form feeds) that `FakeLlamaParse` reads back."""
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(reports):
+        path = directory / f"lab_report_{i:04d}_{2020 + i % 5}.pdf"
+        pages = [lab_page(rng, rows_per_section, page=p + 1) for p in range(pages_per_report)]
+        path.write_text(PAGE_BREAK.join(pages), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+def synthetic_questions(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Value lookups and broader questions over the synthetic analytes, with and
+    without a year; `section` is the tag of the section that holds the answer.
+    """
+    rng = random.Random(seed)
+    templates = [
+        "What is the patient's {analyte} level?",
+        "Was the {analyte} result abnormal?",
+        "How did {analyte} change over time?",
+        "Summarize the {section} findings.",
+    ]
+    questions = []
+    for _ in range(count):
+        header, analytes = rng.choice(SECTIONS[:-1])
+        questions.append({
+            "question": rng.choice(templates).format(analyte=rng.choice(analytes), section=header.lstrip("# ")),
+            "year": rng.choice([None, 2020, 2021, 2022, 2023, 2024]),
+            "section": classify_section(header.lower())
+        })
+    return questions
+
+# --- Fake Gemini ---
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Hashed bag-of-words vector: deterministic across runs, and texts sharing words score higher."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+class FakeGenAI:
+    """Drop-in for the `google.generativeai` module functions the app calls."""
+
+    def __init__(self, latency: float = 0.0, dim: int = EMBEDDING_DIM):
+        self.latency = latency
+        self.dim = dim
+        self.calls = 0
+
+    def _embed(self, content):
+        self.calls += 1
+        if isinstance(content, list):
+            return {"embedding": [fake_embedding(text, self.dim) for text in content]}
+        return {"embedding": fake_embedding(content, self.dim)}
+
+    def embed_content(self, model: str, content, task_type: Optional[str] = None, title: Optional[str] = None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(content)
+
+    async def embed_content_async(self, model: str, content, task_type: Optional[str] = None, title: Optional[str] = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._embed(content)
+
+# --- Fake LlamaParse ---
+class FakeLlamaParse:
+    """Reads the page texts back out of a file written by `write_synthetic_reports`."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def aload_data(self, path: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = Path(path).read_text(encoding="utf-8")
+        return [SimpleNamespace(text=page) for page in text.split(PAGE_BREAK)]
+
+# --- Fake Groq ---
+CONTEXT_HEADER = re.compile(r"--- SOURCE (\d+) ---")
+CONTEXT_METADATA = ("Document:", "Date/Year:", "Section:", "Content:")
+
+def fake_answer(messages: List[Dict[str, str]]) -> str:
+    """Extractive stand-in for the LLM: quotes the context line sharing most words with the question."""
+    question = messages[-1]["content"].replace("User Question: ", "")
+    wanted = set(tokenize(question))
+    best, best_score, best_source, source = "", 0, 1, 1
+    for line in messages[0]["content"].split("\n"):
+        line = line.strip()
+        header = CONTEXT_HEADER.match(line)
+        if header:
+            source = int(header.group(1))
+            continue
+        if not line or line.startswith(CONTEXT_METADATA):
+            continue
+        score = len(wanted & set(tokenize(line)))
+        if score > best_score:
+            best, best_score, best_source = line, score, source
+    if not best:
+        return "Information not found in the records."
+    return f"According to the records: {best} [Source {best_source}]."
+
+class _FakeCompletions:
+    def __init__(self, latency: float, is_async: bool):
+        self.latency = latency
+        self.is_async = is_async
+
+    def _response(self, messages):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=fake_answer(messages)))])
+
+    async def _astream(self, messages):
+        for word in fake_answer(messages).split(" "):
+            if self.latency:
+                await asyncio.sleep(self.latency / 20)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+    async def _acreate(self, messages, stream):
+        if stream:
+            return self._astream(messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(messages)
+
+    def create(self, messages: List[Dict[str, str]], model: str = "", stream: bool = False, **kwargs):
+        if self.is_async:
+            return self._acreate(messages, stream)
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response(messages)
+
+class FakeGroq:
+    """Stands in for `Groq` (is_async=False) or `AsyncGroq` (is_async=True), including streaming."""
+
+    def __init__(self, latency: float = 0.0, is_async: bool = True):
+        self.chat = SimpleNamespace(completions=_FakeCompletions(latency, is_async))
+
+# --- Wiring ---
+def install_fakes(
+    workdir: Path,
+    embed_latency: float = 0.0,
+    parse_latency: float = 0.0,
+    llm_latency: float = 0.0,
+    embedding_cache: bool = False
+) -> Dict[str, Any]:
+    """
+    Points settings at `workdir` (local vector store, caches, lab index) and
+    swaps the Gemini/LlamaParse/Groq clients for the fakes above.
+    Returns the fakes so callers can inspect call counts.
+    """
+    import app.rag.embeddings as embeddings
+    import app.rag.generation as generation
+    import app.rag.ingestion as ingestion
+
+    workdir = Path(workdir)
+    settings.VECTOR_STORE_BACKEND = "local"
+    settings.DATA_DIR = workdir
+    settings.RAW_DATA_DIR = workdir / "raw"
+    settings.PROCESSED_DATA_DIR = workdir / "processed"
+    settings.PARSE_CACHE_DIR = workdir / "processed" / "parse_cache"
+    settings.EMBEDDING_CACHE_PATH = workdir / "embedding_cache.sqlite3"
+    settings.INGEST_MANIFEST_PATH = workdir / "ingest_manifest.json"
+    settings.JOBS_DIR = workdir / "jobs"
+    settings.LAB_INDEX_PATH = workdir / "lab_index.sqlite3"
+    settings.CACHE_COUNTERS_PATH = workdir / "cache_counters.sqlite3"
+    settings.LOCAL_STORE_DIR = workdir / "vector_store"
+    settings.EMBEDDING_CACHE_ENABLED = embedding_cache
+
+    fakes = {
+        "genai": FakeGenAI(embed_latency),
+        "parser": FakeLlamaParse(parse_latency),
+        "groq": FakeGroq(llm_latency, is_async=False),
+        "async_groq": FakeGroq(llm_latency, is_async=True),
+    }
+    embeddings.genai = fakes["genai"]
+    ingestion.build_parser = lambda: fakes["parser"]
+    generation.client = fakes["groq"]
+    generation.async_client = fakes["async_groq"]
+    return fakes
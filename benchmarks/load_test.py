@@ -0,0 +1,320 @@
+"""
+Concurrent load generator and latency report for /query (and /ingest).
+
+    # Against a running server
+    python benchmarks/load_test.py --url http://localhost:8000 --concurrency 20 --ramp 10 --duration 60
+
+    # Fully offline: starts the app in-process on stub backends (benchmarks/fakes.py),
+    # ingests a corpus holding the TruthScript ground truth, then runs the load
+    python benchmarks/load_test.py --stub --concurrency 50 --duration 20 --bust-cache
+
+Virtual users cycle through the TruthScript test cases. They start evenly
+spread over --ramp seconds and stop sending when --duration ends, which
+includes the ramp. The report covers throughput, latency percentiles, error
+rate by kind, the answer path taken (cache / lab-index / rag), and
+accuracy-under-load: an answer passes when it contains `expected_value`, the
+same check TruthScript uses.
+
+--ingest FILE... adds --ingest-concurrency users that upload the files in a
+loop and time each job until it finishes. --ingest-unique appends a nonce
+to every upload. Without it, repeated uploads hit the unchanged-file skip.
+Note that a real server parses every unique upload with LlamaParse.
+
+In --stub mode the client and the server share one process (and the GIL),
+so the numbers measure app overhead on top of instant backends. Treat them as
+relative, not as production capacity.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from benchmarks.fakes import install_fakes
+from benchmarks.results import compare_results, format_summary, latency_summary, run_metadata, write_results
+from TruthScript import clean_text, test_cases
+
+QUERY_PATH = "/api/v1/query"
+INGEST_PATH = "/api/v1/ingest"
+JOB_DONE = ("succeeded", "failed")
+QUESTION_SUBJECT = re.compile(r"what is the (?:patient's )?(.+?) (?:level|result|value)\?", re.IGNORECASE)
+
+# --- Stub server ---
+def write_stub_reports(directory: Path, cases: List[Dict[str, Any]]) -> List[str]:
+    """
+    One fake report per year holding each test case's expected value: value
+    questions become lab-table rows, the rest go into the interpretation text.
+    """
+    by_year = defaultdict(list)
+    for case in cases:
+        by_year[case["year"]].append(case)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for year, year_cases in sorted(by_year.items()):
+        rows, findings = [], []
+        for case in year_cases:
+            subject = QUESTION_SUBJECT.match(case["question"])
+            if subject and not case["unit"].startswith("("):
+                rows.append(f"| {subject.group(1)} | {case['expected_value']} | {case['unit']} | - |")
+            else:
+                findings.append(f"Primary diagnosis: {case['expected_value']}.")
+        page = "\n".join([
+            "PATIENT: Load Test",
+            f"COLL DATE: 15/06/{year}",
+            "",
+            "# Laboratory Results (CBC, Lipid, Glucose, Kidney, Liver)",
+            "| Test | Result | Unit | Reference Range |",
+            "|---|---|---|---|",
+            *rows,
+            "",
+            "# Clinical Interpretation",
+            *findings,
+            "Findings reviewed by the attending physician. " * 10
+        ])
+        path = directory / f"stub_lab_report_{year}.pdf"
+        path.write_text(page, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_stub_server(workdir: Path, embed_latency: float, parse_latency: float, llm_latency: float):
+    """Serves app.main:app on a free local port from a background thread, with fakes installed."""
+    install_fakes(workdir, embed_latency, parse_latency, llm_latency)
+    import uvicorn
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Stub server failed to start")
+        time.sleep(0.05)
+    print(f"🧪 Stub server on http://127.0.0.1:{port} (fake Gemini / LlamaParse / Groq, local vector store)")
+    return f"http://127.0.0.1:{port}", server, thread
+
+# --- Virtual users ---
+def upload_payload(paths: List[str], unique: bool):
+    files = []
+    for path in paths:
+        data = Path(path).read_bytes()
+        if unique:
+            data += f"\n%load-test-{uuid.uuid4().hex}\n".encode("ascii")
+        files.append(("files", (os.path.basename(path), data, "application/pdf")))
+    return files
+
+async def run_ingest_job(client: httpx.AsyncClient, base_url: str, paths: List[str], unique: bool, poll_interval: float, deadline: float) -> Dict[str, Any]:
+    """Uploads `paths` once and polls the job; returns submit and completion timings."""
+    record = {"submit_seconds": None, "job_seconds": None, "status": None, "error": None}
+    started = time.perf_counter()
+    try:
+        response = await client.post(base_url + INGEST_PATH, files=upload_payload(paths, unique))
+        record["submit_seconds"] = time.perf_counter() - started
+        if response.status_code != 202:
+            record["error"] = f"HTTP {response.status_code}"
+            return record
+        status_url = response.json()["status_url"]
+        while time.perf_counter() < deadline:
+            job = (await client.get(status_url)).json()
+            if job["status"] in JOB_DONE:
+                record["status"] = job["status"]
+                record["job_seconds"] = time.perf_counter() - started
+                if job["status"] == "failed":
+                    record["error"] = "job failed"
+                return record
+            await asyncio.sleep(poll_interval)
+        record["error"] = "job unfinished"
+    except httpx.HTTPError as e:
+        record["error"] = type(e).__name__
+    return record
+
+async def query_user(
+    client: httpx.AsyncClient,
+    base_url: str,
+    counter: itertools.count,
+    start_delay: float,
+    deadline: float,
+    max_requests: Optional[int],
+    bust_cache: bool,
+    records: List[Dict[str, Any]]
+):
+    await asyncio.sleep(start_delay)
+    while time.perf_counter() < deadline:
+        n = next(counter)
+        if max_requests is not None and n >= max_requests:
+            return
+        case = test_cases[n % len(test_cases)]
+        # A parenthesised suffix defeats the answer cache but not the lab-index matcher
+        question = f"{case['question']} (load {n})" if bust_cache else case["question"]
+
+        record = {"question": case["question"], "sent_at": time.perf_counter(), "latency": None,
+                  "error": None, "passed": False, "path": None}
+        try:
+            response = await client.post(base_url + QUERY_PATH, json={"question": question, "year_filter": case["year"]})
+            record["latency"] = time.perf_counter() - record["sent_at"]
+            if response.status_code != 200:
+                record["error"] = f"HTTP {response.status_code}"
+            else:
+                answer = response.json().get("answer", "")
+                record["passed"] = clean_text(case["expected_value"]) in clean_text(answer)
+                record["path"] = "cache" if response.headers.get("X-Cache") == "HIT" else response.headers.get("X-Answer-Path")
+        except httpx.HTTPError as e:
+            record["latency"] = time.perf_counter() - record["sent_at"]
+            record["error"] = type(e).__name__
+        records.append(record)
+
+async def ingest_user(client, base_url, paths, start_delay, deadline, unique, poll_interval, records):
+    await asyncio.sleep(start_delay)
+    while time.perf_counter() < deadline:
+        records.append(await run_ingest_job(client, base_url, paths, unique, poll_interval, deadline + 60))
+
+# --- Report ---
+def query_report(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    ok = [r for r in records if r["error"] is None]
+    summary = latency_summary([r["latency"] for r in ok], unit="req", total_seconds=wall_seconds)
+    summary["requests"] = len(records)
+    summary["error_rate"] = round(1 - len(ok) / len(records), 4) if records else 0.0
+    summary["errors"] = dict(Counter(r["error"] for r in records if r["error"]))
+    summary["accuracy"] = round(sum(r["passed"] for r in ok) / len(ok), 4) if ok else None
+    summary["answer_paths"] = dict(Counter(r["path"] or "unknown" for r in ok))
+
+    per_question = defaultdict(lambda: [0, 0])
+    for r in ok:
+        per_question[r["question"]][0] += r["passed"]
+        per_question[r["question"]][1] += 1
+    summary["accuracy_per_question"] = {q: round(passed / total, 4) for q, (passed, total) in per_question.items()}
+    return summary
+
+def ingest_report(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    done = [r for r in records if r["job_seconds"] is not None]
+    summary = latency_summary([r["job_seconds"] for r in done], unit="jobs", total_seconds=wall_seconds)
+    submitted = [r["submit_seconds"] for r in records if r["submit_seconds"] is not None]
+    summary["jobs"] = len(records)
+    summary["submit_p50_ms"] = latency_summary(submitted)["p50_ms"] if submitted else None
+    summary["error_rate"] = round(sum(1 for r in records if r["error"]) / len(records), 4) if records else 0.0
+    summary["errors"] = dict(Counter(r["error"] for r in records if r["error"]))
+    return summary
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    query = results.get("query")
+    if query:
+        print()
+        print(format_summary("query", query))
+        print(f"   requests={query['requests']} error_rate={query['error_rate']:.2%} errors={query['errors'] or '-'}")
+        if query["accuracy"] is not None:
+            print(f"   accuracy under load: {query['accuracy']:.1%}   answer paths: {query['answer_paths']}")
+        for question, accuracy in sorted(query["accuracy_per_question"].items(), key=lambda item: item[1]):
+            marker = "✅" if accuracy == 1.0 else "❌"
+            print(f"   {marker} {accuracy:6.1%}  {question}")
+    ingest = results.get("ingest")
+    if ingest:
+        print(format_summary("ingest (job)", ingest))
+        print(f"   jobs={ingest['jobs']} submit_p50={ingest['submit_p50_ms']}ms error_rate={ingest['error_rate']:.2%} errors={ingest['errors'] or '-'}")
+
+# --- Driver ---
+async def run_load(args, base_url: str) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency + args.ingest_concurrency + 10)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        counter = itertools.count()
+        query_records: List[Dict[str, Any]] = []
+        ingest_records: List[Dict[str, Any]] = []
+
+        users = [
+            query_user(client, base_url, counter, args.ramp * i / args.concurrency, deadline,
+                       args.requests, args.bust_cache, query_records)
+            for i in range(args.concurrency)
+        ]
+        if args.ingest:
+            users += [
+                ingest_user(client, base_url, args.ingest, args.ramp * i / args.ingest_concurrency, deadline,
+                            args.ingest_unique, args.poll_interval, ingest_records)
+                for i in range(args.ingest_concurrency)
+            ]
+        print(f"🚀 {args.concurrency} query users{f' + {args.ingest_concurrency} ingest users' if args.ingest else ''}, "
+              f"ramp {args.ramp:.0f}s, duration {args.duration:.0f}s -> {base_url}")
+        await asyncio.gather(*users)
+        wall = time.perf_counter() - started
+
+    results = {"query": query_report(query_records, wall)} if query_records else {}
+    if ingest_records:
+        results["ingest"] = ingest_report(ingest_records, wall)
+    return results
+
+async def seed_stub_corpus(base_url: str, paths: List[str]):
+    async with httpx.AsyncClient(timeout=60) as client:
+        record = await run_ingest_job(client, base_url, paths, unique=False, poll_interval=0.1, deadline=time.perf_counter() + 120)
+    if record["status"] != "succeeded":
+        raise RuntimeError(f"Seeding the stub corpus failed: {record['error']}")
+    print(f"📥 Stub corpus ingested ({len(paths)} reports) in {record['job_seconds']:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="server base URL (ignored with --stub)")
+    parser.add_argument("--stub", action="store_true", help="start the app in-process on fake backends")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent /query users")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which users start")
+    parser.add_argument("--duration", type=float, default=30.0, help="total seconds of load, ramp included")
+    parser.add_argument("--requests", type=int, help="stop after this many queries (across all users)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--bust-cache", action="store_true", help="make every question unique to the answer cache")
+    parser.add_argument("--ingest", nargs="+", metavar="PDF", help="files each ingest user uploads per job")
+    parser.add_argument("--ingest-concurrency", type=int, default=1)
+    parser.add_argument("--ingest-unique", action="store_true", help="append a nonce so uploads are never skipped as unchanged")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between ingest job status polls")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="--stub: simulated seconds per embedding call")
+    parser.add_argument("--parse-latency", type=float, default=0.0, help="--stub: simulated seconds per parsed file")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="--stub: simulated seconds per completion")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    args = parser.parse_args()
+    if args.concurrency < 1 or (args.ingest and args.ingest_concurrency < 1):
+        parser.error("concurrency must be at least 1")
+    missing = [path for path in args.ingest or [] if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"files not found: {', '.join(missing)}")
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        base_url = args.url.rstrip("/")
+        if args.stub:
+            base_url, server, thread = start_stub_server(Path(tmp), args.embed_latency, args.parse_latency, args.llm_latency)
+            asyncio.run(seed_stub_corpus(base_url, write_stub_reports(Path(tmp) / "stub_reports", test_cases)))
+        try:
+            # The in-process server logs every request to stdout; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if args.stub else sys.stdout):
+                results = asyncio.run(run_load(args, base_url))
+        finally:
+            if server is not None:
+                server.should_exit = True
+                thread.join(timeout=10)
+
+    print_report(results)
+    if args.output:
+        write_results(args.output, run_metadata(vars(args)), results)
+    if args.compare:
+        compare_results(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Latency summaries and JSON result files shared by the benchmark scripts.
+
+Result files look like {"meta": {...}, "results": {name: summary}} so two runs
+(e.g. before/after a commit) can be diffed with `compare_results`.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Lower is better for latencies, higher for throughput
+COMPARED_METRICS = (("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1), ("throughput", 1))
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def latency_summary(
+    timings: List[float],
+    items: Optional[float] = None,
+    unit: str = "ops",
+    total_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    p50/p95/p99/mean/max of per-operation timings (seconds, reported in ms) and
+    throughput in `unit`/s. `items` defaults to one per timing; `total_seconds`
+    (wall clock) defaults to the sum of the timings.
+    """
+    total = total_seconds if total_seconds is not None else sum(timings)
+    items = items if items is not None else len(timings)
+    ms = [t * 1000 for t in timings] or [0.0]
+    return {
+        "ops": len(timings),
+        "total_seconds": round(total, 4),
+        "throughput": round(items / total, 2) if total > 0 else None,
+        "throughput_unit": f"{unit}/s",
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "max_ms": round(max(ms), 3)
+    }
+
+def format_summary(name: str, summary: Dict[str, Any]) -> str:
+    throughput = f"{summary['throughput']:>10.1f} {summary['throughput_unit']}" if summary["throughput"] else ""
+    return (
+        f"📊 {name:<24} n={summary['ops']:<6} p50={summary['p50_ms']:>9.3f}ms "
+        f"p95={summary['p95_ms']:>9.3f}ms p99={summary['p99_ms']:>9.3f}ms {throughput}"
+    )
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_metadata(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": args
+    }
+
+def write_results(path: str, meta: Dict[str, Any], results: Dict[str, Dict[str, Any]]):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"💾 Results written to {path}")
+
+def compare_results(baseline_path: str, results: Dict[str, Dict[str, Any]], threshold: float = 10.0) -> List[str]:
+    """
+    Prints the change of each metric against a previous result file and returns
+    the names of metrics that got worse by more than `threshold` percent.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n🔁 Compared with {baseline_path} (commit {baseline['meta'].get('git_commit')}):")
+
+    regressions = []
+    for name, summary in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        changes = []
+        for metric, direction in COMPARED_METRICS:
+            old, new = before.get(metric), summary.get(metric)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old * 100
+            flag = ""
+            if delta * direction < -threshold:
+                flag = " ⚠️"
+                regressions.append(f"{name}.{metric}")
+            changes.append(f"{metric} {delta:+.1f}%{flag}")
+        print(f"   {name:<24} " + "  ".join(changes))
+    return regressions
@@ -80,7 +80,19 @@ export default function App() {
       
       if (!response.ok) throw new Error('Upload failed');
       
-      const data = await response.json();
+      // Ingestion runs as a background job: poll until it finishes
+      const submitted = await response.json();
+      let job;
+      while (true) {
+        const statusResponse = await fetch(submitted.status_url);
+        if (!statusResponse.ok) throw new Error('Job status unavailable');
+        job = await statusResponse.json();
+        if (job.status === 'succeeded' || job.status === 'failed') break;
+        await new Promise(resolve => setTimeout(resolve, 1500));
+      }
+      if (job.status === 'failed') throw new Error(job.error || 'Ingestion failed');
+
+      const data = job.result || { files_processed: job.files, total_chunks: job.progress.chunks_created };
       setUploadStatus('success');
       setUploadStats(data);
       
@@ -105,8 +117,18 @@ export default function App() {
     setIsGenerating(true);
     setActiveCitation(null);
 
+    // Placeholder assistant message, filled in as SSE events arrive
+    setChatHistory(prev => [...prev, { role: 'assistant', content: '', citations: [] }]);
+    const updateAnswer = (update) => {
+      setChatHistory(prev => {
+        const next = [...prev];
+        next[next.length - 1] = update(next[next.length - 1]);
+        return next;
+      });
+    };
+
     try {
-      const response = await fetch('http://localhost:8000/api/v1/query', {
+      const response = await fetch('http://localhost:8000/api/v1/query/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -115,15 +137,40 @@ export default function App() {
         })
       });
 
-      const data = await response.json();
-      
-      const aiMessage = {
-        role: 'assistant',
-        content: data.answer,
-        citations: data.citations || []
-      };
+      if (!response.ok || !response.body) throw new Error('Stream failed');
 
-      setChatHistory(prev => [...prev, aiMessage]);
+      // Parse "event: <name>\ndata: <json>\n\n" frames incrementally
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = 'message';
+          let data = '';
+          frame.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          });
+          const payload = data ? JSON.parse(data) : {};
+
+          if (event === 'citations') {
+            updateAnswer(msg => ({ ...msg, citations: payload }));
+          } else if (event === 'token') {
+            updateAnswer(msg => ({ ...msg, content: msg.content + payload.text }));
+          } else if (event === 'error') {
+            updateAnswer(msg => ({ ...msg, content: msg.content + `\n${payload.detail}` }));
+          }
+        }
+      }
     } catch (error) {
       setChatHistory(prev => [...prev, {
         role: 'system',